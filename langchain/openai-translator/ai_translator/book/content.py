@@ -1,10 +1,25 @@
+import re
 import pandas as pd
 
 from enum import Enum, auto
+from typing import List, Optional
 from PIL import Image as PILImage
 from utils import LOG
 from io import StringIO
 
+# 日期与编号类单元格（如 2023-01-05、SKU-1024）无需翻译
+DATE_PATTERN = re.compile(r"^\d{1,4}[-/.]\d{1,2}(?:[-/.]\d{1,4})?$")
+CODE_PATTERN = re.compile(r"^(?=.*\d)[A-Z0-9][A-Z0-9_\-./#]*$")
+
+def is_translatable_cell(value) -> bool:
+    """只有包含字母且不是日期、编号的单元格才需要翻译；空值与纯数字原样保留"""
+    if value is None or (isinstance(value, float) and pd.isna(value)):
+        return False
+    text = str(value).strip()
+    if not text or not any(char.isalpha() for char in text):
+        return False
+    return not (DATE_PATTERN.match(text) or CODE_PATTERN.match(text))
+
 class ContentType(Enum):
     TEXT = auto()
     TABLE = auto()
@@ -71,6 +86,47 @@ class TableContent(Content):
     def __str__(self):
         return self.original.to_string(header=False, index=False)
 
+    def translatable_cells(self) -> List[str]:
+        """按行优先顺序返回去重后需要翻译的单元格文本"""
+        cells = []
+        seen = set()
+        for _, _, item in self.iter_items():
+            if is_translatable_cell(item):
+                text = str(item).strip()
+                if text not in seen:
+                    seen.add(text)
+                    cells.append(text)
+        return cells
+
+    def apply_cell_translations(self, cells: List[str], translations: Optional[List[str]], status: bool):
+        """按单元格文本把译文映射回原表格，表格结构与不需翻译的单元格保持不变
+
+        第一行作为表头，与 set_translation 的解析结果一致。
+        """
+        if not status or translations is None or len(translations) != len(cells):
+            LOG.error("An error occurred during table translation: cell translations do not match the table")
+            self.translation = None
+            self.status = False
+            return
+
+        mapping = dict(zip(cells, translations))
+        rows = [
+            [mapping.get(str(item).strip(), item) if is_translatable_cell(item) else self._plain_cell(item) for item in row]
+            for row in self.original.values.tolist()
+        ]
+        if len(rows) > 1:
+            translated_df = pd.DataFrame(rows[1:], columns=rows[0])
+        else:
+            translated_df = pd.DataFrame(rows)
+        LOG.debug(f"[translated_df]\n{translated_df}")
+        self.translation = translated_df
+        self.status = True
+
+    @staticmethod
+    def _plain_cell(item):
+        # pdfplumber 的空单元格为 None，在 DataFrame 中变成 NaN，导出时写为空字符串
+        return "" if item is None or (isinstance(item, float) and pd.isna(item)) else item
+
     def iter_items(self, translated=False):
         target_df = self.translation if translated else self.original
         for row_idx, row in target_df.iterrows():
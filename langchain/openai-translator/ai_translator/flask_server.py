@@ -3,52 +3,194 @@ import os
 
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from flask import Flask, request, send_file, jsonify
-from translator import PDFTranslator, TranslationConfig
+import io
+import json
+import queue
+from typing import Optional
+
+from flask import Flask, Response, request, send_file, jsonify, stream_with_context
+from job_manager import FAILED, SUCCEEDED, JobManager, JobQueueFullError, TranslationJob
+from translator import PDFTranslator, TranslationCache, TranslationConfig
 from utils import ArgumentParser, LOG
 
 app = Flask(__name__)
 
-TEMP_FILE_DIR = "flask_temps/"
+
+def error_response(message: str, status_code: int = 400):
+    response = {
+        'status': 'error',
+        'message': message
+    }
+    return jsonify(response), status_code
+
+
+def create_job_from_request() -> TranslationJob:
+    """把上传文件保存到新任务的独立工作目录中"""
+    input_file = request.files.get('input_file')
+    if not (input_file and input_file.filename):
+        raise ValueError("input_file is required")
+
+    LOG.debug(f"[input_file.filename]\n{input_file.filename}")
+
+    job = Jobs.create_job(
+        filename=input_file.filename,
+        source_language=request.form.get('source_language', 'English'),
+        target_language=request.form.get('target_language', 'Chinese'),
+        output_file_format=request.form.get('output_file_format', 'markdown'),
+    )
+    try:
+        input_file.save(job.input_file)
+    except Exception:
+        Jobs.discard(job)
+        raise
+    return job
+
+
+def run_translation(job: TranslationJob) -> str:
+    return Translator.translate_pdf(
+        input_file=job.input_file,
+        output_file_format=job.output_file_format,
+        source_language=job.source_language,
+        target_language=job.target_language,
+        output=job.output_path())
+
+
+def run_translation_in_memory(job: TranslationJob) -> Optional[io.BytesIO]:
+    """译文写入内存，直接作为 HTTP 响应返回，不经过磁盘"""
+    buffer = io.BytesIO()
+    if not Translator.translate_pdf(
+            input_file=job.input_file,
+            output_file_format=job.output_file_format,
+            source_language=job.source_language,
+            target_language=job.target_language,
+            output=buffer):
+        return None
+    buffer.seek(0)
+    return buffer
+
 
 @app.route('/translation', methods=['POST'])
 def translation():
+    """同步翻译：任务在线程池中执行，完成后把内存中的译文直接返回并删除临时文件"""
+    try:
+        job = Jobs.submit(create_job_from_request(), run_translation_in_memory)
+    except JobQueueFullError as e:
+        return error_response(str(e), 503)
+    except Exception as e:
+        return error_response(str(e))
+
+    job.done.wait()
+    if job.status != SUCCEEDED:
+        Jobs.discard(job)
+        return error_response(job.error)
+
+    # 译文已在内存中，立即清理任务目录后再返回
+    # （send_file 的响应绕过 WSGI 的 close 回调，不能依赖 call_on_close 清理）
+    Jobs.discard(job)
+    return send_file(job.output_file, as_attachment=True, download_name=job.download_name())
+
+
+@app.route('/jobs', methods=['POST'])
+def create_job():
+    """异步翻译：立即返回任务 ID，通过 /jobs/<job_id> 查询状态"""
+    try:
+        job = Jobs.submit(create_job_from_request(), run_translation)
+    except JobQueueFullError as e:
+        return error_response(str(e), 503)
+    except Exception as e:
+        return error_response(str(e))
+
+    return jsonify({**job.to_dict(), 'status_url': f"/jobs/{job.id}"}), 202
+
+
+@app.route('/jobs', methods=['GET'])
+def list_jobs():
+    return jsonify([job.to_dict() for job in Jobs.list_jobs()])
+
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    job = Jobs.get(job_id)
+    if job is None:
+        return error_response(f"Unknown job {job_id}", 404)
+
+    result = job.to_dict()
+    if job.status == SUCCEEDED:
+        result['result_url'] = f"/jobs/{job.id}/result"
+    return jsonify(result)
+
+
+@app.route('/jobs/<job_id>/result', methods=['GET'])
+def job_result(job_id):
+    job = Jobs.get(job_id)
+    if job is None:
+        return error_response(f"Unknown job {job_id}", 404)
+    if job.status == FAILED:
+        return error_response(job.error)
+    if job.status != SUCCEEDED:
+        return error_response(f"Job {job_id} is {job.status}", 409)
+
+    return send_file(job.output_file, as_attachment=True, download_name=job.download_name())
+
+
+@app.route('/translation/stream', methods=['POST'])
+def translation_stream():
+    """以 NDJSON 流式返回译文：每行一个事件，token 事件携带文本片段，done 事件携带任务 ID 与结果地址"""
+    events = queue.Queue()
+
+    def run(job: TranslationJob) -> str:
+        output_file = None
+        try:
+            for event, value in Translator.stream_translate_pdf(
+                    input_file=job.input_file,
+                    output_file_format=job.output_file_format,
+                    source_language=job.source_language,
+                    target_language=job.target_language,
+                    output=job.output_path()):
+                if event == "done":
+                    output_file = value
+                else:
+                    events.put((event, value))
+            return output_file
+        except Exception as e:
+            events.put(("error", str(e)))
+            raise
+        finally:
+            events.put(None)
+
     try:
-        input_file = request.files['input_file']
-        source_language = request.form.get('source_language', 'English')
-        target_language = request.form.get('target_language', 'Chinese')
-
-        LOG.debug(f"[input_file]\n{input_file}")
-        LOG.debug(f"[input_file.filename]\n{input_file.filename}")
-
-        if input_file and input_file.filename:
-            # # 创建临时文件
-            input_file_path = TEMP_FILE_DIR+input_file.filename
-            LOG.debug(f"[input_file_path]\n{input_file_path}")
-
-            input_file.save(input_file_path)
-
-            # 调用翻译函数
-            output_file_path = Translator.translate_pdf(
-                input_file=input_file_path,
-                source_language=source_language,
-                target_language=target_language)
-            
-            # 移除临时文件
-            # os.remove(input_file_path)
-
-            # 构造完整的文件路径
-            output_file_path = os.getcwd() + "/" + output_file_path
-            LOG.debug(output_file_path)
-
-            # 返回翻译后的文件
-            return send_file(output_file_path, as_attachment=True)
+        job = Jobs.submit(create_job_from_request(), run)
+    except JobQueueFullError as e:
+        return error_response(str(e), 503)
     except Exception as e:
-        response = {
-            'status': 'error',
-            'message': str(e)
-        }
-        return jsonify(response), 400
+        return error_response(str(e))
+
+    def generate():
+        # 翻译在线程池中进行，这里只转发事件；译文文件保留到任务过期，可通过 result_url 下载
+        while (item := events.get()) is not None:
+            event, value = item
+            if event == "token":
+                yield json.dumps({'type': 'token', 'text': value}, ensure_ascii=False) + "\n"
+            elif event == "block_end":
+                yield json.dumps({'type': 'block_end'}) + "\n"
+            else:
+                yield json.dumps({'type': 'error', 'message': value}, ensure_ascii=False) + "\n"
+                return
+        job.done.wait()
+        if job.status == SUCCEEDED:
+            yield json.dumps({'type': 'done', 'job_id': job.id, 'result_url': f"/jobs/{job.id}/result"}) + "\n"
+        else:
+            yield json.dumps({'type': 'error', 'message': job.error}, ensure_ascii=False) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+
+@app.route('/cache/stats', methods=['GET'])
+def cache_stats():
+    stats = Translator.translate_chain.cache_stats()
+    if stats is None:
+        return jsonify({'enabled': False})
+    return jsonify({'enabled': True, **stats})
 
 
 def initialize_translator():
@@ -58,14 +200,21 @@ def initialize_translator():
 
     # 初始化配置单例
     config = TranslationConfig()
-    config.initialize(args)    
-    # 实例化 PDFTranslator 类，并调用 translate_pdf() 方法
-    global Translator
-    Translator = PDFTranslator(config.model_name)
+    config.initialize(args)
+    # 实例化 PDFTranslator 类，所有请求共享同一个翻译器，每次翻译的状态只保存在各自的调用中
+    global Translator, Jobs
+    Translator = PDFTranslator(config.model_name, config.max_concurrency, TranslationCache.from_config(config))
+    # 有界线程池执行翻译，每个任务使用独立的临时目录
+    Jobs = JobManager(
+        temp_dir=config.flask_temp_dir,
+        max_workers=config.flask_max_workers,
+        max_queue_size=config.flask_max_queue_size,
+        ttl_seconds=config.flask_job_ttl_seconds,
+    )
 
 
 if __name__ == "__main__":
     # 初始化 translator
     initialize_translator()
-    # 启动 Flask Web Server
-    app.run(host="0.0.0.0", port=5000, debug=True)
\ No newline at end of file
+    # 启动 Flask Web Server（多线程处理请求，翻译并发由任务线程池限制）
+    app.run(host="0.0.0.0", port=5000, debug=False, threaded=True)
@@ -5,16 +5,23 @@ import gradio as gr
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from utils import ArgumentParser, LOG
-from translator import PDFTranslator, TranslationConfig
+from translator import PDFTranslator, TranslationCache, TranslationConfig
 
 
 def translation(input_file, source_language, target_language):
     LOG.debug(f"[翻译任务]\n源文件: {input_file.name}\n源语言: {source_language}\n目标语言: {target_language}")
 
-    output_file_path = Translator.translate_pdf(
-        input_file.name, source_language=source_language, target_language=target_language)
-
-    return output_file_path
+    # 流式显示译文，翻译结束后再提供文件下载
+    preview = ""
+    for event, value in Translator.stream_translate_pdf(
+            input_file.name, source_language=source_language, target_language=target_language):
+        if event == "token":
+            preview += value
+            yield preview, None
+        elif event == "block_end":
+            preview += "\n\n"
+        else:
+            yield preview, value
 
 def launch_gradio():
 
@@ -27,6 +34,7 @@ def launch_gradio():
             gr.Textbox(label="目标语言（默认：中文）", placeholder="Chinese", value="Chinese")
         ],
         outputs=[
+            gr.Textbox(label="翻译预览", lines=15),
             gr.File(label="下载翻译文件")
         ],
         allow_flagging="never"
@@ -44,7 +52,7 @@ def initialize_translator():
     config.initialize(args)    
     # 实例化 PDFTranslator 类，并调用 translate_pdf() 方法
     global Translator
-    Translator = PDFTranslator(config.model_name)
+    Translator = PDFTranslator(config.model_name, config.max_concurrency, TranslationCache.from_config(config))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,165 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import IO, Callable, Dict, List, Optional, Union
+
+from utils import LOG
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+FINISHED_STATUSES = (SUCCEEDED, FAILED)
+
+
+class JobQueueFullError(Exception):
+    def __init__(self, max_queue_size: int):
+        self.max_queue_size = max_queue_size
+        super().__init__(f"Job queue is full: at most {max_queue_size} jobs may wait at once.")
+
+
+class TranslationJob:
+    """一次翻译请求的全部状态：独立的工作目录、输入文件、输出文件与执行状态"""
+
+    def __init__(self, filename: str, work_dir: str, source_language: str, target_language: str,
+                 output_file_format: str):
+        self.id = uuid.uuid4().hex
+        self.filename = filename
+        self.work_dir = work_dir
+        # 输入文件名由服务端生成，不使用客户端提供的文件名
+        self.input_file = os.path.join(work_dir, "input.pdf")
+        self.source_language = source_language
+        self.target_language = target_language
+        self.output_file_format = output_file_format
+        # 译文输出：work_dir 中的文件路径，或直接返回给客户端的内存流
+        self.output_file: Optional[Union[str, IO]] = None
+        self.status = QUEUED
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.done = threading.Event()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATUSES
+
+    @property
+    def extension(self) -> str:
+        return ".pdf" if self.output_file_format.lower() == "pdf" else ".md"
+
+    def output_path(self) -> str:
+        """任务工作目录中的译文路径，并发任务之间互不覆盖"""
+        return os.path.join(self.work_dir, f"translated{self.extension}")
+
+    def download_name(self) -> str:
+        base_name = os.path.splitext(os.path.basename(self.filename))[0] or "book"
+        return f"{base_name}_translated{self.extension}"
+
+    def to_dict(self) -> Dict:
+        return {
+            "job_id": self.id,
+            "filename": self.filename,
+            "status": self.status,
+            "source_language": self.source_language,
+            "target_language": self.target_language,
+            "output_file_format": self.output_file_format,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class JobManager:
+    """在有界线程池中执行翻译任务，已结束的任务超过 ttl_seconds 后删除其工作目录"""
+
+    def __init__(self, temp_dir: str, max_workers: int = 2, max_queue_size: int = 16, ttl_seconds: int = 3600):
+        # 使用绝对路径，send_file 不会相对应用目录解析
+        self.temp_dir = os.path.abspath(temp_dir)
+        self.max_queue_size = max_queue_size
+        self.ttl_seconds = ttl_seconds
+        os.makedirs(self.temp_dir, exist_ok=True)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="translation-job")
+        self._jobs: Dict[str, TranslationJob] = {}
+        self._lock = threading.Lock()
+
+    def create_job(self, filename: str, source_language: str, target_language: str,
+                   output_file_format: str) -> TranslationJob:
+        """为新请求分配唯一的工作目录并占用一个排队名额；队列已满时抛出 JobQueueFullError
+
+        检查队列长度与登记任务在同一次加锁中完成，并发请求不会同时通过检查而超出上限。
+        返回的任务必须随后交给 submit 执行，或在准备失败时调用 discard 释放名额。
+        """
+        self.cleanup_expired()
+        with self._lock:
+            queued = sum(1 for job in self._jobs.values() if job.status == QUEUED)
+            if queued >= self.max_queue_size:
+                raise JobQueueFullError(self.max_queue_size)
+            work_dir = tempfile.mkdtemp(prefix="job_", dir=self.temp_dir)
+            job = TranslationJob(filename, work_dir, source_language, target_language, output_file_format)
+            self._jobs[job.id] = job
+        return job
+
+    def submit(self, job: TranslationJob, run: Callable[[TranslationJob], Union[str, IO]]) -> TranslationJob:
+        """在线程池中执行 run(job)，其返回值（输出路径或文件对象）保存为 job.output_file"""
+        self._executor.submit(self._run, job, run)
+        LOG.info(f"任务 {job.id} 已排队: {job.filename}")
+        return job
+
+    def get(self, job_id: str) -> Optional[TranslationJob]:
+        self.cleanup_expired()
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list_jobs(self) -> List[TranslationJob]:
+        with self._lock:
+            return list(self._jobs.values())
+
+    def discard(self, job: TranslationJob):
+        """立即移除任务并删除其工作目录"""
+        with self._lock:
+            self._jobs.pop(job.id, None)
+        shutil.rmtree(job.work_dir, ignore_errors=True)
+
+    def cleanup_expired(self):
+        now = time.time()
+        with self._lock:
+            expired = [
+                job for job in self._jobs.values()
+                if job.finished and now - job.finished_at >= self.ttl_seconds
+            ]
+            for job in expired:
+                del self._jobs[job.id]
+        for job in expired:
+            shutil.rmtree(job.work_dir, ignore_errors=True)
+            LOG.info(f"任务 {job.id} 已过期，工作目录已删除")
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+    def _run(self, job: TranslationJob, run: Callable[[TranslationJob], Union[str, IO]]):
+        job.started_at = time.time()
+        job.status = RUNNING
+        status = FAILED
+        try:
+            job.output_file = run(job)
+            if not job.output_file:
+                raise ValueError(f"不支持文件类型: {job.output_file_format}")
+            status = SUCCEEDED
+        except Exception as e:
+            LOG.error(f"任务 {job.id} 翻译失败: {e}")
+            job.error = str(e)
+        finally:
+            # 输入文件不再需要，输出文件保留到任务过期
+            if os.path.exists(job.input_file):
+                os.remove(job.input_file)
+            # 先记录结束时间再更新状态，过期清理只看已结束的任务
+            job.finished_at = time.time()
+            job.status = status
+            job.done.set()
@@ -4,7 +4,7 @@ import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from utils import ArgumentParser, LOG
-from translator import PDFTranslator, TranslationConfig
+from translator import PDFTranslator, TranslationCache, TranslationConfig
 
 if __name__ == "__main__":
     # 解析命令行
@@ -16,5 +16,5 @@ if __name__ == "__main__":
     config.initialize(args)    
 
     # 实例化 PDFTranslator 类，并调用 translate_pdf() 方法
-    translator = PDFTranslator(config.model_name)
+    translator = PDFTranslator(config.model_name, config.max_concurrency, TranslationCache.from_config(config))
     translator.translate_pdf(config.input_file, config.output_file_format, pages=None)
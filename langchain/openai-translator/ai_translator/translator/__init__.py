@@ -1,2 +1,3 @@
 from .pdf_translator import PDFTranslator
-from .translation_config import TranslationConfig
\ No newline at end of file
+from .translation_config import TranslationConfig
+from .translation_cache import TranslationCache
\ No newline at end of file
@@ -32,7 +32,8 @@ class PDFParser:
                 for table_data in tables:
                     for row in table_data:
                         for cell in row:
-                            raw_text = raw_text.replace(cell, "", 1)
+                            if cell:
+                                raw_text = raw_text.replace(cell, "", 1)
 
                 # Handling text
                 if raw_text:
@@ -47,9 +48,11 @@ class PDFParser:
 
 
 
-                # Handling tables
-                if tables:
-                    table = TableContent(tables)
+                # Handling tables: 每个表格单独成块，按单元格结构化翻译
+                for table_data in tables:
+                    if not table_data:
+                        continue
+                    table = TableContent(table_data)
                     page.add_content(table)
                     LOG.debug(f"[table]\n{table}")
 
@@ -1,12 +1,16 @@
-from typing import Optional
+from typing import IO, Iterator, Optional, Tuple, Union
+from langchain_core.language_models import BaseChatModel
+from book import ContentType
 from translator.pdf_parser import PDFParser
 from translator.writer import Writer
-from translator.translation_chain import TranslationChain
+from translator.translation_cache import TranslationCache
+from translator.translation_chain import TranslationChain, DEFAULT_MAX_CONCURRENCY
 from utils import LOG
 
 class PDFTranslator:
-    def __init__(self, model_name: str):
-        self.translate_chain = TranslationChain(model_name)
+    def __init__(self, model_name: str, max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+                 cache: Optional[TranslationCache] = None, llm: Optional[BaseChatModel] = None):
+        self.translate_chain = TranslationChain(model_name, max_concurrency=max_concurrency, cache=cache, llm=llm)
         self.pdf_parser = PDFParser()
         self.writer = Writer()
 
@@ -15,15 +19,74 @@ class PDFTranslator:
                     output_file_format: str = 'markdown',
                     source_language: str = "English",
                     target_language: str = 'Chinese',
-                    pages: Optional[int] = None):
-        
-        self.book = self.pdf_parser.parse_pdf(input_file, pages)
-
-        for page_idx, page in enumerate(self.book.pages):
-            for content_idx, content in enumerate(page.contents):
-                # Translate content.original
-                translation, status = self.translate_chain.run(content, source_language, target_language)
-                # Update the content in self.book.pages directly
-                self.book.pages[page_idx].contents[content_idx].set_translation(translation, status)
-        
-        return self.writer.save_translated_book(self.book, output_file_format)
+                    pages: Optional[int] = None,
+                    output: Optional[Union[str, IO]] = None):
+        """output 为输出路径或可写的文件对象，为 None 时写到输入文件旁边"""
+
+        # book 只在本次调用内使用，同一个 PDFTranslator 可以被多个请求并发调用
+        book = self.pdf_parser.parse_pdf(input_file, pages)
+
+        # 整本书的内容块一次性批量提交，由 TranslationChain 控制并发
+        contents = [content for page in book.pages for content in page.contents]
+        texts = [content for content in contents if content.content_type != ContentType.TABLE]
+        tables = [content for content in contents if content.content_type == ContentType.TABLE]
+        LOG.info(f"开始批量翻译 {len(texts)} 个文本块、{len(tables)} 个表格")
+        results = self.translate_chain.run_batch(
+            [(content, source_language, target_language) for content in texts]
+        )
+
+        for content, (translation, status) in zip(texts, results):
+            # Update the content in book.pages directly
+            content.set_translation(translation, status)
+
+        self._translate_tables(tables, source_language, target_language)
+
+        self._log_cache_stats()
+        return self.writer.save_translated_book(book, output_file_format, output)
+
+    def stream_translate_pdf(self,
+                    input_file: str,
+                    output_file_format: str = 'markdown',
+                    source_language: str = "English",
+                    target_language: str = 'Chinese',
+                    pages: Optional[int] = None,
+                    output: Optional[Union[str, IO]] = None) -> Iterator[Tuple[str, str]]:
+        """逐块流式翻译，产出 ("token", 文本片段)、("block_end", "") 事件，最后产出 ("done", 输出文件路径或文件对象)"""
+        book = self.pdf_parser.parse_pdf(input_file, pages)
+
+        for page in book.pages:
+            for content in page.contents:
+                if content.content_type == ContentType.TABLE:
+                    # 表格按单元格结构化翻译，整体完成后再输出
+                    self._translate_tables([content], source_language, target_language)
+                    yield "block_end", ""
+                    continue
+
+                chunks = []
+                status = True
+                try:
+                    for chunk in self.translate_chain.stream(content, source_language, target_language):
+                        chunks.append(chunk)
+                        yield "token", chunk
+                except Exception as e:
+                    LOG.error(f"An error occurred during translation: {e}")
+                    status = False
+                content.set_translation("".join(chunks) if status else "", status)
+                yield "block_end", ""
+
+        self._log_cache_stats()
+        yield "done", self.writer.save_translated_book(book, output_file_format, output)
+
+    def _translate_tables(self, tables, source_language: str, target_language: str):
+        """只翻译每个表格中去重后的非数字单元格，再按单元格映射回原表格结构"""
+        cells = [table.translatable_cells() for table in tables]
+        results = self.translate_chain.run_cells_batch(
+            [(table_cells, source_language, target_language) for table_cells in cells]
+        )
+        for table, table_cells, (translations, status) in zip(tables, cells, results):
+            table.apply_cell_translations(table_cells, translations, status)
+
+    def _log_cache_stats(self):
+        stats = self.translate_chain.cache_stats()
+        if stats is not None:
+            LOG.info(f"翻译缓存: 命中 {stats['hits']} 次，未命中 {stats['misses']} 次，命中率 {stats['hit_ratio']:.1%}")
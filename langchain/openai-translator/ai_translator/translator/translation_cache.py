@@ -0,0 +1,107 @@
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from utils import LOG
+
+class TranslationCache:
+    """模型响应缓存：内存 LRU 在前，本地 SQLite 持久化在后
+
+    TranslationChain 只依赖 make_key / get / put / stats 四个方法，
+    可以替换为任何实现了相同接口的缓存（例如 Redis）。
+    db_path 为 None 时只使用内存缓存。
+    """
+
+    def __init__(self, db_path: Optional[str] = "translation_cache.db", max_memory_entries: int = 1024):
+        self.db_path = db_path
+        self.max_memory_entries = max_memory_entries
+        self.hits = 0
+        self.misses = 0
+        self._memory: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        if db_path:
+            self._conn = sqlite3.connect(db_path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            with self._conn:
+                self._conn.execute(
+                    "CREATE TABLE IF NOT EXISTS responses ("
+                    " key TEXT PRIMARY KEY,"
+                    " response TEXT NOT NULL,"
+                    " created_at REAL NOT NULL)"
+                )
+
+    @classmethod
+    def from_config(cls, config) -> Optional["TranslationCache"]:
+        """按 TranslationConfig 创建缓存；cache_file 为空时不启用缓存"""
+        if not config.cache_file:
+            return None
+        return cls(config.cache_file, config.cache_memory_entries)
+
+    @staticmethod
+    def make_key(model_name: str, prompt_template: str, source_language: str,
+                 target_language: str, text: str) -> str:
+        raw = "\0".join([model_name, prompt_template, source_language, target_language, text])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            response = self._memory.get(key)
+            if response is not None:
+                self._memory.move_to_end(key)
+            elif self._conn is not None:
+                row = self._conn.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    response = row[0]
+                    self._remember(key, response)
+            if response is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return response
+
+    def put(self, key: str, response: str):
+        with self._lock:
+            self._remember(key, response)
+            if self._conn is not None:
+                with self._conn:
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO responses (key, response, created_at) VALUES (?, ?, ?)",
+                        (key, response, time.time())
+                    )
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            stored = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0] if self._conn else len(self._memory)
+            return {
+                "memory_entries": len(self._memory),
+                "stored_entries": stored,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self._conn is not None:
+                with self._conn:
+                    self._conn.execute("DELETE FROM responses")
+        LOG.info("翻译缓存已清空")
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _remember(self, key: str, response: str):
+        self._memory[key] = response
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
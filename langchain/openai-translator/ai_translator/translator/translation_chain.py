@@ -1,12 +1,27 @@
+import json
+from typing import AsyncIterator, Iterator, List, Optional, Tuple
+
 from langchain_openai import ChatOpenAI
-from langchain.chains import LLMChain
+from langchain_core.language_models import BaseChatModel
+from langchain_core.output_parsers import StrOutputParser
 
+from translator.translation_cache import TranslationCache
 from utils import LOG
 from langchain_core.prompts import ChatPromptTemplate, HumanMessagePromptTemplate, SystemMessagePromptTemplate
 
+# 批量翻译时默认同时发往模型的请求数
+DEFAULT_MAX_CONCURRENCY = 5
+
 class TranslationChain:
-    def __init__(self, model_name: str = "gpt-3.5-turbo", verbose: bool = True):
-        
+    def __init__(self, model_name: str = "gpt-3.5-turbo", verbose: bool = True,
+                 max_concurrency: int = DEFAULT_MAX_CONCURRENCY, cache: Optional[TranslationCache] = None,
+                 llm: Optional[BaseChatModel] = None):
+        """llm 为 None 时按 model_name 创建 ChatOpenAI；也可以传入任何 LangChain 聊天模型（例如测试用的假模型）"""
+        self.model_name = model_name
+        self.max_concurrency = max_concurrency
+        # 可选的响应缓存，命中时不再请求模型
+        self.cache = cache
+
         # 翻译任务指令始终由 System 角色承担
         template = (
             """You are a translation expert, proficient in various languages. \n
@@ -18,26 +33,211 @@ class TranslationChain:
         human_template = "{text}"
         human_message_prompt = HumanMessagePromptTemplate.from_template(human_template)
 
+        # 提示模板参与缓存键，修改模板后旧的缓存自然失效
+        self.prompt_template = template + "\0" + human_template
+
         # 使用 System 和 Human 角色的提示模板构造 ChatPromptTemplate
         chat_prompt_template = ChatPromptTemplate.from_messages(
             [system_message_prompt, human_message_prompt]
         )
 
         # 为了翻译结果的稳定性，将 temperature 设置为 0
-        chat = ChatOpenAI(model_name=model_name, temperature=0, verbose=verbose)
+        chat = llm if llm is not None else ChatOpenAI(model_name=model_name, temperature=0, verbose=verbose)
 
-        self.chain = LLMChain(llm=chat, prompt=chat_prompt_template, verbose=verbose)
+        # LCEL：prompt | model | parser，单条、批量与流式调用共用同一个 runnable
+        self.chain = chat_prompt_template | chat | StrOutputParser()
+
+        # 表格只发送去重后的单元格文本（JSON 数组），并要求按原顺序返回 JSON 数组
+        table_template = (
+            """You are a translation expert, proficient in various languages. \n
+            Translate every string in the JSON array from {source_language} to {target_language}.
+            Reply with only a JSON array of the translated strings, with the same length and order."""
+        )
+        self.table_prompt_template = table_template + "\0" + human_template
+        table_prompt_template = ChatPromptTemplate.from_messages(
+            [SystemMessagePromptTemplate.from_template(table_template), human_message_prompt]
+        )
+        self.table_chain = table_prompt_template | chat | StrOutputParser()
 
     def run(self, text: str, source_language: str, target_language: str) -> (str, bool):
+        cached, key = self._lookup(text, source_language, target_language)
+        if cached is not None:
+            return cached, True
+
         result = ""
         try:
-            result = self.chain.run({
-                "text": text,
-                "source_language": source_language,
-                "target_language": target_language,
-            })
+            result = self.chain.invoke(self._inputs(text, source_language, target_language))
         except Exception as e:
             LOG.error(f"An error occurred during translation: {e}")
             return result, False
 
-        return result, True
\ No newline at end of file
+        self._store(key, result)
+        return result, True
+
+    def stream(self, text: str, source_language: str, target_language: str) -> Iterator[str]:
+        """逐段产出译文，模型返回第一个 token 后即可开始显示；出错时抛出异常"""
+        cached, key = self._lookup(text, source_language, target_language)
+        if cached is not None:
+            yield cached
+            return
+
+        chunks = []
+        for chunk in self.chain.stream(self._inputs(text, source_language, target_language)):
+            chunks.append(chunk)
+            yield chunk
+        self._store(key, "".join(chunks))
+
+    async def astream(self, text: str, source_language: str, target_language: str) -> AsyncIterator[str]:
+        """stream 的异步版本"""
+        cached, key = self._lookup(text, source_language, target_language)
+        if cached is not None:
+            yield cached
+            return
+
+        chunks = []
+        async for chunk in self.chain.astream(self._inputs(text, source_language, target_language)):
+            chunks.append(chunk)
+            yield chunk
+        self._store(key, "".join(chunks))
+
+    def run_batch(self, items: List[Tuple[str, str, str]],
+                  max_concurrency: Optional[int] = None) -> List[Tuple[str, bool]]:
+        """并发翻译多个 (text, source_language, target_language)，按输入顺序返回 (译文, 是否成功)
+
+        单个条目失败不影响其余条目，失败条目返回 ("", False)。
+        """
+        if not items:
+            return []
+        results, keys, pending = self._lookup_batch(items)
+        if pending:
+            outputs = self.chain.batch(
+                [self._inputs(*items[index]) for index in pending],
+                config=self._batch_config(max_concurrency),
+                return_exceptions=True,
+            )
+            self._fill_batch(results, keys, pending, outputs)
+        return results
+
+    async def arun_batch(self, items: List[Tuple[str, str, str]],
+                         max_concurrency: Optional[int] = None) -> List[Tuple[str, bool]]:
+        """run_batch 的异步版本"""
+        if not items:
+            return []
+        results, keys, pending = self._lookup_batch(items)
+        if pending:
+            outputs = await self.chain.abatch(
+                [self._inputs(*items[index]) for index in pending],
+                config=self._batch_config(max_concurrency),
+                return_exceptions=True,
+            )
+            self._fill_batch(results, keys, pending, outputs)
+        return results
+
+    def run_cells_batch(self, items: List[Tuple[List[str], str, str]],
+                        max_concurrency: Optional[int] = None) -> List[Tuple[Optional[List[str]], bool]]:
+        """并发翻译多组表格单元格 (cells, source_language, target_language)
+
+        每组单元格以 JSON 数组发送，返回与输入等长的译文列表；回复无法解析或长度不符时返回 (None, False)。
+        """
+        if not items:
+            return []
+        results: List[Optional[Tuple[Optional[List[str]], bool]]] = [None] * len(items)
+        requests = []
+        for index, (cells, source_language, target_language) in enumerate(items):
+            if cells:
+                requests.append((index, (json.dumps(cells, ensure_ascii=False), source_language, target_language)))
+            else:
+                results[index] = ([], True)
+        if not requests:
+            return results
+
+        replies, keys, pending = self._lookup_batch([item for _, item in requests], self.table_prompt_template)
+        if pending:
+            outputs = self.table_chain.batch(
+                [self._inputs(*requests[position][1]) for position in pending],
+                config=self._batch_config(max_concurrency),
+                return_exceptions=True,
+            )
+            for position, output in zip(pending, outputs):
+                replies[position] = self._batch_result(output)
+
+        for position, (index, _) in enumerate(requests):
+            reply, status = replies[position]
+            cells = items[index][0]
+            translations = self._parse_cells(reply, len(cells)) if status else None
+            results[index] = (translations, translations is not None)
+            # 只缓存解析成功的回复
+            if translations is not None and position in pending:
+                self._store(keys[position], reply)
+        return results
+
+    @staticmethod
+    def _parse_cells(reply: str, expected: int) -> Optional[List[str]]:
+        text = reply.strip()
+        # 去掉模型可能添加的 ```json 代码块标记
+        if text.startswith("```"):
+            text = text.strip("`")
+            if text.lower().startswith("json"):
+                text = text[4:]
+        try:
+            translations = json.loads(text)
+        except ValueError:
+            LOG.error(f"An error occurred during table translation: reply is not a JSON array\n{reply}")
+            return None
+        if not isinstance(translations, list) or len(translations) != expected:
+            LOG.error(f"An error occurred during table translation: expected {expected} cells\n{reply}")
+            return None
+        return [str(translation) for translation in translations]
+
+    def cache_stats(self) -> Optional[dict]:
+        return self.cache.stats() if self.cache is not None else None
+
+    def _lookup(self, text: str, source_language: str, target_language: str,
+                prompt_template: Optional[str] = None) -> Tuple[Optional[str], Optional[str]]:
+        """返回 (缓存的译文, 缓存键)；未启用缓存时均为 None"""
+        if self.cache is None:
+            return None, None
+        key = self.cache.make_key(self.model_name, prompt_template or self.prompt_template,
+                                  source_language, target_language, str(text))
+        return self.cache.get(key), key
+
+    def _store(self, key: Optional[str], result: str):
+        if key is not None:
+            self.cache.put(key, result)
+
+    def _lookup_batch(self, items: List[Tuple[str, str, str]], prompt_template: Optional[str] = None):
+        """查询缓存，返回 (结果占位列表, 各条目的缓存键, 未命中条目的下标)"""
+        results: List[Optional[Tuple[str, bool]]] = [None] * len(items)
+        keys: List[Optional[str]] = [None] * len(items)
+        pending = []
+        for index, item in enumerate(items):
+            cached, keys[index] = self._lookup(*item, prompt_template=prompt_template)
+            if cached is not None:
+                results[index] = (cached, True)
+            else:
+                pending.append(index)
+        return results, keys, pending
+
+    def _fill_batch(self, results, keys, pending, outputs):
+        for index, output in zip(pending, outputs):
+            results[index] = self._batch_result(output)
+            if results[index][1]:
+                self._store(keys[index], results[index][0])
+
+    @staticmethod
+    def _inputs(text: str, source_language: str, target_language: str) -> dict:
+        return {
+            "text": str(text),
+            "source_language": source_language,
+            "target_language": target_language,
+        }
+
+    def _batch_config(self, max_concurrency: Optional[int]) -> dict:
+        return {"max_concurrency": max_concurrency or self.max_concurrency}
+
+    @staticmethod
+    def _batch_result(output) -> Tuple[str, bool]:
+        if isinstance(output, Exception):
+            LOG.error(f"An error occurred during translation: {output}")
+            return "", False
+        return output, True
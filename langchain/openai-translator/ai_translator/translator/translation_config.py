@@ -1,5 +1,16 @@
 import yaml
 
+# 配置文件中未出现的可选项使用的默认值
+DEFAULTS = {
+    "max_concurrency": 5,
+    "cache_file": "translation_cache.db",
+    "cache_memory_entries": 1024,
+    "flask_temp_dir": "flask_temps",
+    "flask_max_workers": 2,
+    "flask_max_queue_size": 16,
+    "flask_job_ttl_seconds": 3600,
+}
+
 class TranslationConfig:
     _instance = None
     
@@ -12,6 +23,7 @@ class TranslationConfig:
     def initialize(self, args):
         with open(args.config_file, "r") as f:
             config = yaml.safe_load(f)
+        config = {**DEFAULTS, **config}
 
         # Use the argparse Namespace to update the configuration
         overridden_values = {
@@ -1,4 +1,6 @@
+import io
 import os
+from typing import IO, Optional, Union
 from reportlab.lib import colors, pagesizes, units
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.pdfbase import pdfmetrics
@@ -14,27 +16,41 @@ class Writer:
     def __init__(self):
         pass
 
-    def save_translated_book(self, book: Book, ouput_file_format: str):
+    def save_translated_book(self, book: Book, ouput_file_format: str,
+                             output: Optional[Union[str, IO]] = None) -> Union[str, IO]:
+        """导出译文
+
+        Args:
+            output: 输出文件路径，或可写的文件对象（如 HTTP 响应使用的 BytesIO）；
+                为 None 时写到原 PDF 旁边的 *_translated 文件
+        Returns:
+            输出文件路径或传入的文件对象；不支持的格式返回 ""
+        """
         LOG.debug(ouput_file_format)
 
         if ouput_file_format.lower() == "pdf":
-            output_file_path = self._save_translated_book_pdf(book)
+            output = self._save_translated_book_pdf(book, output)
         elif ouput_file_format.lower() == "markdown":
-            output_file_path = self._save_translated_book_markdown(book)
+            output = self._save_translated_book_markdown(book, output)
         else:
             LOG.error(f"不支持文件类型: {ouput_file_format}")
             return ""
 
-        LOG.info(f"翻译完成，文件保存至: {output_file_path}")
+        LOG.info(f"翻译完成，文件保存至: {self._describe(output)}")
 
-        return output_file_path
+        return output
+
+    @staticmethod
+    def _describe(output: Union[str, IO]) -> str:
+        return output if isinstance(output, str) else f"<{type(output).__name__}>"
 
 
-    def _save_translated_book_pdf(self, book: Book, output_file_path: str = None):
+    def _save_translated_book_pdf(self, book: Book, output_file_path: Optional[Union[str, IO]] = None):
 
-        output_file_path = book.pdf_file_path.replace('.pdf', f'_translated.pdf')
+        if output_file_path is None:
+            output_file_path = book.pdf_file_path.replace('.pdf', f'_translated.pdf')
 
-        LOG.info(f"开始导出: {output_file_path}")
+        LOG.info(f"开始导出: {self._describe(output_file_path)}")
 
         # Register Chinese font
         font_path = "../fonts/simsun.ttc"  # 请将此路径替换为您的字体文件路径
@@ -84,31 +100,43 @@ class Writer:
         return output_file_path
 
 
-    def _save_translated_book_markdown(self, book: Book, output_file_path: str = None):
-        output_file_path = book.pdf_file_path.replace('.pdf', f'_translated.md')
-
-        LOG.info(f"开始导出: {output_file_path}")
-        with open(output_file_path, 'w', encoding='utf-8') as output_file:
-            # Iterate over the pages and contents
-            for page in book.pages:
-                for content in page.contents:
-                    if content.status:
-                        if content.content_type == ContentType.TEXT:
-                            # Add translated text to the Markdown file
-                            text = content.translation
-                            output_file.write(text + '\n\n')
-
-                        elif content.content_type == ContentType.TABLE:
-                            # Add table to the Markdown file
-                            table = content.translation
-                            header = '| ' + ' | '.join(str(column) for column in table.columns) + ' |' + '\n'
-                            separator = '| ' + ' | '.join(['---'] * len(table.columns)) + ' |' + '\n'
-                            # body = '\n'.join(['| ' + ' | '.join(row) + ' |' for row in table.values.tolist()]) + '\n\n'
-                            body = '\n'.join(['| ' + ' | '.join(str(cell) for cell in row) + ' |' for row in table.values.tolist()]) + '\n\n'
-                            output_file.write(header + separator + body)
-
-                # Add a page break (horizontal rule) after each page except the last one
-                if page != book.pages[-1]:
-                    output_file.write('---\n\n')
-
-        return output_file_path
\ No newline at end of file
+    def _save_translated_book_markdown(self, book: Book, output_file_path: Optional[Union[str, IO]] = None):
+        if output_file_path is None:
+            output_file_path = book.pdf_file_path.replace('.pdf', f'_translated.md')
+
+        LOG.info(f"开始导出: {self._describe(output_file_path)}")
+        if isinstance(output_file_path, str):
+            with open(output_file_path, 'w', encoding='utf-8') as output_file:
+                self._write_markdown(book, output_file)
+        elif isinstance(output_file_path, io.TextIOBase):
+            self._write_markdown(book, output_file_path)
+        else:
+            # 二进制流（BytesIO、HTTP 响应等）按 UTF-8 编码写入
+            buffer = io.StringIO()
+            self._write_markdown(book, buffer)
+            output_file_path.write(buffer.getvalue().encode('utf-8'))
+
+        return output_file_path
+
+    def _write_markdown(self, book: Book, output_file):
+        # Iterate over the pages and contents
+        for page in book.pages:
+            for content in page.contents:
+                if content.status:
+                    if content.content_type == ContentType.TEXT:
+                        # Add translated text to the Markdown file
+                        text = content.translation
+                        output_file.write(text + '\n\n')
+
+                    elif content.content_type == ContentType.TABLE:
+                        # Add table to the Markdown file
+                        table = content.translation
+                        header = '| ' + ' | '.join(str(column) for column in table.columns) + ' |' + '\n'
+                        separator = '| ' + ' | '.join(['---'] * len(table.columns)) + ' |' + '\n'
+                        # body = '\n'.join(['| ' + ' | '.join(row) + ' |' for row in table.values.tolist()]) + '\n\n'
+                        body = '\n'.join(['| ' + ' | '.join(str(cell) for cell in row) + ' |' for row in table.values.tolist()]) + '\n\n'
+                        output_file.write(header + separator + body)
+
+            # Add a page break (horizontal rule) after each page except the last one
+            if page != book.pages[-1]:
+                output_file.write('---\n\n')
@@ -9,6 +9,7 @@ class ArgumentParser:
         self.parser.add_argument('--output_file_format', type=str, help='The file format of translated book. Now supporting PDF and Markdown')
         self.parser.add_argument('--source_language', type=str, help='The language of the original book to be translated.')
         self.parser.add_argument('--target_language', type=str, help='The target language for translating the original book.')
+        self.parser.add_argument('--max_concurrency', type=int, help='Maximum number of content blocks translated concurrently.')
 
     def parse_arguments(self):
         args = self.parser.parse_args()
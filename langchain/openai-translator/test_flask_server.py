@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Flask 翻译服务测试脚本
+使用 Flask 测试客户端与假聊天模型验证同步、异步与流式接口，不调用真实的 OpenAI 服务
+"""
+
+import sys
+import os
+import json
+import shutil
+import tempfile
+import threading
+import time
+
+# 添加路径
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ai_translator'))
+
+from test_translation_chain import TEST_PDF, EchoChatModel
+
+
+def make_client(llm=None, **job_options):
+    """把 flask_server 的全局翻译器与任务管理器替换为假模型与临时目录，返回 (测试客户端, 任务管理器, 临时目录)"""
+    import flask_server
+    from job_manager import JobManager
+    from translator import PDFTranslator, TranslationCache
+
+    work_dir = tempfile.mkdtemp()
+    flask_server.Translator = PDFTranslator("fake-model", llm=llm or EchoChatModel(), cache=TranslationCache(None))
+    flask_server.Jobs = JobManager(temp_dir=work_dir, **job_options)
+    return flask_server.app.test_client(), flask_server.Jobs, work_dir
+
+
+def upload(client, path: str, **form):
+    with open(TEST_PDF, "rb") as f:
+        return client.post(path, data={"input_file": (f, "test.pdf"), "output_file_format": "markdown", **form},
+                           content_type="multipart/form-data")
+
+
+def wait_for_job(client, job_id: str, timeout: float = 30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = client.get(f"/jobs/{job_id}").get_json()
+        if job["status"] in {"succeeded", "failed"}:
+            return job
+        time.sleep(0.05)
+    raise TimeoutError(f"任务 {job_id} 未在 {timeout} 秒内完成")
+
+
+def test_async_jobs():
+    """测试异步任务：提交、查询状态、下载结果"""
+    print("🧪 测试异步任务接口...")
+
+    client, jobs, work_dir = make_client()
+
+    response = upload(client, "/jobs", target_language="Japanese")
+    assert response.status_code == 202, response.get_data(as_text=True)
+    job_id = response.get_json()["job_id"]
+    assert response.get_json()["status_url"] == f"/jobs/{job_id}"
+
+    job = wait_for_job(client, job_id)
+    assert job["status"] == "succeeded" and job["target_language"] == "Japanese", job
+    assert job["result_url"] == f"/jobs/{job_id}/result"
+    assert [item["job_id"] for item in client.get("/jobs").get_json()] == [job_id]
+
+    result = client.get(job["result_url"])
+    assert result.status_code == 200 and "译文:" in result.get_data(as_text=True)
+    assert 'filename=test_translated.md' in result.headers["Content-Disposition"]
+    result.close()
+    print("   ✅ 任务完成后可下载译文")
+
+    assert client.get("/jobs/missing").status_code == 404
+    assert client.get("/jobs/missing/result").status_code == 404
+    assert client.post("/jobs", data={}).status_code == 400
+    assert client.get("/cache/stats").get_json()["enabled"] is True
+    print("   ✅ 未知任务返回 404，缺少文件返回 400")
+
+    jobs.shutdown()
+    shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def test_sync_translation():
+    """测试同步翻译直接返回内存中的译文，返回前删除任务与临时目录"""
+    print("🧪 测试同步翻译接口...")
+
+    client, jobs, work_dir = make_client()
+
+    response = upload(client, "/translation")
+    assert response.status_code == 200
+    assert "译文:" in response.get_data(as_text=True)
+    response.close()
+    assert jobs.list_jobs() == [] and os.listdir(work_dir) == []
+    print("   ✅ 返回译文后任务与临时目录已清理")
+
+    response = upload(client, "/translation", output_file_format="docx")
+    assert response.status_code == 400 and "docx" in response.get_json()["message"], response.get_json()
+    assert jobs.list_jobs() == [] and os.listdir(work_dir) == []
+    print("   ✅ 不支持的格式返回 400 并清理任务")
+
+    jobs.shutdown()
+    shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def test_streaming_translation():
+    """测试 NDJSON 流式接口按内容块转发译文，结束后可通过 result_url 下载"""
+    print("🧪 测试流式翻译接口...")
+
+    client, jobs, work_dir = make_client()
+
+    response = upload(client, "/translation/stream")
+    assert response.status_code == 200 and response.mimetype == "application/x-ndjson"
+    events = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    kinds = [event["type"] for event in events]
+    assert "token" in kinds and "block_end" in kinds and kinds[-1] == "done", kinds
+    streamed = "".join(event["text"] for event in events if event["type"] == "token")
+    assert streamed.startswith("译文:")
+
+    result = client.get(events[-1]["result_url"])
+    assert result.status_code == 200 and streamed.split("\n")[0] in result.get_data(as_text=True)
+    result.close()
+    print(f"   ✅ 流式产出 {kinds.count('token')} 个片段、{kinds.count('block_end')} 个内容块")
+
+    jobs.shutdown()
+    shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def test_queue_limit():
+    """测试排队任务达到上限时返回 503，并发创建任务不会超出上限"""
+    print("🧪 测试任务队列上限...")
+
+    from job_manager import JobQueueFullError, QUEUED, RUNNING
+
+    gate = threading.Event()
+    client, jobs, work_dir = make_client(EchoChatModel(gate=gate), max_workers=1, max_queue_size=1)
+
+    running_id = upload(client, "/jobs").get_json()["job_id"]
+    deadline = time.time() + 10
+    while jobs.get(running_id).status != RUNNING and time.time() < deadline:
+        time.sleep(0.01)
+    queued = upload(client, "/jobs")
+    assert queued.status_code == 202 and queued.get_json()["status"] == QUEUED
+    for path in ("/jobs", "/translation", "/translation/stream"):
+        rejected = upload(client, path)
+        assert rejected.status_code == 503, (path, rejected.status_code)
+        assert "queue is full" in rejected.get_json()["message"]
+    print("   ✅ 队列已满时三个接口都返回 503")
+
+    gate.set()
+    for job_id in (running_id, queued.get_json()["job_id"]):
+        assert wait_for_job(client, job_id)["status"] == "succeeded"
+    assert upload(client, "/jobs").status_code == 202
+    print("   ✅ 任务完成后可以继续提交")
+    jobs.shutdown()
+
+    # 并发请求同时检查队列长度时，名额在同一次加锁中占用，成功数不超过上限
+    shutil.rmtree(work_dir, ignore_errors=True)
+    _, jobs, work_dir = make_client(max_workers=1, max_queue_size=4)
+    barrier = threading.Barrier(16)
+    created, rejected = [], []
+
+    def reserve():
+        barrier.wait()
+        try:
+            created.append(jobs.create_job("test.pdf", "English", "Chinese", "markdown"))
+        except JobQueueFullError:
+            rejected.append(True)
+
+    threads = [threading.Thread(target=reserve) for _ in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(created) == 4 and len(rejected) == 12, (len(created), len(rejected))
+    for job in created:
+        jobs.discard(job)
+    assert jobs.list_jobs() == [] and jobs.create_job("test.pdf", "English", "Chinese", "markdown")
+    print("   ✅ 16 个并发请求只有 4 个占到名额，discard 释放名额")
+
+    jobs.shutdown()
+    shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def test_job_ttl():
+    """测试已结束的任务超过保留时间后被删除，工作目录一并清理"""
+    print("🧪 测试任务过期清理...")
+
+    client, jobs, work_dir = make_client(ttl_seconds=0.2)
+
+    job_id = upload(client, "/jobs").get_json()["job_id"]
+    job = jobs.get(job_id)
+    assert job.done.wait(30) and job.status == "succeeded"
+    assert os.path.exists(job.output_path()) and not os.path.exists(job.input_file)
+
+    time.sleep(0.3)
+    assert client.get(f"/jobs/{job_id}").status_code == 404
+    assert not os.path.exists(job.work_dir) and client.get("/jobs").get_json() == []
+    print("   ✅ 过期任务与工作目录已删除")
+
+    jobs.shutdown()
+    shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def main():
+    """运行所有测试"""
+    print("🚀 开始 Flask 翻译服务测试...\n")
+
+    tests = [
+        test_async_jobs,
+        test_sync_translation,
+        test_streaming_translation,
+        test_queue_limit,
+        test_job_ttl,
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test in tests:
+        # 测试函数通过断言报告失败，这里捕获异常以便继续运行其余测试
+        try:
+            test()
+            passed += 1
+        except Exception as e:
+            print(f"   ❌ {test.__name__} 失败: {type(e).__name__}: {e}")
+        print()
+
+    print(f"📊 测试结果: {passed}/{total} 通过")
+    return passed == total
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
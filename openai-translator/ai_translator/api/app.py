@@ -1,30 +1,59 @@
+import asyncio
+import json
 import os
 import tempfile
+import time
+from contextlib import asynccontextmanager
 from pathlib import Path
-from typing import Dict
+from typing import Dict, Tuple
 
-from fastapi import BackgroundTasks, FastAPI, File, Form, HTTPException, UploadFile
-from fastapi.responses import FileResponse
+from fastapi import FastAPI, File, Form, HTTPException, Request, UploadFile
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 
-from ..utils import ConfigLoader, LOG
-from ..model import GLMModel, OpenAIModel
+from ..utils import ConfigLoader, LOG, METRICS
+from ..utils.metrics import CONTENT_TYPE_LATEST
+from ..model import MODEL_REGISTRY, Model
 from ..translator import PDFTranslator
+from .jobs import JobManager, JobQueueFullError, JobStatus, TranslationJob
+from .result_cache import ResultCache, SingleFlight
+from .uploads import (
+    DEFAULT_CHUNK_SIZE, DEFAULT_MAX_UPLOAD_BYTES, EmptyUploadError, UploadTooLargeError, spool_upload
+)
 
 SUPPORTED_FORMATS = {"markdown", "pdf"}
 MEDIA_TYPES = {
     "markdown": "text/markdown",
     "pdf": "application/pdf",
 }
+REQUEST_DURATION = METRICS.histogram(
+    "api_request_duration_seconds", "HTTP request latency, by route, method and status code.",
+    ["route", "method", "status"])
+JOBS_IN_STATE = METRICS.gauge("api_jobs", "Translation jobs currently queued or running.", ["state"])
+CACHE_BYTES = METRICS.gauge("api_result_cache_bytes", "Bytes held by the result cache.")
+UPLOAD_ENDPOINTS = {"/translate", "/jobs"}
+# Room for multipart boundaries and form fields on top of the file itself.
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    yield
+    if _job_manager is not None:
+        _job_manager.shutdown()
 
 app = FastAPI(
     title="AI PDF Translator API",
-    description="Synchronous API for translating PDF documents using configured AI models.",
+    description="API for translating PDF documents using configured AI models, synchronously or as background jobs.",
     version="0.1.0",
+    lifespan=lifespan,
 )
 
 _BASE_DIR = Path(__file__).resolve().parents[2]
 _CONFIG_PATH = Path(os.getenv("AI_TRANSLATOR_CONFIG", _BASE_DIR / "config.yaml")).resolve()
 _config_cache: Dict = {}
+_job_manager: JobManager = None
+_result_cache: ResultCache = None
+_single_flight = SingleFlight()
 
 def get_config() -> Dict:
     global _config_cache
@@ -34,21 +63,92 @@ def get_config() -> Dict:
         LOG.info(f"Configuration loaded from {_CONFIG_PATH}")
     return _config_cache
 
-def build_model(model_type: str, config: Dict) -> object:
+def build_model(model_type: str, config: Dict) -> Model:
+    """Return the shared client for ``model_type``; clients are reused across requests."""
     if model_type == "GLMModel":
         glm_cfg = config.get("GLMModel", {})
         model_url = glm_cfg.get("model_url")
         timeout = glm_cfg.get("timeout", 300)
         if not model_url:
             raise HTTPException(status_code=500, detail="GLM model_url is not configured")
-        return GLMModel(model_url=model_url, timeout=timeout)
+        return MODEL_REGISTRY.get_glm_model(model_url=model_url, timeout=timeout)
 
     openai_cfg = config.get("OpenAIModel", {})
     model_name = openai_cfg.get("model")
     api_key = openai_cfg.get("api_key")
     if not model_name or not api_key:
         raise HTTPException(status_code=500, detail="OpenAI model configuration is incomplete")
-    return OpenAIModel(model=model_name, api_key=api_key)
+    return MODEL_REGISTRY.get_openai_model(model=model_name, api_key=api_key, base_url=openai_cfg.get("base_url"))
+
+def get_job_manager() -> JobManager:
+    global _job_manager
+    if _job_manager is None:
+        api_cfg = get_config().get("api", {})
+        _job_manager = JobManager(
+            max_workers=api_cfg.get("max_workers", 2),
+            max_queue_size=api_cfg.get("max_queue_size", 16),
+            ttl_seconds=api_cfg.get("job_ttl_seconds", 3600),
+        )
+        JOBS_IN_STATE.set_function(_job_manager.queued_count, state="queued")
+        JOBS_IN_STATE.set_function(_job_manager.running_count, state="running")
+    return _job_manager
+
+def get_result_cache() -> ResultCache:
+    global _result_cache
+    if _result_cache is None:
+        config = get_config()
+        api_cfg = config.get("api", {})
+        cache_dir = api_cfg.get("cache_dir") or get_output_dir(config) / ".cache"
+        _result_cache = ResultCache(
+            cache_dir=Path(cache_dir).resolve(),
+            max_bytes=api_cfg.get("cache_max_bytes", 1 << 30),
+            max_age_seconds=api_cfg.get("cache_max_age_seconds", 7 * 24 * 3600),
+        )
+        CACHE_BYTES.set_function(lambda: get_result_cache().stats()["bytes"])
+    return _result_cache
+
+def get_output_dir(config: Dict) -> Path:
+    output_dir = Path(config.get("common", {}).get("output_dir", "./output")).resolve()
+    output_dir.mkdir(parents=True, exist_ok=True)
+    return output_dir
+
+def resolve_request_options(file: UploadFile, target_language: str, file_format: str, config: Dict) -> Tuple[str, str]:
+    if not file or not file.filename:
+        raise HTTPException(status_code=400, detail="No file uploaded")
+
+    if file.content_type not in {"application/pdf", "application/octet-stream"} and not file.filename.lower().endswith(".pdf"):
+        raise HTTPException(status_code=400, detail="Only PDF files are supported")
+
+    desired_format = (file_format or config.get("common", {}).get("file_format", "markdown")).lower()
+    if desired_format not in SUPPORTED_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported file format: {desired_format}")
+
+    language = target_language or config.get("common", {}).get("target_language", "中文")
+    return language, desired_format
+
+def get_max_upload_bytes() -> int:
+    return get_config().get("api", {}).get("max_upload_bytes", DEFAULT_MAX_UPLOAD_BYTES)
+
+async def save_upload(file: UploadFile, directory: Path = None) -> Tuple[Path, str]:
+    """Spool the upload to a temporary file, returning its path and SHA-256 digest."""
+    chunk_size = get_config().get("api", {}).get("upload_chunk_size", DEFAULT_CHUNK_SIZE)
+    try:
+        path, digest, _ = await spool_upload(file, directory, get_max_upload_bytes(), chunk_size)
+    except UploadTooLargeError as exc:
+        raise HTTPException(status_code=413, detail=str(exc)) from exc
+    except EmptyUploadError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    return path, digest
+
+def output_filename_for(filename: str, file_format: str) -> str:
+    output_suffix = "md" if file_format == "markdown" else "pdf"
+    return f"{Path(filename).stem}_translated.{output_suffix}"
+
+def ascii_header(value: str) -> str:
+    try:
+        return value.encode('ascii', 'ignore').decode('ascii') or 'unknown'
+    except Exception:
+        return 'unknown'
 
 def cleanup_files(paths):
     for path in paths:
@@ -58,73 +158,195 @@ def cleanup_files(paths):
         except Exception as exc:
             LOG.warning(f"Failed to remove temporary file {path}: {exc}")
 
+@app.middleware("http")
+async def reject_oversized_uploads(request: Request, call_next):
+    # Refuse before the multipart body is parsed and spooled when the client declares its size.
+    if request.method == "POST" and request.url.path in UPLOAD_ENDPOINTS:
+        content_length = request.headers.get("content-length")
+        max_bytes = get_max_upload_bytes()
+        if content_length and content_length.isdigit() and int(content_length) > max_bytes + MULTIPART_OVERHEAD_BYTES:
+            return JSONResponse(status_code=413, content={"detail": str(UploadTooLargeError(max_bytes))})
+    return await call_next(request)
+
+# Registered after the upload check so it runs outermost and also records early 413 rejections.
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        REQUEST_DURATION.observe(
+            time.perf_counter() - started,
+            # Requests rejected before routing (e.g. oversized uploads) have no route; keep their known path.
+            route=getattr(route, "path", None) or (request.url.path if request.url.path in UPLOAD_ENDPOINTS else "unmatched"),
+            method=request.method,
+            status=str(status),
+        )
+
 @app.get("/health")
 def health_check():
     return {"status": "ok"}
 
+@app.get("/metrics")
+def metrics():
+    return Response(content=METRICS.render(), media_type=CONTENT_TYPE_LATEST)
+
 @app.post("/translate")
 async def translate_pdf(
-    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     target_language: str = Form(None),
     file_format: str = Form("markdown"),
     model_type: str = Form("OpenAIModel"),
 ):
-    if not file or not file.filename:
-        raise HTTPException(status_code=400, detail="No file uploaded")
-
-    if file.content_type not in {"application/pdf", "application/octet-stream"} and not file.filename.lower().endswith(".pdf"):
-        raise HTTPException(status_code=400, detail="Only PDF files are supported")
-
     config = get_config()
+    language, desired_format = resolve_request_options(file, target_language, file_format, config)
+    model = build_model(model_type, config)
 
-    desired_format = (file_format or config.get("common", {}).get("file_format", "markdown")).lower()
-    if desired_format not in SUPPORTED_FORMATS:
-        raise HTTPException(status_code=400, detail=f"Unsupported file format: {desired_format}")
+    output_dir = get_output_dir(config)
+    temp_path, upload_hash = await save_upload(file)
+    cache = get_result_cache()
+    cache_key = ResultCache.make_key(upload_hash, language, desired_format, model_type)
+    output_filename = output_filename_for(file.filename, desired_format)
 
-    language = target_language or config.get("common", {}).get("target_language", "中文")
-    translator = PDFTranslator(build_model(model_type, config))
-
-    output_dir = Path(config.get("common", {}).get("output_dir", "./output")).resolve()
-    output_dir.mkdir(parents=True, exist_ok=True)
-
-    suffix = ".pdf"
-    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
-        file_bytes = await file.read()
-        if not file_bytes:
-            raise HTTPException(status_code=400, detail="Uploaded file is empty")
-        tmp.write(file_bytes)
-        temp_path = Path(tmp.name)
-
-    output_suffix = "md" if desired_format == "markdown" else "pdf"
-    output_filename = f"{Path(file.filename).stem}_translated.{output_suffix}"
-    output_path = output_dir / output_filename
-
-    try:
-        translator.translate_pdf(
+    def translate_and_cache() -> Path:
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return cached
+        output_path = output_dir / f"{temp_path.stem}_{output_filename}"
+        PDFTranslator(model, **PDFTranslator.options_from_config(config)).translate_pdf(
             pdf_file_path=str(temp_path),
             file_format=desired_format,
             target_language=language,
             output_file_path=str(output_path),
         )
+        return cache.put(cache_key, output_path)
+
+    try:
+        output_path = await run_in_threadpool(_single_flight.do, cache_key, translate_and_cache)
     except Exception as exc:
-        cleanup_files([temp_path])
         LOG.error(f"Translation failed: {exc}")
         raise HTTPException(status_code=500, detail=f"Translation failed: {exc}") from exc
+    finally:
+        cleanup_files([temp_path])
+
+    return FileResponse(
+        path=str(output_path),
+        media_type=MEDIA_TYPES[desired_format],
+        filename=output_filename,
+        headers={"X-Translation-Language": ascii_header(language)},
+    )
+
+def run_translation_job(job: TranslationJob) -> Path:
+    config = get_config()
+    translator = PDFTranslator(build_model(job.model_type, config), **PDFTranslator.options_from_config(config))
+    output_path = job.work_dir / output_filename_for(job.filename, job.file_format)
+
+    def progress_callback(page_idx, content_idx, total_contents):
+        job.check_cancelled()
+        job.update_progress(page_idx, len(translator.book.pages), content_idx, total_contents)
+
+    job.check_cancelled()
+    translator.translate_pdf(
+        pdf_file_path=str(job.input_path),
+        file_format=job.file_format,
+        target_language=job.target_language,
+        output_file_path=str(output_path),
+        progress_callback=progress_callback,
+    )
+    if job.cache_key:
+        return get_result_cache().put(job.cache_key, output_path)
+    return output_path
 
-    background_tasks.add_task(cleanup_files, [temp_path, output_path])
+def get_job_or_404(job_id: str) -> TranslationJob:
+    job = get_job_manager().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+    return job
+
+@app.post("/jobs", status_code=202)
+async def submit_job(
+    file: UploadFile = File(...),
+    target_language: str = Form(None),
+    file_format: str = Form("markdown"),
+    model_type: str = Form("OpenAIModel"),
+):
+    config = get_config()
+    language, desired_format = resolve_request_options(file, target_language, file_format, config)
+    # Fail fast on a misconfigured model instead of queueing a job that cannot run.
+    build_model(model_type, config)
+
+    work_dir = Path(tempfile.mkdtemp(prefix="job_", dir=get_output_dir(config)))
+    input_path, upload_hash = await save_upload(file, work_dir)
+    job = TranslationJob(
+        filename=file.filename,
+        target_language=language,
+        file_format=desired_format,
+        model_type=model_type,
+        input_path=input_path,
+        work_dir=work_dir,
+        cache_key=ResultCache.make_key(upload_hash, language, desired_format, model_type),
+    )
+
+    manager = get_job_manager()
+    cached = get_result_cache().get(job.cache_key)
+    if cached is not None:
+        return manager.complete(job, cached).to_dict()
 
-    media_type = MEDIA_TYPES[desired_format]
-    headers = {}
     try:
-        headers["X-Translation-Language"] = language.encode('ascii', 'ignore').decode('ascii') or 'unknown'
-    except Exception:
-        headers["X-Translation-Language"] = 'unknown'
+        accepted = manager.submit(job, run_translation_job)
+    except JobQueueFullError as exc:
+        cleanup_files([input_path])
+        work_dir.rmdir()
+        raise HTTPException(status_code=429, detail=str(exc)) from exc
+
+    if accepted is not job:
+        cleanup_files([input_path])
+        work_dir.rmdir()
+    return accepted.to_dict()
+
+@app.get("/jobs/{job_id}")
+def get_job_status(job_id: str):
+    return get_job_or_404(job_id).to_dict()
+
+@app.get("/jobs/{job_id}/events")
+async def stream_job_events(job_id: str):
+    job = get_job_or_404(job_id)
+
+    async def event_stream():
+        version = -1
+        while True:
+            version = await asyncio.to_thread(job.wait_for_update, version, 15)
+            payload = json.dumps(job.to_dict(), ensure_ascii=False)
+            yield f"event: {job.status.value}\ndata: {payload}\n\n"
+            if job.finished:
+                break
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.get("/jobs/{job_id}/result")
+def download_job_result(job_id: str):
+    job = get_job_or_404(job_id)
+    if job.status != JobStatus.SUCCEEDED:
+        raise HTTPException(status_code=409, detail=f"Job is {job.status.value}, result not available")
+    if not job.output_path or not Path(job.output_path).exists():
+        raise HTTPException(status_code=410, detail="Job result has expired")
 
     return FileResponse(
-        path=str(output_path),
-        media_type=media_type,
-        filename=output_filename,
-        background=background_tasks,
-        headers=headers,
+        path=str(job.output_path),
+        media_type=MEDIA_TYPES[job.file_format],
+        filename=output_filename_for(job.filename, job.file_format),
+        headers={"X-Translation-Language": ascii_header(job.target_language)},
     )
+
+@app.delete("/jobs/{job_id}")
+def cancel_job(job_id: str):
+    get_job_or_404(job_id)
+    return get_job_manager().cancel(job_id).to_dict()
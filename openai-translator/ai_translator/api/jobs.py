@@ -0,0 +1,241 @@
+import shutil
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from enum import Enum
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from ..utils import LOG, METRICS
+
+JOB_DURATION = METRICS.histogram(
+    "api_job_duration_seconds", "Wall time of translation jobs from start to finish, by model and status.",
+    ["model_type", "status"])
+JOB_QUEUE_WAIT = METRICS.histogram("api_job_queue_wait_seconds", "Time jobs spent queued before starting.")
+JOBS_FINISHED = METRICS.counter(
+    "api_jobs_finished_total", "Finished translation jobs, by status and error class.", ["status", "error"])
+
+
+class JobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+FINISHED_STATUSES = {JobStatus.SUCCEEDED, JobStatus.FAILED, JobStatus.CANCELLED}
+
+
+class JobQueueFullError(Exception):
+    def __init__(self, max_queue_size: int):
+        self.max_queue_size = max_queue_size
+        super().__init__(f"Job queue is full: at most {max_queue_size} jobs may wait at once.")
+
+
+class JobCancelledError(Exception):
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+        super().__init__(f"Job {job_id} was cancelled.")
+
+
+class TranslationJob:
+    """State of one asynchronous translation, shared between the worker thread and API handlers."""
+
+    def __init__(self, filename: str, target_language: str, file_format: str, model_type: str,
+                 input_path: Path, work_dir: Path, cache_key: Optional[str] = None):
+        self.id = uuid.uuid4().hex
+        self.cache_key = cache_key
+        self.filename = filename
+        self.target_language = target_language
+        self.file_format = file_format
+        self.model_type = model_type
+        self.input_path = input_path
+        self.work_dir = work_dir
+        self.output_path: Optional[Path] = None
+        self.status = JobStatus.QUEUED
+        self.error: Optional[str] = None
+        self.progress = {"page": 0, "total_pages": 0, "content": 0, "total_contents": 0, "percent": 0.0}
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.cancel_event = threading.Event()
+        self.future = None
+        self._version = 0
+        self._condition = threading.Condition()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATUSES
+
+    def update(self, **fields):
+        with self._condition:
+            for key, value in fields.items():
+                setattr(self, key, value)
+            self._version += 1
+            self._condition.notify_all()
+
+    def update_progress(self, page_idx: int, total_pages: int, content_idx: int, total_contents: int):
+        page_fraction = (content_idx + 1) / total_contents if total_contents else 1.0
+        percent = (page_idx + page_fraction) / total_pages * 100 if total_pages else 0.0
+        self.update(progress={
+            "page": page_idx + 1,
+            "total_pages": total_pages,
+            "content": content_idx + 1,
+            "total_contents": total_contents,
+            "percent": round(min(percent, 100.0), 2),
+        })
+
+    def check_cancelled(self):
+        if self.cancel_event.is_set():
+            raise JobCancelledError(self.id)
+
+    def wait_for_update(self, last_version: int, timeout: float) -> int:
+        """Block until the job changes after ``last_version`` or ``timeout`` expires; returns the current version."""
+        with self._condition:
+            self._condition.wait_for(lambda: self._version != last_version, timeout=timeout)
+            return self._version
+
+    def to_dict(self) -> Dict:
+        return {
+            "job_id": self.id,
+            "filename": self.filename,
+            "status": self.status.value,
+            "target_language": self.target_language,
+            "file_format": self.file_format,
+            "model_type": self.model_type,
+            "progress": dict(self.progress),
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class JobManager:
+    """Runs translation jobs on a bounded worker pool and expires finished jobs after a TTL."""
+
+    def __init__(self, max_workers: int = 2, max_queue_size: int = 16, ttl_seconds: int = 3600,
+                 cleanup_interval: int = 60):
+        self.max_workers = max_workers
+        self.max_queue_size = max_queue_size
+        self.ttl_seconds = ttl_seconds
+        self.cleanup_interval = cleanup_interval
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="translation-job")
+        self._jobs: Dict[str, TranslationJob] = {}
+        self._inflight: Dict[str, TranslationJob] = {}
+        self._lock = threading.Lock()
+        self._last_cleanup = time.time()
+
+    def submit(self, job: TranslationJob, run: Callable[[TranslationJob], Path]) -> TranslationJob:
+        """Queue ``job``, or return the unfinished job already translating the same ``cache_key``."""
+        self.cleanup_expired()
+        with self._lock:
+            existing = self._inflight.get(job.cache_key) if job.cache_key else None
+            if existing is not None and not existing.finished:
+                LOG.info(f"Job for {job.filename} coalesced onto in-flight job {existing.id}")
+                return existing
+            if self.queued_count() >= self.max_queue_size:
+                raise JobQueueFullError(self.max_queue_size)
+            self._jobs[job.id] = job
+            if job.cache_key:
+                self._inflight[job.cache_key] = job
+            job.future = self._executor.submit(self._run, job, run)
+        LOG.info(f"Job {job.id} queued for {job.filename}")
+        return job
+
+    def complete(self, job: TranslationJob, output_path: Path) -> TranslationJob:
+        """Register ``job`` as already succeeded, e.g. when its result was found in a cache."""
+        with self._lock:
+            self._jobs[job.id] = job
+        now = time.time()
+        self._finish(job, JobStatus.SUCCEEDED, output_path=output_path, started_at=now,
+                     progress=dict(job.progress, percent=100.0))
+        return job
+
+    def get(self, job_id: str) -> Optional[TranslationJob]:
+        self.cleanup_expired()
+        return self._jobs.get(job_id)
+
+    def list_jobs(self) -> List[TranslationJob]:
+        return list(self._jobs.values())
+
+    def queued_count(self) -> int:
+        return sum(1 for job in list(self._jobs.values()) if job.status == JobStatus.QUEUED)
+
+    def running_count(self) -> int:
+        return sum(1 for job in list(self._jobs.values()) if job.status == JobStatus.RUNNING)
+
+    def cancel(self, job_id: str) -> Optional[TranslationJob]:
+        job = self._jobs.get(job_id)
+        if job is None or job.finished:
+            return job
+        job.cancel_event.set()
+        if job.future is not None and job.future.cancel():
+            # Never started: nothing will call back, so finish it here.
+            self._finish(job, JobStatus.CANCELLED)
+        LOG.info(f"Job {job_id} cancellation requested")
+        return job
+
+    def _run(self, job: TranslationJob, run: Callable[[TranslationJob], Path]):
+        if job.cancel_event.is_set():
+            self._finish(job, JobStatus.CANCELLED)
+            return
+        job.update(status=JobStatus.RUNNING, started_at=time.time())
+        JOB_QUEUE_WAIT.observe(job.started_at - job.created_at)
+        try:
+            output_path = run(job)
+        except JobCancelledError:
+            LOG.info(f"Job {job.id} cancelled")
+            self._finish(job, JobStatus.CANCELLED)
+        except Exception as exc:
+            LOG.error(f"Job {job.id} failed: {exc}")
+            self._finish(job, JobStatus.FAILED, error=str(exc), error_class=type(exc).__name__)
+        else:
+            progress = dict(job.progress, percent=100.0)
+            self._finish(job, JobStatus.SUCCEEDED, output_path=output_path, progress=progress)
+
+    def _finish(self, job: TranslationJob, status: JobStatus, error_class: str = "", **fields):
+        _remove_path(job.input_path)
+        job.update(status=status, finished_at=time.time(), **fields)
+        JOBS_FINISHED.inc(status=status.value, error=error_class)
+        if job.started_at:
+            JOB_DURATION.observe(job.finished_at - job.started_at, model_type=job.model_type, status=status.value)
+        with self._lock:
+            if job.cache_key and self._inflight.get(job.cache_key) is job:
+                del self._inflight[job.cache_key]
+
+    def cleanup_expired(self, force: bool = False):
+        now = time.time()
+        if not force and now - self._last_cleanup < self.cleanup_interval:
+            return
+        self._last_cleanup = now
+        with self._lock:
+            expired = [
+                job for job in self._jobs.values()
+                if job.finished and job.finished_at and now - job.finished_at >= self.ttl_seconds
+            ]
+            for job in expired:
+                del self._jobs[job.id]
+        for job in expired:
+            _remove_path(job.work_dir)
+            LOG.info(f"Job {job.id} expired, artifacts removed")
+
+    def shutdown(self):
+        for job in list(self._jobs.values()):
+            job.cancel_event.set()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _remove_path(path: Optional[Path]):
+    if not path:
+        return
+    try:
+        path = Path(path)
+        if path.is_dir():
+            shutil.rmtree(path, ignore_errors=True)
+        elif path.exists():
+            path.unlink()
+    except Exception as exc:
+        LOG.warning(f"Failed to remove {path}: {exc}")
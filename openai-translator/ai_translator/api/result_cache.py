@@ -0,0 +1,143 @@
+import hashlib
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+from ..utils import LOG, METRICS
+
+CACHE_LOOKUPS = METRICS.counter("api_result_cache_lookups_total", "Result cache lookups, by outcome.", ["result"])
+
+
+class ResultCache:
+    """Finished translation outputs on disk, keyed by upload hash and translation options.
+
+    Entries are evicted least-recently-used first once ``max_bytes`` is exceeded,
+    and unconditionally once they are older than ``max_age_seconds``.
+    """
+
+    def __init__(self, cache_dir: Path, max_bytes: int = 1 << 30, max_age_seconds: int = 7 * 24 * 3600):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, Dict]" = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self._load()
+
+    @staticmethod
+    def make_key(upload_hash: str, target_language: str, file_format: str, model_type: str) -> str:
+        raw = "\0".join([upload_hash, target_language, file_format, model_type])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _load(self):
+        files = [path for path in self.cache_dir.iterdir() if path.is_file()]
+        for path in sorted(files, key=lambda p: p.stat().st_mtime):
+            stat = path.stat()
+            self._entries[path.stem] = {"path": path, "size": stat.st_size, "created_at": stat.st_mtime}
+            self._total_bytes += stat.st_size
+        with self._lock:
+            self._evict_locked()
+
+    def get(self, key: str) -> Optional[Path]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (self._is_expired(entry) or not entry["path"].exists()):
+                self._remove_locked(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                CACHE_LOOKUPS.inc(result="miss")
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            CACHE_LOOKUPS.inc(result="hit")
+            path = entry["path"]
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return path
+
+    def put(self, key: str, source_path: Path) -> Path:
+        """Move ``source_path`` into the cache and return its cached location."""
+        source_path = Path(source_path)
+        target = self.cache_dir / f"{key}{source_path.suffix}"
+        shutil.move(str(source_path), str(target))
+        size = target.stat().st_size
+        with self._lock:
+            if key in self._entries:
+                self._total_bytes -= self._entries.pop(key)["size"]
+            self._entries[key] = {"path": target, "size": size, "created_at": time.time()}
+            self._total_bytes += size
+            self._evict_locked()
+        return target
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+    def _is_expired(self, entry: Dict) -> bool:
+        return time.time() - entry["created_at"] >= self.max_age_seconds
+
+    def _evict_locked(self):
+        for key in [key for key, entry in self._entries.items() if self._is_expired(entry)]:
+            self._remove_locked(key)
+        # Keep the most recent entry even if it alone exceeds the budget, so callers can still serve it.
+        while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+            oldest_key = next(iter(self._entries))
+            self._remove_locked(oldest_key)
+
+    def _remove_locked(self, key: str):
+        entry = self._entries.pop(key)
+        self._total_bytes -= entry["size"]
+        try:
+            entry["path"].unlink()
+        except FileNotFoundError:
+            pass
+        except OSError as exc:
+            LOG.warning(f"Failed to evict cached result {entry['path']}: {exc}")
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key onto one execution."""
+
+    def __init__(self):
+        self._calls: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: str, fn: Callable):
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+        if not leader:
+            return future.result()
+
+        try:
+            result = fn()
+        except BaseException as exc:
+            future.set_exception(exc)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
@@ -0,0 +1,56 @@
+import hashlib
+import tempfile
+from pathlib import Path
+from typing import Optional, Tuple
+
+from fastapi import UploadFile
+from starlette.concurrency import run_in_threadpool
+
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+DEFAULT_MAX_UPLOAD_BYTES = 100 * 1024 * 1024
+
+
+class UploadTooLargeError(Exception):
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        super().__init__(f"Uploaded file exceeds the limit of {max_bytes} bytes.")
+
+
+class EmptyUploadError(Exception):
+    def __init__(self):
+        super().__init__("Uploaded file is empty")
+
+
+async def spool_upload(file: UploadFile,
+                       directory: Optional[Path] = None,
+                       max_bytes: int = DEFAULT_MAX_UPLOAD_BYTES,
+                       chunk_size: int = DEFAULT_CHUNK_SIZE) -> Tuple[Path, str, int]:
+    """Stream ``file`` to a temporary PDF in fixed-size chunks, hashing it on the fly.
+
+    Only one chunk is held in memory at a time. Returns ``(path, sha256_hexdigest, size)``;
+    the partial file is removed if the upload is empty or exceeds ``max_bytes``.
+    """
+    if file.size is not None and file.size > max_bytes:
+        raise UploadTooLargeError(max_bytes)
+
+    digest = hashlib.sha256()
+    size = 0
+    tmp = tempfile.NamedTemporaryFile(delete=False, suffix=".pdf", dir=directory)
+    path = Path(tmp.name)
+    try:
+        with tmp:
+            while True:
+                chunk = await file.read(chunk_size)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLargeError(max_bytes)
+                digest.update(chunk)
+                await run_in_threadpool(tmp.write, chunk)
+        if size == 0:
+            raise EmptyUploadError()
+    except BaseException:
+        path.unlink(missing_ok=True)
+        raise
+    return path, digest.hexdigest(), size
@@ -1,11 +1,28 @@
+import json
+import re
 import pandas as pd
 from enum import Enum, auto
+from typing import List, Optional, Tuple
 from PIL import Image as PILImage
 try:
     from ..utils import LOG
 except ImportError:  # pragma: no cover - fallback for direct execution
     from utils import LOG
 
+# 日期与编号类单元格原样保留，不发送给模型（纯数字单元格不含文字，直接跳过）
+DATE_PATTERN = re.compile(r"^\d{1,4}[-/.年]\d{1,2}(?:[-/.月]\d{1,4}日?)?$")
+CODE_PATTERN = re.compile(r"^(?=.*\d)[A-Z0-9][A-Z0-9_\-./#]*$")
+
+
+def is_translatable_cell(value) -> bool:
+    """判断单元格是否需要翻译：空值、数字、日期、编号（如 SKU-1024）以及不含文字的单元格都跳过"""
+    if value is None or (isinstance(value, float) and pd.isna(value)):
+        return False
+    text = str(value).strip()
+    if not text or not any(char.isalpha() for char in text):
+        return False
+    return not (DATE_PATTERN.match(text) or CODE_PATTERN.match(text))
+
 class ContentType(Enum):
     TEXT = auto()
     TABLE = auto()
@@ -71,6 +88,79 @@ class TableContent(Content):
         
         super().__init__(ContentType.TABLE, df)
 
+    def translatable_cells(self) -> List[str]:
+        """按行优先顺序返回去重后需要翻译的单元格文本"""
+        cells = []
+        seen = set()
+        for _, _, text in self._cell_coordinates():
+            if text not in seen:
+                seen.add(text)
+                cells.append(text)
+        return cells
+
+    def cell_translations(self) -> Optional[List[str]]:
+        """与 translatable_cells() 一一对应的单元格译文；译文表格与原表格结构不一致时返回 None"""
+        if not isinstance(self.translation, pd.DataFrame):
+            return None
+        rows = self.translation.values.tolist()
+        if len(self.original) > 1:
+            rows = [list(self.translation.columns)] + rows
+        if len(rows) != len(self.original) or any(len(row) != len(self.original.columns) for row in rows):
+            return None
+        translations = {}
+        for row_idx, col_idx, text in self._cell_coordinates():
+            translations.setdefault(text, str(rows[row_idx][col_idx]))
+        return [translations[text] for text in self.translatable_cells()]
+
+    def _cell_coordinates(self) -> List[Tuple[int, int, str]]:
+        """需要翻译的单元格坐标 (行, 列, 文本)"""
+        return [
+            (row_idx, col_idx, str(item).strip())
+            for row_idx, row in enumerate(self.original.values.tolist())
+            for col_idx, item in enumerate(row)
+            if is_translatable_cell(item)
+        ]
+
+    @staticmethod
+    def _parse_cell_reply(reply: str) -> List[str]:
+        """解析单元格模式的回复（JSON 字符串数组），不是数组时抛出 ValueError"""
+        text = reply.strip()
+        # 去掉模型可能添加的 ```json 代码块标记
+        if text.startswith("```"):
+            text = text.strip("`").strip()
+            if text.lower().startswith("json"):
+                text = text[4:].strip()
+        translations = json.loads(text)
+        if not isinstance(translations, list):
+            raise ValueError("Cell translations must be a JSON array")
+        return [str(translation) for translation in translations]
+
+    def _apply_cell_translations(self, translations: List[str]):
+        """按坐标把单元格译文写回原表格的副本，其余单元格保持原样"""
+        cells = self.translatable_cells()
+        if len(translations) != len(cells):
+            raise ValueError(f"Expected {len(cells)} cell translations, got {len(translations)}")
+        mapping = dict(zip(cells, translations))
+        rows = [["" if item is None or (isinstance(item, float) and pd.isna(item)) else item for item in row]
+                for row in self.original.values.tolist()]
+        for row_idx, col_idx, text in self._cell_coordinates():
+            rows[row_idx][col_idx] = mapping[text]
+        # 与整表文本模式一致，第一行作为表头
+        if len(rows) > 1:
+            return pd.DataFrame(rows[1:], columns=rows[0])
+        return pd.DataFrame(rows)
+
+    def set_cell_translations(self, reply: str, status):
+        """设置单元格模式的译文：回复为与 translatable_cells() 一一对应的 JSON 数组"""
+        try:
+            self.translation = self._apply_cell_translations(self._parse_cell_reply(reply))
+            self.status = status
+        except Exception as e:
+            LOG.error(f"Table cell translation failed: {e}")
+            # 保留原始内容作为降级方案
+            self.translation = self.original
+            self.status = False
+
     def set_translation(self, translation, status):
         try:
             if not isinstance(translation, str):
@@ -1,5 +1,5 @@
 from .file_upload import FileUploadComponent
-from .progress_display import ProgressDisplayComponent
+from .progress_display import ProgressDisplayComponent, ProgressChannel
 from .config_manager import ConfigManagerComponent
 from .history_manager import HistoryManagerComponent
 from .batch_processor import BatchProcessorComponent
@@ -7,6 +7,7 @@ from .batch_processor import BatchProcessorComponent
 __all__ = [
     'FileUploadComponent',
     'ProgressDisplayComponent', 
+    'ProgressChannel',
     'ConfigManagerComponent',
     'HistoryManagerComponent',
     'BatchProcessorComponent'
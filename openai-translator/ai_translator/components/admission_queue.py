@@ -0,0 +1,93 @@
+import itertools
+import threading
+from collections import deque
+from typing import Dict, Iterator, Optional
+
+DEFAULT_MAX_CONCURRENT = 4
+
+
+class AdmissionQueue:
+    """服务器级翻译准入队列
+
+    所有会话的单文件翻译先在此排队，按先到先得的顺序放行，同时运行的翻译数不超过 max_concurrent；
+    排队中的会话可以随时查询自己的位置。每个会话同一时间只能持有一个排队或运行中的名额。
+    """
+
+    def __init__(self, max_concurrent: int = DEFAULT_MAX_CONCURRENT):
+        self.max_concurrent = max(1, int(max_concurrent))
+        self._condition = threading.Condition()
+        self._waiting = deque()
+        self._running = set()
+        self._sessions: Dict[str, int] = {}
+        self._owners: Dict[int, Optional[str]] = {}
+        self._tickets = itertools.count(1)
+
+    def join(self, session_id: Optional[str] = None) -> Optional[int]:
+        """加入队列并返回票号；该会话已有排队或运行中的翻译时返回 None"""
+        with self._condition:
+            if session_id is not None and session_id in self._sessions:
+                return None
+            ticket = next(self._tickets)
+            self._waiting.append(ticket)
+            self._owners[ticket] = session_id
+            if session_id is not None:
+                self._sessions[session_id] = ticket
+            self._admit_locked()
+            return ticket
+
+    def leave(self, ticket: int):
+        """释放名额（排队中或运行中均可），重复调用无副作用"""
+        with self._condition:
+            if ticket in self._running:
+                self._running.discard(ticket)
+            elif ticket in self._waiting:
+                self._waiting.remove(ticket)
+            else:
+                return
+            session_id = self._owners.pop(ticket, None)
+            if session_id is not None and self._sessions.get(session_id) == ticket:
+                del self._sessions[session_id]
+            self._admit_locked()
+
+    def set_limit(self, max_concurrent: int):
+        with self._condition:
+            self.max_concurrent = max(1, int(max_concurrent))
+            self._admit_locked()
+
+    def position(self, ticket: int) -> int:
+        """返回排队位置（从 1 开始）；已放行返回 0，不在队列中返回 -1"""
+        with self._condition:
+            return self._position_locked(ticket)
+
+    def wait_for_turn(self, ticket: int, keepalive: Optional[float] = None) -> Iterator[int]:
+        """排队期间每当位置变化时产出新位置，放行或离开队列后结束
+
+        keepalive 不为 None 时，位置长时间不变也会按该间隔重复产出。
+        """
+        last_position = None
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._position_locked(ticket) != last_position, timeout=keepalive)
+                position = self._position_locked(ticket)
+            if position <= 0:
+                return
+            yield position
+            last_position = position
+
+    def stats(self) -> Dict[str, int]:
+        with self._condition:
+            return {'running': len(self._running), 'waiting': len(self._waiting), 'max_concurrent': self.max_concurrent}
+
+    def _position_locked(self, ticket: int) -> int:
+        if ticket in self._running:
+            return 0
+        try:
+            return self._waiting.index(ticket) + 1
+        except ValueError:
+            return -1
+
+    def _admit_locked(self):
+        while self._waiting and len(self._running) < self.max_concurrent:
+            self._running.add(self._waiting.popleft())
+        # 放行或离开都会改变其他会话的排队位置
+        self._condition.notify_all()
@@ -1,21 +1,103 @@
 import gradio as gr
 import os
 import threading
-from typing import List, Dict, Any, Callable, Optional
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import itertools
+import bisect
+from collections import Counter
+from functools import partial
+from typing import List, Dict, Any, Callable, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor, Future
 import queue
 import time
+try:
+    from ..translator import PDFParser
+except ImportError:  # pragma: no cover - fallback for direct execution
+    from translator import PDFParser
+try:
+    from ..utils import LOG, MonotonicIdGenerator
+except ImportError:  # pragma: no cover - fallback for direct execution
+    from utils import LOG, MonotonicIdGenerator
+try:
+    from .batch_store import BatchTaskStore
+except ImportError:  # pragma: no cover - fallback for direct execution
+    from batch_store import BatchTaskStore
+
+# 等待调度的任务状态；其余状态（处理中除外）均为终态
+PENDING_STATUSES = ('等待中', '重试中')
+
+# 调度策略（界面显示名 -> 内部名）
+SCHEDULING_POLICIES = {
+    '短作业优先': 'sjf',
+    '公平共享': 'fair',
+    '优先级': 'priority',
+    '先进先出': 'fifo',
+}
+# 优先级类别，数值越小越先处理
+PRIORITY_CLASSES = {'高': 0, '普通': 1, '低': 2}
+# 无法读取PDF时按每页/每个文件的默认 token 数估算
+DEFAULT_TOKENS_PER_PAGE = 500
+# 吞吐量滑动平均的权重
+THROUGHPUT_SMOOTHING = 0.3
+
+TASK_IDS = MonotonicIdGenerator("task_")
+
+
+class BatchTaskCancelled(Exception):
+    """批量任务被取消，由进度回调抛出以中断正在进行的翻译"""
+
+    def __init__(self, task_id: str):
+        self.task_id = task_id
+        super().__init__(f"任务 {task_id} 已取消")
+
 
 class BatchProcessorComponent:
-    """批量处理组件"""
+    """批量处理组件
+    
+    调度完全由事件驱动：调度线程阻塞在 worker 空位、暂停开关和优先级队列上，
+    任务完成通过 future 回调通知，失败任务按指数退避定时重新入队。
+    """
     
-    def __init__(self, max_workers: int = 3):
+    def __init__(self, max_workers: int = 3, max_concurrent_requests: int = 6,
+                 retry_base_delay: float = 2.0, retry_max_delay: float = 60.0,
+                 scheduling_policy: str = 'sjf', store: Optional[BatchTaskStore] = None):
+        """
+        Args:
+            store: 可选的持久化存储；提供时任务状态与内容块检查点会写入其中，
+                并在创建时恢复上次未完成的任务
+        """
         self.max_workers = max_workers
-        self.processing_queue = queue.Queue()
-        self.results_queue = queue.Queue()
+        self.scheduling_policy = scheduling_policy
+        # 所有文件共享的模型请求并发预算
+        self.max_concurrent_requests = max_concurrent_requests
+        self.request_limiter = threading.BoundedSemaphore(max_concurrent_requests)
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        # 队列元素为 (排序键, 入队序号, 任务)，task 为 None 表示唤醒调度线程
+        self.processing_queue = queue.PriorityQueue()
         self.is_processing = False
         self.current_batch = []
         self.batch_results = {}
+        self._sequence = itertools.count()
+        self._lock = threading.RLock()
+        self._idle = threading.Condition(self._lock)
+        self._resume_event = threading.Event()
+        self._resume_event.set()
+        self._stop_requested = False
+        # 尚未结束的任务（排队、处理中或等待重试）
+        self._active_ids = set()
+        self._cancel_events: Dict[str, threading.Event] = {}
+        self._retry_timers: Dict[str, threading.Timer] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+        # 公平共享：每次提交（一组文件）的虚拟完成时间与当前虚拟时间
+        self._group_counter = itertools.count(1)
+        self._group_finish: Dict[int, float] = {}
+        self._virtual_time = 0.0
+        # 单个 worker 每秒完成的预估工作量，完成任务后更新，只用于调度与完成时间预估
+        self._cost_per_second: Optional[float] = None
+        self._reset_stats()
+        self.store = store
+        if store is not None:
+            self._rehydrate()
         
     def create_batch_interface(self):
         """创建批量处理界面"""
@@ -37,6 +119,22 @@ class BatchProcessorComponent:
                             label="并发数量",
                             info="同时处理的文件数量"
                         )
+
+                        max_requests = gr.Slider(
+                            minimum=1,
+                            maximum=20,
+                            value=6,
+                            step=1,
+                            label="并发请求数",
+                            info="所有文件合计同时发往模型的请求数量"
+                        )
+                        
+                        scheduling_policy = gr.Dropdown(
+                            choices=list(SCHEDULING_POLICIES),
+                            value='短作业优先',
+                            label="调度策略",
+                            info="短作业优先按预估 token 数排序；公平共享在多次添加的文件之间轮转；优先级先按文件优先级再按大小"
+                        )
                         
                         retry_failed = gr.Checkbox(
                             label="自动重试失败的文件",
@@ -63,25 +161,29 @@ class BatchProcessorComponent:
             with gr.Row():
                 start_batch_btn = gr.Button("▶️ 开始批量处理", variant="primary")
                 pause_batch_btn = gr.Button("⏸️ 暂停处理", variant="secondary")
+                resume_batch_btn = gr.Button("⏯️ 继续处理", variant="secondary")
                 stop_batch_btn = gr.Button("⏹️ 停止处理", variant="secondary")
                 clear_queue_btn = gr.Button("🗑️ 清空队列", variant="secondary")
+                refresh_batch_btn = gr.Button("🔄 刷新状态", variant="secondary")
                 
             # 批量处理状态
             batch_status = gr.Textbox(
                 label="批量处理状态",
                 interactive=False,
-                lines=4
+                lines=5
             )
             
             # 批量结果摘要
             batch_summary = gr.Textbox(
                 label="处理摘要",
                 interactive=False,
-                lines=3
+                lines=4
             )
             
         components = {
             'max_workers': max_workers,
+            'max_requests': max_requests,
+            'scheduling_policy': scheduling_policy,
             'retry_failed': retry_failed,
             'max_retries': max_retries,
             'queue_display': queue_display,
@@ -92,113 +194,366 @@ class BatchProcessorComponent:
         buttons = {
             'start_batch_btn': start_batch_btn,
             'pause_batch_btn': pause_batch_btn,
+            'resume_batch_btn': resume_batch_btn,
             'stop_batch_btn': stop_batch_btn,
-            'clear_queue_btn': clear_queue_btn
+            'clear_queue_btn': clear_queue_btn,
+            'refresh_batch_btn': refresh_batch_btn
         }
         
         return components, buttons
     
     def add_files_to_queue(self, file_paths: List[str], config: Dict[str, Any]) -> str:
-        """添加文件到处理队列"""
+        """添加文件到处理队列（处理过程中添加的文件也会被调度）
+        
+        入队时读取页数并估算 token 数，作为调度排序与完成时间预估的依据；
+        同一次添加的文件属于同一组，公平共享策略在组之间分配处理量。
+        """
         added_count = 0
+        group = next(self._group_counter)
         
         for file_path in file_paths:
             if os.path.exists(file_path) and file_path.endswith('.pdf'):
+                total_pages, estimated_tokens = self._get_document_size(file_path)
                 task = {
-                    'id': f"task_{int(time.time() * 1000)}_{added_count}",
+                    'id': TASK_IDS.next_id(),
                     'file_path': file_path,
                     'filename': os.path.basename(file_path),
                     'config': config.copy(),
                     'status': '等待中',
                     'progress': 0,
+                    'total_pages': total_pages,
+                    'estimated_tokens': estimated_tokens,
+                    'group': group,
                     'start_time': None,
                     'estimated_completion': None,
                     'retry_count': 0,
-                    'error_message': None
+                    'error_message': None,
+                    'first_start_time': None,
+                    'end_time': None,
+                    'blocks': 0
                 }
                 
-                self.processing_queue.put(task)
-                self.current_batch.append(task)
+                with self._lock:
+                    self.current_batch.append(task)
+                    self._status_counts[task['status']] += 1
+                    self._track(task, 1)
+                    self._active_ids.add(task['id'])
+                    self._enqueue(task)
+                    self._persist(task)
                 added_count += 1
                 
         return f"已添加 {added_count} 个文件到处理队列"
+
+    def _rehydrate(self):
+        """从持久化存储恢复任务：未结束的任务重新排队，处理中断的任务从检查点继续"""
+        resumed = 0
+        for task in self.store.load_tasks():
+            if task['status'] in PENDING_STATUSES or task['status'] == '处理中':
+                # 中断前的计时不再有意义，重新处理时重新计时
+                task['status'] = '等待中'
+                task['start_time'] = None
+                task['first_start_time'] = None
+                self._active_ids.add(task['id'])
+                self._enqueue(task)
+                resumed += 1
+            else:
+                self.batch_results[task['id']] = task
+                if task['status'] == '完成':
+                    self._record_completion(task)
+            self.current_batch.append(task)
+            self._status_counts[task['status']] += 1
+            self._track(task, 1)
+        groups = [task.get('group') or 0 for task in self.current_batch]
+        self._group_counter = itertools.count(max(groups, default=0) + 1)
+        if resumed:
+            LOG.info(f"从 {self.store.db_path} 恢复了 {resumed} 个未完成的批量任务")
+
+    def _set_status(self, task: Dict[str, Any], status: str):
+        """修改任务状态并同步状态计数与剩余工作量（需持有锁）"""
+        self._track(task, -1)
+        self._status_counts[task['status']] -= 1
+        task['status'] = status
+        self._status_counts[status] += 1
+        self._track(task, 1)
+
+    def _track(self, task: Dict[str, Any], sign: int):
+        """把任务按当前状态计入（sign=1）或移出（sign=-1）待处理与处理中的工作量（需持有锁）
+        
+        记录计入时的工作量，移出时减去同一数值，任务的预估值变化不会让合计产生偏差。
+        """
+        if task['status'] in PENDING_STATUSES:
+            tracked, amount = self._pending, self._task_cost(task)
+        elif task['status'] == '处理中':
+            tracked, amount = self._running, self._remaining_cost(task)
+        else:
+            return
+        if sign > 0:
+            tracked[task['id']] = (task, amount)
+        else:
+            amount = tracked.pop(task['id'], (None, 0))[1]
+        if tracked is self._pending:
+            self._pending_cost += sign * amount
+        else:
+            self._running_cost += sign * amount
+
+    def _reset_stats(self):
+        self._status_counts = Counter()
+        # 增量维护的待处理任务与处理中任务（任务 ID -> (任务, 计入的剩余工作量)），查询状态时不扫描任务列表
+        self._pending: Dict[str, Tuple[Dict[str, Any], float]] = {}
+        self._running: Dict[str, Tuple[Dict[str, Any], float]] = {}
+        self._pending_cost = 0.0
+        self._running_cost = 0.0
+        # 已完成文件的累计量（tokens 为模型实际上报的用量，cost 为预估工作量），以及按耗时排序的文件耗时
+        self._completed = {'files': 0, 'pages': 0, 'blocks': 0, 'tokens': 0, 'cost': 0}
+        self._latencies: List[float] = []
+        self._retries = 0
+        # 批量处理累计运行时长（不含停止后的空闲时间）
+        self._active_seconds = 0.0
+        self._active_since: Optional[float] = None
+
+    def _record_completion(self, task: Dict[str, Any]):
+        """把完成的任务计入累计统计（需持有锁）"""
+        self._completed['files'] += 1
+        self._completed['pages'] += task.get('total_pages') or 0
+        self._completed['blocks'] += task.get('blocks') or 0
+        self._completed['tokens'] += task.get('tokens') or 0
+        self._completed['cost'] += self._task_cost(task)
+        if task.get('first_start_time') and task.get('end_time'):
+            bisect.insort(self._latencies, task['end_time'] - task['first_start_time'])
+
+    def _persist(self, task: Dict[str, Any]):
+        if self.store is not None:
+            self.store.save_task(task)
+
+    def _finish_task(self, task: Dict[str, Any]):
+        """任务进入终态：记录结果并清理检查点（需持有锁）"""
+        self._active_ids.discard(task['id'])
+        self.batch_results[task['id']] = task
+        if self.store is not None:
+            self.store.save_task(task)
+            self.store.clear_blocks(task['id'])
+        self._check_idle()
+
+    def _get_document_size(self, file_path: str) -> Tuple[Optional[int], Optional[int]]:
+        """读取PDF页数并估算 token 数，失败时返回 (None, None)"""
+        try:
+            return PDFParser.estimate_document_size(file_path)
+        except Exception as e:
+            LOG.warning(f"无法读取PDF页数 {file_path}: {e}")
+            return None, None
+
+    def _task_cost(self, task: Dict[str, Any]) -> int:
+        """任务的预估工作量（token 数）"""
+        if task.get('estimated_tokens'):
+            return task['estimated_tokens']
+        return (task.get('total_pages') or 1) * DEFAULT_TOKENS_PER_PAGE
+
+    def _queue_key(self, task: Dict[str, Any]) -> Tuple:
+        """按当前调度策略计算任务的排序键（需持有锁）"""
+        policy = self.scheduling_policy
+        cost = self._task_cost(task)
+        if policy == 'sjf':
+            return (cost,)
+        if policy == 'priority':
+            return (PRIORITY_CLASSES.get(task['config'].get('priority'), PRIORITY_CLASSES['普通']), cost)
+        if policy == 'fair':
+            # 起始虚拟时间取组内上一个任务的完成时间与当前虚拟时间的较大者
+            start = max(self._virtual_time, self._group_finish.get(task['group'], 0.0))
+            finish = start + cost
+            self._group_finish[task['group']] = finish
+            task['virtual_start'] = start
+            return (finish,)
+        return (0,)
+
+    def _enqueue(self, task: Dict[str, Any], key: Optional[Tuple] = None):
+        if key is None:
+            key = self._queue_key(task)
+        task['queue_key'] = key
+        self.processing_queue.put((key, next(self._sequence), task))
+
+    def _wake_dispatcher(self):
+        self.processing_queue.put(((-1,), next(self._sequence), None))
+
+    def _reorder_queue(self):
+        """调度策略变化后按新策略重建队列（需持有锁）"""
+        self._drain_queue()
+        self._group_finish = {}
+        for task in self.current_batch:
+            # 仍在退避等待中的重试任务由定时器入队，其余待调度任务（包括已回到队列的重试任务）都重新入队
+            if (task['id'] in self._active_ids and task['status'] in PENDING_STATUSES
+                    and task['id'] not in self._retry_timers):
+                self._enqueue(task)
     
     def start_batch_processing(self, 
                              translate_function: Callable,
                              max_workers: int = 3,
                              retry_failed: bool = True,
-                             max_retries: int = 2) -> str:
+                             max_retries: int = 2,
+                             max_concurrent_requests: Optional[int] = None,
+                             scheduling_policy: Optional[str] = None) -> str:
         """开始批量处理"""
-        if self.is_processing:
-            return "批量处理正在进行中"
-            
-        if self.processing_queue.empty():
-            return "处理队列为空，请先添加文件"
-            
-        self.is_processing = True
-        self.max_workers = max_workers
+        with self._lock:
+            if self.is_processing:
+                return "批量处理正在进行中"
+                
+            if not self._active_ids:
+                return "处理队列为空，请先添加文件"
+                
+            self.is_processing = True
+            self._active_since = time.time()
+            self._stop_requested = False
+            self._resume_event.set()
+            self.max_workers = max_workers
+            policy = SCHEDULING_POLICIES.get(scheduling_policy, scheduling_policy)
+            if policy and policy != self.scheduling_policy:
+                self.scheduling_policy = policy
+                self._reorder_queue()
+            if max_concurrent_requests and max_concurrent_requests != self.max_concurrent_requests:
+                self.max_concurrent_requests = max_concurrent_requests
+                self.request_limiter = threading.BoundedSemaphore(max_concurrent_requests)
+            self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="batch-task")
+            slots = threading.Semaphore(max_workers)
         
-        # 启动批量处理线程
-        processing_thread = threading.Thread(
-            target=self._batch_process_worker,
-            args=(translate_function, retry_failed, max_retries)
+        # 启动调度线程
+        dispatcher = threading.Thread(
+            target=self._dispatch_loop,
+            args=(self._executor, slots, translate_function, retry_failed, max_retries),
+            name="batch-dispatcher",
+            daemon=True
         )
-        processing_thread.daemon = True
-        processing_thread.start()
+        dispatcher.start()
         
-        return f"开始批量处理，并发数: {max_workers}"
-    
-    def _batch_process_worker(self, 
-                            translate_function: Callable,
-                            retry_failed: bool,
-                            max_retries: int):
-        """批量处理工作线程"""
-        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-            futures = {}
-            
-            while not self.processing_queue.empty() or futures:
-                # 提交新任务
-                while len(futures) < self.max_workers and not self.processing_queue.empty():
-                    try:
-                        task = self.processing_queue.get_nowait()
-                        task['status'] = '处理中'
-                        task['start_time'] = time.time()
-                        
-                        future = executor.submit(self._process_single_file, task, translate_function)
-                        futures[future] = task
-                    except queue.Empty:
+        return (f"开始批量处理，并发数: {max_workers}，并发请求数: {self.max_concurrent_requests}，"
+                f"调度策略: {self._policy_label()}")
+    
+    def _dispatch_loop(self,
+                       executor: ThreadPoolExecutor,
+                       slots: threading.Semaphore,
+                       translate_function: Callable,
+                       retry_failed: bool,
+                       max_retries: int):
+        """调度线程：有空闲 worker 且未暂停时，从优先级队列阻塞取出任务并提交"""
+        while True:
+            slots.acquire()
+            self._resume_event.wait()
+            key, _, task = self.processing_queue.get()
+            with self._lock:
+                superseded = self._executor is not executor
+                if task is None:
+                    slots.release()
+                    if self._stop_requested or not self._active_ids or superseded:
                         break
-                
-                # 检查完成的任务
-                completed_futures = []
-                for future in as_completed(futures, timeout=1):
-                    completed_futures.append(future)
-                    
-                for future in completed_futures:
-                    task = futures.pop(future)
-                    
-                    try:
-                        result = future.result()
-                        if result['success']:
-                            task['status'] = '完成'
-                            task['progress'] = 100
-                        else:
-                            task['status'] = '失败'
-                            task['error_message'] = result.get('error', '未知错误')
-                            
-                            # 重试逻辑
-                            if retry_failed and task['retry_count'] < max_retries:
-                                task['retry_count'] += 1
-                                task['status'] = '重试中'
-                                self.processing_queue.put(task)
-                                
-                    except Exception as e:
-                        task['status'] = '异常'
-                        task['error_message'] = str(e)
-                        
-                    self.batch_results[task['id']] = task
+                    continue
+                if superseded:
+                    # 已有新一轮处理的调度线程，交还任务后退出
+                    self._enqueue(task, key)
+                    slots.release()
+                    break
+                if task['id'] not in self._active_ids or task['status'] not in PENDING_STATUSES:
+                    # 已取消或已清空的任务
+                    slots.release()
+                    continue
+                if not self._resume_event.is_set():
+                    # 取出任务时恰好被暂停，放回原位等待继续
+                    self._enqueue(task, key)
+                    slots.release()
+                    continue
+                self._set_status(task, '处理中')
+                task['start_time'] = time.time()
+                task['first_start_time'] = task.get('first_start_time') or task['start_time']
+                task['blocks'] = 0
+                if 'virtual_start' in task:
+                    self._virtual_time = max(self._virtual_time, task['virtual_start'])
+                self._cancel_events[task['id']] = threading.Event()
+                self._persist(task)
+                future = executor.submit(self._process_single_file, task, translate_function)
+            future.add_done_callback(partial(self._on_task_done, task, slots, retry_failed, max_retries))
+        executor.shutdown(wait=False)
+    
+    def _on_task_done(self,
+                      task: Dict[str, Any],
+                      slots: threading.Semaphore,
+                      retry_failed: bool,
+                      max_retries: int,
+                      future: Future):
+        """任务完成回调：更新状态，按需安排退避重试，并释放 worker 空位"""
+        try:
+            result = future.result()
+        except Exception as e:
+            result = {'success': False, 'error': str(e)}
+            
+        with self._lock:
+            self._cancel_events.pop(task['id'], None)
+            task['end_time'] = time.time()
+            if result['success']:
+                self._set_status(task, '完成')
+                task['progress'] = 100
+                task['output_file'] = result.get('output_file')
+                task['tokens'] = result.get('tokens', 0)
+                self._record_throughput(task)
+                self._record_completion(task)
+            elif result.get('cancelled'):
+                self._set_status(task, '已取消')
+            else:
+                task['error_message'] = result.get('error', '未知错误')
+                if retry_failed and task['retry_count'] < max_retries and not self._stop_requested:
+                    self._schedule_retry(task)
+                else:
+                    self._set_status(task, '失败')
                     
-        self.is_processing = False
+            if task['status'] == '重试中':
+                self._persist(task)
+            else:
+                self._finish_task(task)
+        slots.release()
+    
+    def _record_throughput(self, task: Dict[str, Any]):
+        """用完成任务的实际耗时更新单个 worker 完成预估工作量的速度，供调度预估使用（需持有锁）"""
+        duration = task['end_time'] - task['start_time']
+        if duration <= 0:
+            return
+        rate = self._task_cost(task) / duration
+        if self._cost_per_second is None:
+            self._cost_per_second = rate
+        else:
+            self._cost_per_second += THROUGHPUT_SMOOTHING * (rate - self._cost_per_second)
+    
+    def _retry_delay(self, retry_count: int) -> float:
+        """第 n 次重试的等待时间：base * 2^(n-1)，不超过上限"""
+        return min(self.retry_max_delay, self.retry_base_delay * (2 ** (retry_count - 1)))
+    
+    def _schedule_retry(self, task: Dict[str, Any]):
+        task['retry_count'] += 1
+        self._retries += 1
+        self._set_status(task, '重试中')
+        task['progress'] = 0
+        delay = self._retry_delay(task['retry_count'])
+        LOG.info(f"{task['filename']} 翻译失败，{delay:.1f}秒后第{task['retry_count']}次重试: {task['error_message']}")
+        timer = threading.Timer(delay, self._requeue_retry, args=(task,))
+        timer.daemon = True
+        self._retry_timers[task['id']] = timer
+        timer.start()
+    
+    def _requeue_retry(self, task: Dict[str, Any]):
+        with self._lock:
+            self._retry_timers.pop(task['id'], None)
+            if task['id'] in self._active_ids and not self._stop_requested:
+                self._enqueue(task)
+    
+    def _check_idle(self):
+        """所有任务结束后标记处理完成并让调度线程退出（需持有锁）"""
+        if self.is_processing and not self._active_ids:
+            self.is_processing = False
+            if self._active_since is not None:
+                self._active_seconds += time.time() - self._active_since
+                self._active_since = None
+            self._wake_dispatcher()
+            self._idle.notify_all()
+    
+    def wait_until_idle(self, timeout: Optional[float] = None) -> bool:
+        """阻塞直到批量处理结束，超时返回False"""
+        with self._idle:
+            return self._idle.wait_for(lambda: not self.is_processing, timeout=timeout)
     
     def _process_single_file(self, task: Dict[str, Any], translate_function: Callable) -> Dict[str, Any]:
         """处理单个文件"""
@@ -206,133 +561,313 @@ class BatchProcessorComponent:
             file_path = task['file_path']
             config = task['config']
             
-            # 调用翻译函数
+            # 内容块闸门供翻译器在每次请求模型前检查暂停与取消；
+            # 有持久化存储时传入内容块检查点，中断后重新处理可跳过已翻译的内容
+            block_gate = self._make_block_gate(task)
+            extra = {'task_id': task['id'], 'block_gate': block_gate}
+            if self.store is not None:
+                extra['checkpoint'] = self.store.checkpoint(task['id'])
+            
+            # 调用翻译函数；task_id 可用于生成互不冲突的输出文件名
             result = translate_function(
                 pdf_file_path=file_path,
                 target_language=config.get('target_language', '中文'),
                 file_format=config.get('file_format', 'markdown'),
-                progress_callback=lambda p: self._update_task_progress(task['id'], p)
+                model_type=config.get('model_type', 'OpenAI'),
+                progress_callback=self._make_progress_callback(task, block_gate),
+                **extra
             )
             
             return {
                 'success': True,
                 'result': result,
-                'output_file': result.get('output_file') if isinstance(result, dict) else None
+                'output_file': result.get('output_file') if isinstance(result, dict) else None,
+                # 翻译函数可在结果中返回模型实际消耗的 token 数
+                'tokens': result.get('tokens', 0) if isinstance(result, dict) else 0
             }
             
+        except BatchTaskCancelled as e:
+            return {
+                'success': False,
+                'cancelled': True,
+                'error': str(e)
+            }
         except Exception as e:
             return {
                 'success': False,
                 'error': str(e)
             }
     
-    def _update_task_progress(self, task_id: str, progress: float):
-        """更新任务进度"""
-        for task in self.current_batch:
-            if task['id'] == task_id:
-                task['progress'] = int(progress * 100)
-                break
+    def _make_block_gate(self, task: Dict[str, Any]) -> Callable:
+        """创建内容块闸门：暂停时阻塞，任务被取消时抛出 BatchTaskCancelled 中断翻译
+        
+        PDFTranslator.translate_pdf 在每次请求模型前调用它（block_gate 参数），
+        并发翻译时暂停与取消也能在下一个请求发出前生效。
+        """
+        cancel_event = self._cancel_events.get(task['id']) or threading.Event()
+        
+        def block_gate():
+            if cancel_event.is_set():
+                raise BatchTaskCancelled(task['id'])
+            self._resume_event.wait()
+            if cancel_event.is_set():
+                raise BatchTaskCancelled(task['id'])
+        return block_gate
+
+    def _make_progress_callback(self, task: Dict[str, Any], block_gate: Callable) -> Callable:
+        """创建与 PDFTranslator.translate_pdf 签名一致的进度回调
+        
+        回调在内容块之间执行，同样经过内容块闸门，不使用 block_gate 的翻译函数也能暂停与取消。
+        """
+        def progress_callback(page_idx: int, content_idx: int, total_contents: int):
+            block_gate()
+            task['blocks'] += 1
+            total_pages = task.get('total_pages') or (page_idx + 1)
+            page_fraction = (content_idx + 1) / total_contents if total_contents else 1.0
+            self._update_task_progress(task, (page_idx + page_fraction) / total_pages)
+        return progress_callback
+
+    def _update_task_progress(self, task: Dict[str, Any], progress: float):
+        """更新任务进度（并发翻译时回调可能乱序，只前进不后退；完成前最多显示99%）"""
+        with self._lock:
+            new_progress = max(task['progress'], min(int(progress * 100), 99))
+            if new_progress == task['progress']:
+                return
+            self._track(task, -1)
+            task['progress'] = new_progress
+            self._track(task, 1)
     
     def get_queue_display_data(self) -> List[List[str]]:
         """获取队列显示数据"""
         display_data = []
         
-        for task in self.current_batch:
-            row = [
-                task['filename'],
-                task['status'],
-                f"{task['progress']}%",
-                time.strftime('%H:%M:%S', time.localtime(task['start_time'])) if task['start_time'] else '-',
-                self._estimate_completion_time(task)
-            ]
-            display_data.append(row)
+        with self._lock:
+            work_ahead = self._work_ahead()
+            for task in self.current_batch:
+                row = [
+                    task['filename'],
+                    task['status'],
+                    f"{task['progress']}%",
+                    time.strftime('%H:%M:%S', time.localtime(task['start_time'])) if task['start_time'] else '-',
+                    self._estimate_completion_time(task, work_ahead.get(task['id'], 0.0))
+                ]
+                display_data.append(row)
             
         return display_data
     
-    def _estimate_completion_time(self, task: Dict[str, Any]) -> str:
-        """估算完成时间"""
-        if not task['start_time'] or task['progress'] == 0:
+    def _remaining_cost(self, task: Dict[str, Any]) -> float:
+        return self._task_cost(task) * (1 - task['progress'] / 100)
+    
+    def _work_ahead(self) -> Dict[str, float]:
+        """每个等待中任务之前尚需处理的工作量：处理中任务的剩余量加上排在它前面的任务（需持有锁）"""
+        ahead = self._running_cost
+        result = {}
+        for task, cost in sorted(self._pending.values(), key=lambda item: item[0].get('queue_key', (0,))):
+            result[task['id']] = ahead
+            ahead += cost
+        return result
+    
+    def _measured_rate(self, task: Optional[Dict[str, Any]] = None) -> Optional[float]:
+        """单个 worker 的处理速度（每秒完成的预估工作量）
+        
+        优先使用该任务自身的实测速度，其次是已完成任务的滑动平均，
+        都没有时取处理中任务的平均速度。
+        """
+        def observed(t):
+            elapsed = time.time() - t['start_time']
+            if t['progress'] <= 0 or elapsed <= 0:
+                return None
+            return self._task_cost(t) * t['progress'] / 100 / elapsed
+        
+        if task is not None and task['status'] == '处理中':
+            rate = observed(task)
+            if rate:
+                return rate
+        if self._cost_per_second:
+            return self._cost_per_second
+        rates = [rate for rate in (observed(t) for t, _ in self._running.values()) if rate]
+        return sum(rates) / len(rates) if rates else None
+    
+    def _estimate_completion_time(self, task: Dict[str, Any], work_ahead: float = 0.0) -> str:
+        """根据实测吞吐量估算剩余时间；等待中的任务还要计入排在前面的工作量"""
+        if task['status'] == '完成':
+            return '已完成'
+        if task['status'] not in PENDING_STATUSES and task['status'] != '处理中':
             return '-'
             
-        elapsed = time.time() - task['start_time']
-        if task['progress'] >= 100:
-            return '已完成'
+        rate = self._measured_rate(task)
+        if not rate:
+            return '-'
             
-        estimated_total = elapsed / (task['progress'] / 100)
-        remaining = estimated_total - elapsed
-        
-        if remaining < 60:
-            return f"{int(remaining)}秒"
-        elif remaining < 3600:
-            return f"{int(remaining/60)}分钟"
+        if task['status'] == '处理中':
+            remaining = self._remaining_cost(task) / rate
+        else:
+            remaining = (work_ahead + self._task_cost(task)) / (rate * max(self.max_workers, 1))
+        return self._format_duration(remaining)
+    
+    @staticmethod
+    def _format_duration(seconds: float) -> str:
+        if seconds < 60:
+            return f"{int(seconds)}秒"
+        elif seconds < 3600:
+            return f"{int(seconds/60)}分钟"
         else:
-            return f"{int(remaining/3600)}小时"
+            return f"{int(seconds/3600)}小时"
+    
+    def _policy_label(self) -> str:
+        for label, policy in SCHEDULING_POLICIES.items():
+            if policy == self.scheduling_policy:
+                return label
+        return self.scheduling_policy
     
     def get_batch_status(self) -> str:
-        """获取批量处理状态"""
+        """获取批量处理状态（使用增量维护的计数，不扫描任务列表）"""
         if not self.current_batch:
             return "暂无批量任务"
             
-        total = len(self.current_batch)
-        completed = sum(1 for task in self.current_batch if task['status'] == '完成')
-        failed = sum(1 for task in self.current_batch if task['status'] == '失败')
-        processing = sum(1 for task in self.current_batch if task['status'] == '处理中')
-        waiting = sum(1 for task in self.current_batch if task['status'] == '等待中')
-        
-        status_lines = [
-            f"总任务数: {total}",
-            f"已完成: {completed} | 处理中: {processing}",
-            f"等待中: {waiting} | 失败: {failed}",
-            f"处理状态: {'进行中' if self.is_processing else '已停止'}"
-        ]
+        with self._lock:
+            counts = self._status_counts
+            waiting = sum(counts[status] for status in PENDING_STATUSES)
+            eta = self._estimate_batch_remaining()
+            status_lines = [
+                f"总任务数: {len(self.current_batch)}",
+                f"已完成: {counts['完成']} | 处理中: {counts['处理中']}",
+                f"等待中: {waiting} | 失败: {counts['失败']} | 已取消: {counts['已取消']}",
+                f"处理状态: {self._processing_state()} | 调度策略: {self._policy_label()}",
+                f"预计剩余: {self._format_duration(eta) if eta is not None else '-'}"
+            ]
         
         return "\n".join(status_lines)
     
+    def _processing_state(self) -> str:
+        if not self.is_processing:
+            return '已停止'
+        if self._stop_requested:
+            return '正在停止'
+        return '已暂停' if not self._resume_event.is_set() else '进行中'
+    
+    def _elapsed_seconds(self) -> float:
+        """批量处理累计运行时长（需持有锁）"""
+        elapsed = self._active_seconds
+        if self._active_since is not None:
+            elapsed += time.time() - self._active_since
+        return elapsed
+    
+    def get_throughput(self) -> Dict[str, float]:
+        """按累计运行时长计算的实际吞吐量"""
+        with self._lock:
+            elapsed = self._elapsed_seconds()
+            if elapsed <= 0:
+                return {'pages_per_minute': 0.0, 'tokens_per_second': 0.0, 'files_per_hour': 0.0}
+            return {
+                'pages_per_minute': self._completed['pages'] / elapsed * 60,
+                'tokens_per_second': self._completed['tokens'] / elapsed,
+                'files_per_hour': self._completed['files'] / elapsed * 3600,
+            }
+    
+    def _estimate_batch_remaining(self) -> Optional[float]:
+        """用整体吞吐量（已包含并发）估算剩余工作所需时间（需持有锁）"""
+        elapsed = self._elapsed_seconds()
+        if not self._completed['cost'] or elapsed <= 0 or not self._active_ids:
+            return None
+        remaining = max(self._pending_cost + self._running_cost, 0.0)
+        return remaining / (self._completed['cost'] / elapsed)
+    
+    @staticmethod
+    def _percentile(sorted_values: List[float], percent: float) -> float:
+        """最近秩法求百分位数，sorted_values 须已排序"""
+        if not sorted_values:
+            return 0.0
+        rank = max(1, int(-(-percent * len(sorted_values) // 100)))
+        return sorted_values[min(rank, len(sorted_values)) - 1]
+    
     def get_batch_summary(self) -> str:
         """获取批量处理摘要"""
         if not self.batch_results:
             return "暂无处理结果"
             
-        successful = sum(1 for result in self.batch_results.values() if result['status'] == '完成')
-        failed = sum(1 for result in self.batch_results.values() if result['status'] == '失败')
-        
-        total_time = 0
-        for result in self.batch_results.values():
-            if result['start_time'] and result['status'] == '完成':
-                # 这里需要实际的结束时间，简化处理
-                total_time += 60  # 假设每个文件平均1分钟
-                
-        summary_lines = [
-            f"成功: {successful} | 失败: {failed}",
-            f"总耗时: {int(total_time/60)}分钟",
-            f"平均耗时: {int(total_time/max(successful, 1))}秒/文件"
-        ]
+        with self._lock:
+            counts = self._status_counts
+            completed = self._completed
+            elapsed = self._elapsed_seconds()
+            latencies = self._latencies
+            summary_lines = [
+                f"成功: {counts['完成']} | 失败: {counts['失败']} | 已取消: {counts['已取消']} | 重试: {self._retries}次",
+                f"总耗时: {self._format_duration(elapsed)} | 已完成 {completed['pages']} 页 / {completed['blocks']} 个内容块 / {completed['tokens']} tokens",
+            ]
+            if latencies:
+                summary_lines.append(
+                    f"单文件耗时: 平均 {sum(latencies) / len(latencies):.1f}秒 | "
+                    f"P50 {self._percentile(latencies, 50):.1f}秒 | P95 {self._percentile(latencies, 95):.1f}秒"
+                )
+        throughput = self.get_throughput()
+        summary_lines.append(
+            f"吞吐量: {throughput['pages_per_minute']:.1f} 页/分钟 | {throughput['tokens_per_second']:.1f} tokens/秒"
+        )
         
         return "\n".join(summary_lines)
     
     def pause_processing(self) -> str:
-        """暂停处理"""
-        self.is_processing = False
+        """暂停处理：不再提交新任务，处理中的文件在下一个内容块前等待"""
+        if not self.is_processing:
+            return "当前没有进行中的批量处理"
+        self._resume_event.clear()
         return "批量处理已暂停"
     
+    def resume_processing(self) -> str:
+        """继续处理"""
+        if not self.is_processing:
+            return "当前没有进行中的批量处理"
+        self._resume_event.set()
+        return "批量处理已继续"
+    
+    def cancel_task(self, task_id: str) -> bool:
+        """取消单个任务：排队或等待重试的直接取消，处理中的在下一个内容块前中断"""
+        with self._lock:
+            if task_id not in self._active_ids:
+                return False
+            cancel_event = self._cancel_events.get(task_id)
+            if cancel_event is not None:
+                # 处理中的任务由完成回调标记为已取消
+                cancel_event.set()
+                return True
+            timer = self._retry_timers.pop(task_id, None)
+            if timer is not None:
+                timer.cancel()
+            for task in self.current_batch:
+                if task['id'] == task_id:
+                    self._set_status(task, '已取消')
+                    self._finish_task(task)
+            return True
+    
     def stop_processing(self) -> str:
-        """停止处理"""
-        self.is_processing = False
-        # 清空队列中等待的任务
-        while not self.processing_queue.empty():
-            try:
-                self.processing_queue.get_nowait()
-            except queue.Empty:
-                break
+        """停止处理：取消排队和等待重试的任务，并中断处理中的任务"""
+        with self._lock:
+            self._stop_requested = True
+            for task_id in list(self._active_ids):
+                self.cancel_task(task_id)
+            self._drain_queue()
+            # 唤醒暂停中的调度线程和进度回调，让它们观察到取消
+            self._resume_event.set()
+            self._wake_dispatcher()
         return "批量处理已停止，队列已清空"
     
     def clear_queue(self) -> str:
         """清空队列"""
-        self.current_batch = []
-        self.batch_results = {}
-        while not self.processing_queue.empty():
+        if self.is_processing:
+            self.stop_processing()
+        with self._lock:
+            self.current_batch = []
+            self.batch_results = {}
+            self._reset_stats()
+            self._drain_queue()
+            if self.store is not None:
+                self.store.clear()
+        return "处理队列已清空"
+    
+    def _drain_queue(self):
+        while True:
             try:
                 self.processing_queue.get_nowait()
             except queue.Empty:
                 break
-        return "处理队列已清空"
@@ -0,0 +1,123 @@
+import json
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+# 只在内存中使用的调度字段，不写入数据库
+TRANSIENT_FIELDS = ('queue_key', 'virtual_start')
+
+
+class BatchTaskStore:
+    """批量任务的持久化存储（SQLite，WAL 模式）
+
+    保存任务状态、重试次数与输出文件，以及每个内容块的翻译检查点，
+    应用重启后据此恢复未完成的任务并跳过已翻译的内容块。
+    """
+
+    def __init__(self, db_path: str = "batch_queue.db"):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS tasks ("
+                " id TEXT PRIMARY KEY,"
+                " seq INTEGER NOT NULL,"
+                " status TEXT NOT NULL,"
+                " data TEXT NOT NULL,"
+                " updated_at REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS checkpoints ("
+                " task_id TEXT NOT NULL,"
+                " page_idx INTEGER NOT NULL,"
+                " content_idx INTEGER NOT NULL,"
+                " translation TEXT NOT NULL,"
+                " status INTEGER NOT NULL,"
+                " PRIMARY KEY (task_id, page_idx, content_idx))"
+            )
+        self._next_seq = self._max_seq() + 1
+
+    def _max_seq(self) -> int:
+        row = self._conn.execute("SELECT MAX(seq) FROM tasks").fetchone()
+        return row[0] or 0
+
+    def save_task(self, task: Dict[str, Any]):
+        """写入或更新任务；首次写入时记录入队顺序"""
+        data = {key: value for key, value in task.items() if key not in TRANSIENT_FIELDS}
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT seq FROM tasks WHERE id = ?", (task['id'],)).fetchone()
+            if row is None:
+                seq = self._next_seq
+                self._next_seq += 1
+            else:
+                seq = row[0]
+            self._conn.execute(
+                "INSERT OR REPLACE INTO tasks (id, seq, status, data, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (task['id'], seq, task['status'], json.dumps(data, ensure_ascii=False, default=str), time.time())
+            )
+
+    def load_tasks(self) -> List[Dict[str, Any]]:
+        """按入队顺序读取全部任务"""
+        with self._lock:
+            rows = self._conn.execute("SELECT data FROM tasks ORDER BY seq").fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def delete_task(self, task_id: str):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM tasks WHERE id = ?", (task_id,))
+            self._conn.execute("DELETE FROM checkpoints WHERE task_id = ?", (task_id,))
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM tasks")
+            self._conn.execute("DELETE FROM checkpoints")
+
+    def save_block(self, task_id: str, page_idx: int, content_idx: int, translation: str, status: bool):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO checkpoints (task_id, page_idx, content_idx, translation, status)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (task_id, page_idx, content_idx, translation, int(status))
+            )
+
+    def load_blocks(self, task_id: str) -> Dict[Tuple[int, int], Tuple[str, bool]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT page_idx, content_idx, translation, status FROM checkpoints WHERE task_id = ?",
+                (task_id,)
+            ).fetchall()
+        return {(page_idx, content_idx): (translation, bool(status)) for page_idx, content_idx, translation, status in rows}
+
+    def clear_blocks(self, task_id: str):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM checkpoints WHERE task_id = ?", (task_id,))
+
+    def checkpoint(self, task_id: str) -> 'TaskCheckpoint':
+        return TaskCheckpoint(self, task_id)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class TaskCheckpoint:
+    """单个任务的内容块检查点，供 PDFTranslator.translate_pdf 读写"""
+
+    def __init__(self, store: BatchTaskStore, task_id: str):
+        self.store = store
+        self.task_id = task_id
+        self._blocks = store.load_blocks(task_id)
+
+    def __len__(self) -> int:
+        return len(self._blocks)
+
+    def load(self, page_idx: int, content_idx: int) -> Optional[Tuple[str, bool]]:
+        return self._blocks.get((page_idx, content_idx))
+
+    def save(self, page_idx: int, content_idx: int, translation: str, status: bool):
+        self._blocks[(page_idx, content_idx)] = (translation, status)
+        self.store.save_block(self.task_id, page_idx, content_idx, translation, status)
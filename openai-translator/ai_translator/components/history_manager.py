@@ -1,15 +1,59 @@
 import gradio as gr
 import json
 import os
-from datetime import datetime
-from typing import List, Dict, Any, Optional
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from typing import List, Dict, Any, Optional, Tuple
+try:
+    from ..utils import LOG, MonotonicIdGenerator
+except ImportError:  # pragma: no cover - fallback for direct execution
+    from utils import LOG, MonotonicIdGenerator
+
+# 历史记录表的列；其它字段以 JSON 形式保存在 extra 列
+RECORD_COLUMNS = (
+    'id', 'timestamp', 'input_file', 'filename', 'source_language', 'target_language',
+    'output_file', 'status', 'file_size', 'start_time', 'end_time', 'duration', 'error_message'
+)
+
+# 翻译结束的状态，更新为这些状态时立即落盘
+TERMINAL_STATUSES = ('完成', '失败')
+
+RECORD_IDS = MonotonicIdGenerator()
+
+# 历史记录分页
+DEFAULT_PAGE_SIZE = 20
+PAGE_SIZE_CHOICES = [20, 50, 100]
+# 筛选下拉框中表示不筛选的选项
+ALL_OPTION = '全部'
 
 class HistoryManagerComponent:
-    """翻译历史记录管理组件"""
+    """翻译历史记录管理组件
+    
+    记录保存在 SQLite 数据库（WAL 模式）中，按 id 建主键、按时间与状态建索引，
+    所有读写都在同一把锁下进行，可被多个批量处理线程同时调用。
+    进度等中间更新先在内存中按记录合并，每隔 flush_interval 秒批量写入一次；
+    状态变为完成或失败、以及任何查询之前都会先落盘。
+    旧版的 JSON 历史文件会在首次打开时导入一次。
+    """
     
-    def __init__(self, history_file: str = "translation_history.json"):
+    def __init__(self, history_file: str = "translation_history.json", db_path: Optional[str] = None,
+                 flush_interval: float = 0.5):
         self.history_file = history_file
-        self.history_data = self.load_history()
+        self.flush_interval = flush_interval
+        # 尚未写入数据库的更新：记录 id -> 合并后的字段
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._flush_timer: Optional[threading.Timer] = None
+        self.db_path = db_path or os.path.splitext(history_file)[0] + ".db"
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._create_schema()
+        self._import_json_history()
+        # 当前页各行对应的记录 id，用于把表格选中行映射回记录
+        self._page_ids: List[str] = []
         
     def create_history_interface(self):
         """创建历史记录界面"""
@@ -21,6 +65,22 @@ class HistoryManagerComponent:
                 clear_btn = gr.Button("🗑️ 清空历史", variant="secondary")
                 export_btn = gr.Button("📤 导出历史", variant="secondary")
                 
+            # 筛选条件
+            with gr.Row():
+                status_filter = gr.Dropdown(
+                    choices=[ALL_OPTION, '完成', '失败', '进行中'],
+                    value=ALL_OPTION,
+                    label="状态"
+                )
+                language_filter = gr.Dropdown(
+                    choices=[ALL_OPTION, '中文', '英文', '日文', '韩文', '法文', '德文', '西班牙文'],
+                    value=ALL_OPTION,
+                    label="目标语言"
+                )
+                filename_filter = gr.Textbox(label="文件名", placeholder="包含的关键字")
+                date_from = gr.Textbox(label="开始日期", placeholder="YYYY-MM-DD")
+                date_to = gr.Textbox(label="结束日期", placeholder="YYYY-MM-DD")
+                
             # 历史记录列表
             history_list = gr.Dataframe(
                 headers=["时间", "文件名", "源语言", "目标语言", "状态", "输出文件"],
@@ -30,6 +90,16 @@ class HistoryManagerComponent:
                 row_count=10
             )
             
+            # 分页
+            with gr.Row():
+                prev_page_btn = gr.Button("⬅️ 上一页", variant="secondary")
+                page_number = gr.Number(label="页码", value=1, precision=0, minimum=1)
+                page_size = gr.Dropdown(choices=PAGE_SIZE_CHOICES, value=DEFAULT_PAGE_SIZE, label="每页条数")
+                next_page_btn = gr.Button("下一页 ➡️", variant="secondary")
+            page_info = gr.Markdown("")
+            # 当前页各行的记录ID，按会话保存
+            page_ids = gr.State([])
+            
             # 详细信息显示
             with gr.Row():
                 with gr.Column(scale=1):
@@ -55,8 +125,17 @@ class HistoryManagerComponent:
             
         components = {
             'history_list': history_list,
+            'page_ids': page_ids,
             'selected_info': selected_info,
-            'stats_info': stats_info
+            'stats_info': stats_info,
+            'status_filter': status_filter,
+            'language_filter': language_filter,
+            'filename_filter': filename_filter,
+            'date_from': date_from,
+            'date_to': date_to,
+            'page_number': page_number,
+            'page_size': page_size,
+            'page_info': page_info
         }
         
         buttons = {
@@ -65,29 +144,133 @@ class HistoryManagerComponent:
             'export_btn': export_btn,
             'rerun_btn': rerun_btn,
             'download_btn': download_btn,
-            'delete_btn': delete_btn
+            'delete_btn': delete_btn,
+            'prev_page_btn': prev_page_btn,
+            'next_page_btn': next_page_btn
         }
         
         return components, buttons
     
-    def load_history(self) -> List[Dict[str, Any]]:
-        """加载历史记录"""
-        try:
-            if os.path.exists(self.history_file):
-                with open(self.history_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            return []
-        except Exception:
-            return []
-    
-    def save_history(self) -> bool:
-        """保存历史记录"""
+    def _create_schema(self):
+        columns = ", ".join(
+            "id TEXT PRIMARY KEY" if column == 'id'
+            else "file_size INTEGER NOT NULL DEFAULT 0" if column == 'file_size'
+            else f"{column} TEXT"
+            for column in RECORD_COLUMNS
+        )
+        with self._lock, self._conn:
+            self._conn.execute(f"CREATE TABLE IF NOT EXISTS history ({columns}, extra TEXT)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_history_timestamp ON history (timestamp)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_history_status ON history (status, timestamp)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_history_language ON history (target_language, timestamp)")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            self._create_stats_schema()
+    
+    def _create_stats_schema(self):
+        """按状态汇总的记录数与文件大小，由触发器随每次增删改增量维护"""
+        exists = self._conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'history_stats'"
+        ).fetchone()
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS history_stats ("
+            " status TEXT PRIMARY KEY,"
+            " records INTEGER NOT NULL,"
+            " total_size INTEGER NOT NULL)"
+        )
+        self._conn.executescript("""
+            CREATE TRIGGER IF NOT EXISTS history_stats_insert AFTER INSERT ON history BEGIN
+                INSERT INTO history_stats (status, records, total_size)
+                VALUES (COALESCE(NEW.status, ''), 1, NEW.file_size)
+                ON CONFLICT(status) DO UPDATE SET records = records + 1, total_size = total_size + NEW.file_size;
+            END;
+            CREATE TRIGGER IF NOT EXISTS history_stats_delete AFTER DELETE ON history BEGIN
+                UPDATE history_stats SET records = records - 1, total_size = total_size - OLD.file_size
+                WHERE status = COALESCE(OLD.status, '');
+            END;
+            CREATE TRIGGER IF NOT EXISTS history_stats_update AFTER UPDATE OF status, file_size ON history BEGIN
+                UPDATE history_stats SET records = records - 1, total_size = total_size - OLD.file_size
+                WHERE status = COALESCE(OLD.status, '');
+                INSERT INTO history_stats (status, records, total_size)
+                VALUES (COALESCE(NEW.status, ''), 1, NEW.file_size)
+                ON CONFLICT(status) DO UPDATE SET records = records + 1, total_size = total_size + NEW.file_size;
+            END;
+        """)
+        if not exists:
+            # 旧数据库首次升级时一次性回填汇总
+            self._conn.execute(
+                "INSERT INTO history_stats (status, records, total_size) "
+                "SELECT COALESCE(status, ''), COUNT(*), COALESCE(SUM(file_size), 0) FROM history GROUP BY COALESCE(status, '')"
+            )
+    
+    def _import_json_history(self):
+        """把旧版 JSON 历史文件导入数据库，每个文件只导入一次"""
+        if not os.path.exists(self.history_file):
+            return
+        marker = f"imported:{os.path.abspath(self.history_file)}"
+        with self._lock:
+            if self._conn.execute("SELECT 1 FROM meta WHERE key = ?", (marker,)).fetchone():
+                return
         try:
-            with open(self.history_file, 'w', encoding='utf-8') as f:
-                json.dump(self.history_data, f, ensure_ascii=False, indent=2)
-            return True
-        except Exception:
-            return False
+            with open(self.history_file, 'r', encoding='utf-8') as f:
+                records = json.load(f)
+        except (OSError, ValueError):
+            records = []
+        if not isinstance(records, list):
+            records = []
+        with self._lock, self._conn:
+            # 旧文件最新记录在前，倒序插入以保持插入顺序与时间顺序一致
+            for record in reversed(records):
+                if isinstance(record, dict) and record.get('id'):
+                    self._conn.execute(
+                        f"INSERT OR IGNORE INTO history ({', '.join(RECORD_COLUMNS)}, extra) "
+                        f"VALUES ({', '.join('?' * (len(RECORD_COLUMNS) + 1))})",
+                        self._to_row(record)
+                    )
+            self._conn.execute("INSERT INTO meta (key, value) VALUES (?, ?)", (marker, datetime.now().isoformat()))
+        if records:
+            LOG.info(f"已从 {self.history_file} 导入 {len(records)} 条历史记录")
+    
+    @staticmethod
+    def _to_row(record: Dict[str, Any]) -> tuple:
+        extra = {key: value for key, value in record.items() if key not in RECORD_COLUMNS}
+        values = [record.get(column) for column in RECORD_COLUMNS]
+        values[RECORD_COLUMNS.index('file_size')] = record.get('file_size') or 0
+        return (*values, json.dumps(extra, ensure_ascii=False, default=str) if extra else None)
+    
+    @staticmethod
+    def _from_row(row: sqlite3.Row) -> Dict[str, Any]:
+        record = {column: row[column] for column in RECORD_COLUMNS}
+        if row['extra']:
+            record.update(json.loads(row['extra']))
+        return record
+    
+    def _get_record(self, record_id: str) -> Optional[Dict[str, Any]]:
+        row = self._conn.execute("SELECT * FROM history WHERE id = ?", (record_id,)).fetchone()
+        return self._from_row(row) if row else None
+    
+    def _insert_record(self, record: Dict[str, Any]):
+        """插入一条新记录；id 已存在时抛出 sqlite3.IntegrityError，不覆盖已有记录（调用方负责加锁与事务）"""
+        self._conn.execute(
+            f"INSERT INTO history ({', '.join(RECORD_COLUMNS)}, extra) "
+            f"VALUES ({', '.join('?' * (len(RECORD_COLUMNS) + 1))})",
+            self._to_row(record)
+        )
+    
+    def _write_record(self, record: Dict[str, Any]):
+        """整行更新一条已有记录（调用方负责加锁与事务）"""
+        assignments = ", ".join(f"{column} = ?" for column in RECORD_COLUMNS[1:])
+        record_id, *values = self._to_row(record)
+        self._conn.execute(
+            f"UPDATE history SET {assignments}, extra = ? WHERE id = ?",
+            (*values, record_id)
+        )
+    
+    def load_history(self) -> List[Dict[str, Any]]:
+        """加载全部历史记录（最新记录在前）"""
+        with self._lock:
+            self._flush_locked()
+            rows = self._conn.execute("SELECT * FROM history ORDER BY timestamp DESC, rowid DESC").fetchall()
+        return [self._from_row(row) for row in rows]
     
     def add_record(self, 
                    input_file: str,
@@ -99,7 +282,7 @@ class HistoryManagerComponent:
         """添加翻译记录"""
         
         record = {
-            'id': datetime.now().strftime("%Y%m%d_%H%M%S"),
+            'id': RECORD_IDS.next_id(),
             'timestamp': datetime.now().isoformat(),
             'input_file': input_file,
             'filename': os.path.basename(input_file),
@@ -115,48 +298,154 @@ class HistoryManagerComponent:
             **kwargs
         }
         
-        self.history_data.insert(0, record)  # 最新记录在前
-        self.save_history()
+        with self._lock, self._conn:
+            self._insert_record(record)
         return record['id']
     
     def update_record(self, record_id: str, **updates) -> bool:
-        """更新翻译记录"""
-        for record in self.history_data:
-            if record['id'] == record_id:
+        """更新翻译记录
+        
+        更新先合并进内存缓冲区，连续的进度更新只会写入最后一次；
+        状态变为完成或失败时立即把缓冲区写入数据库。
+        """
+        # 如果状态变为完成或失败，记录结束时间
+        if updates.get('status') in TERMINAL_STATUSES:
+            updates['end_time'] = datetime.now().isoformat()
+            
+        with self._lock:
+            if record_id not in self._pending and not self._record_exists(record_id):
+                return False
+            self._pending.setdefault(record_id, {}).update(updates)
+            if 'end_time' in updates:
+                self._flush_locked()
+            elif self._flush_timer is None:
+                self._flush_timer = threading.Timer(self.flush_interval, self.flush)
+                self._flush_timer.daemon = True
+                self._flush_timer.start()
+        return True
+    
+    def _record_exists(self, record_id: str) -> bool:
+        return self._conn.execute("SELECT 1 FROM history WHERE id = ?", (record_id,)).fetchone() is not None
+    
+    def flush(self):
+        """把缓冲的更新写入数据库"""
+        with self._lock:
+            self._flush_locked()
+    
+    def _flush_locked(self):
+        """在一个事务中写入全部缓冲的更新（需持有锁）"""
+        if self._flush_timer is not None:
+            self._flush_timer.cancel()
+            self._flush_timer = None
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, {}
+        with self._conn:
+            for record_id, updates in pending.items():
+                record = self._get_record(record_id)
+                if record is None:
+                    continue
                 record.update(updates)
-                
-                # 如果状态变为完成或失败，记录结束时间
-                if updates.get('status') in ['完成', '失败']:
-                    record['end_time'] = datetime.now().isoformat()
-                    if record.get('start_time'):
-                        start = datetime.fromisoformat(record['start_time'])
-                        end = datetime.fromisoformat(record['end_time'])
-                        record['duration'] = str(end - start)
-                
-                self.save_history()
-                return True
-        return False
-    
-    def get_history_table_data(self) -> List[List[str]]:
-        """获取历史记录表格数据"""
-        table_data = []
-        for record in self.history_data:
-            row = [
-                record.get('timestamp', '')[:19].replace('T', ' '),  # 格式化时间
-                record.get('filename', ''),
-                record.get('source_language', ''),
-                record.get('target_language', ''),
-                record.get('status', ''),
-                os.path.basename(record.get('output_file', '')) if record.get('output_file') else ''
-            ]
-            table_data.append(row)
+                if updates.get('end_time') and record.get('start_time'):
+                    start = datetime.fromisoformat(record['start_time'])
+                    end = datetime.fromisoformat(record['end_time'])
+                    record['duration'] = str(end - start)
+                self._write_record(record)
+    
+    def close(self):
+        """写入缓冲的更新并关闭数据库连接"""
+        with self._lock:
+            self._flush_locked()
+            self._conn.close()
+    
+    @staticmethod
+    def _build_filters(status: Optional[str] = None,
+                       target_language: Optional[str] = None,
+                       filename: Optional[str] = None,
+                       date_from: Optional[str] = None,
+                       date_to: Optional[str] = None) -> Tuple[str, list]:
+        """把筛选条件转换为 WHERE 子句；日期格式为 YYYY-MM-DD，格式错误时抛出 ValueError"""
+        clauses, params = [], []
+        if status and status != ALL_OPTION:
+            clauses.append("status = ?")
+            params.append(status)
+        if target_language and target_language != ALL_OPTION:
+            clauses.append("target_language = ?")
+            params.append(target_language)
+        if filename and filename.strip():
+            clauses.append("filename LIKE ? ESCAPE '\\'")
+            keyword = filename.strip().replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+            params.append(f"%{keyword}%")
+        if date_from and date_from.strip():
+            clauses.append("timestamp >= ?")
+            params.append(datetime.strptime(date_from.strip(), "%Y-%m-%d").isoformat())
+        if date_to and date_to.strip():
+            # 结束日期当天的记录也包含在内
+            clauses.append("timestamp < ?")
+            params.append((datetime.strptime(date_to.strip(), "%Y-%m-%d") + timedelta(days=1)).isoformat())
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+    
+    def query_history(self, page: int = 1, page_size: int = DEFAULT_PAGE_SIZE, **filters) -> Tuple[List[Dict[str, Any]], int]:
+        """按条件分页查询历史记录（最新记录在前），返回 (当前页记录, 符合条件的总数)"""
+        where, params = self._build_filters(**filters)
+        page_size = max(1, int(page_size))
+        offset = (max(1, int(page)) - 1) * page_size
+        with self._lock:
+            self._flush_locked()
+            total = self._conn.execute(f"SELECT COUNT(*) FROM history{where}", params).fetchone()[0]
+            rows = self._conn.execute(
+                f"SELECT * FROM history{where} ORDER BY timestamp DESC, rowid DESC LIMIT ? OFFSET ?",
+                (*params, page_size, offset)
+            ).fetchall()
+        return [self._from_row(row) for row in rows], total
+    
+    def query_history_page(self, page: int = 1, page_size: int = DEFAULT_PAGE_SIZE,
+                           **filters) -> Tuple[List[List[str]], str, int, List[str]]:
+        """获取一页表格数据，返回 (表格数据, 分页说明, 实际页码, 各行记录ID)；页码超出范围时取最近的有效页
+
+        不修改组件状态，多个会话各自保存返回的记录ID，选中行时传给 get_record_details。
+        """
+        page_size = max(1, int(page_size or DEFAULT_PAGE_SIZE))
+        page = max(1, int(page or 1))
+        records, total = self.query_history(page, page_size, **filters)
+        total_pages = max(1, -(-total // page_size))
+        if page > total_pages:
+            page = total_pages
+            records, total = self.query_history(page, page_size, **filters)
+        page_info = f"第 {page}/{total_pages} 页，共 {total} 条记录"
+        return [self._to_table_row(record) for record in records], page_info, page, [record['id'] for record in records]
+    
+    def get_history_page(self, page: int = 1, page_size: int = DEFAULT_PAGE_SIZE, **filters) -> Tuple[List[List[str]], str, int]:
+        """获取一页表格数据，返回 (表格数据, 分页说明, 实际页码)，并记住该页的记录ID"""
+        table_data, page_info, page, self._page_ids = self.query_history_page(page, page_size, **filters)
+        return table_data, page_info, page
+    
+    def get_history_table_data(self, page: int = 1, page_size: int = DEFAULT_PAGE_SIZE, **filters) -> List[List[str]]:
+        """获取历史记录表格数据（一页）"""
+        table_data, _, _ = self.get_history_page(page, page_size, **filters)
         return table_data
     
-    def get_record_details(self, row_index: int) -> str:
-        """获取记录详细信息"""
-        if 0 <= row_index < len(self.history_data):
-            record = self.history_data[row_index]
-            
+    @staticmethod
+    def _to_table_row(record: Dict[str, Any]) -> List[str]:
+        return [
+            (record.get('timestamp') or '')[:19].replace('T', ' '),  # 格式化时间
+            record.get('filename') or '',
+            record.get('source_language') or '',
+            record.get('target_language') or '',
+            record.get('status') or '',
+            os.path.basename(record.get('output_file', '')) if record.get('output_file') else ''
+        ]
+    
+    def get_record_details(self, row_index: int, page_ids: Optional[List[str]] = None) -> str:
+        """获取当前页第 row_index 行记录的详细信息；page_ids 为调用方保存的该页记录ID"""
+        record = None
+        if page_ids is None:
+            page_ids = self._page_ids
+        if 0 <= row_index < len(page_ids):
+            with self._lock:
+                self._flush_locked()
+                record = self._get_record(page_ids[row_index])
+        if record is not None:
             details = []
             details.append(f"记录ID: {record.get('id', 'N/A')}")
             details.append(f"输入文件: {record.get('input_file', 'N/A')}")
@@ -172,17 +461,24 @@ class HistoryManagerComponent:
             return "\n".join(details)
         return "未选择记录"
     
+    def get_aggregates(self) -> Dict[str, Dict[str, int]]:
+        """按状态汇总的记录数与文件大小（读取增量维护的汇总表）"""
+        with self._lock:
+            self._flush_locked()
+            rows = self._conn.execute("SELECT status, records, total_size FROM history_stats WHERE records > 0").fetchall()
+        return {row['status']: {'records': row['records'], 'total_size': row['total_size']} for row in rows}
+    
     def get_statistics(self) -> str:
         """获取统计信息"""
-        total_records = len(self.history_data)
+        aggregates = self.get_aggregates()
+        total_records = sum(item['records'] for item in aggregates.values())
         if total_records == 0:
             return "暂无翻译记录"
             
-        completed = sum(1 for r in self.history_data if r.get('status') == '完成')
-        failed = sum(1 for r in self.history_data if r.get('status') == '失败')
-        in_progress = sum(1 for r in self.history_data if r.get('status') == '进行中')
-        
-        total_size = sum(r.get('file_size', 0) for r in self.history_data)
+        completed = aggregates.get('完成', {}).get('records', 0)
+        failed = aggregates.get('失败', {}).get('records', 0)
+        in_progress = aggregates.get('进行中', {}).get('records', 0)
+        total_size = sum(item['total_size'] for item in aggregates.values())
         
         stats = []
         stats.append(f"总记录数: {total_records}")
@@ -204,18 +500,21 @@ class HistoryManagerComponent:
     
     def clear_history(self) -> bool:
         """清空历史记录"""
-        self.history_data = []
-        return self.save_history()
+        try:
+            with self._lock, self._conn:
+                self._pending.clear()
+                self._conn.execute("DELETE FROM history")
+            self._page_ids = []
+            return True
+        except sqlite3.Error:
+            return False
     
     def delete_record(self, record_id: str) -> bool:
         """删除指定记录"""
-        original_length = len(self.history_data)
-        self.history_data = [r for r in self.history_data if r.get('id') != record_id]
-        
-        if len(self.history_data) < original_length:
-            self.save_history()
-            return True
-        return False
+        with self._lock, self._conn:
+            self._pending.pop(record_id, None)
+            cursor = self._conn.execute("DELETE FROM history WHERE id = ?", (record_id,))
+        return cursor.rowcount > 0
     
     def export_history(self, export_path: str = None) -> tuple[bool, str]:
         """导出历史记录"""
@@ -224,7 +523,7 @@ class HistoryManagerComponent:
             
         try:
             with open(export_path, 'w', encoding='utf-8') as f:
-                json.dump(self.history_data, f, ensure_ascii=False, indent=2)
+                json.dump(self.load_history(), f, ensure_ascii=False, indent=2)
             return True, f"历史记录已导出到: {export_path}"
         except Exception as e:
             return False, f"导出失败: {str(e)}"
\ No newline at end of file
@@ -1,6 +1,7 @@
 import gradio as gr
+import threading
 import time
-from typing import Dict, Any, Generator
+from typing import Dict, Any, Generator, Iterator, Optional
 
 class ProgressDisplayComponent:
     """实时翻译进度显示组件"""
@@ -93,3 +94,70 @@ class ProgressDisplayComponent:
                 )
                 time.sleep(0.5)
         return update_generator
+
+
+
+class ProgressChannel:
+    """单次翻译的进度通道
+
+    翻译线程通过 publish 推送进度快照，界面一侧通过 updates 订阅；
+    只有快照发生变化时才通知订阅方，min_interval 内的多次更新合并为最新的一次。
+    每次翻译各自创建通道，不同会话之间互不影响。
+    """
+
+    def __init__(self, initial: Optional[tuple] = None):
+        self._condition = threading.Condition()
+        self._snapshot = initial
+        self._version = 0
+        self._closed = False
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def snapshot(self) -> Optional[tuple]:
+        with self._condition:
+            return self._snapshot
+
+    def publish(self, snapshot: tuple) -> bool:
+        """推送进度快照；与当前快照相同则忽略，返回是否产生了更新"""
+        with self._condition:
+            if self._closed or snapshot == self._snapshot:
+                return False
+            self._snapshot = snapshot
+            self._version += 1
+            self._condition.notify_all()
+            return True
+
+    def close(self, snapshot: Optional[tuple] = None):
+        """推送最终快照并结束通道，订阅方输出最后一次更新后退出"""
+        with self._condition:
+            if snapshot is not None and snapshot != self._snapshot:
+                self._snapshot = snapshot
+                self._version += 1
+            self._closed = True
+            self._condition.notify_all()
+
+    def updates(self, min_interval: float = 0.25, keepalive: Optional[float] = None) -> Iterator[tuple]:
+        """按变化产出进度快照，直到通道关闭
+
+        两次产出之间至少间隔 min_interval 秒，期间的更新只保留最新快照；
+        keepalive 不为 None 时，长时间无变化也会重发当前快照。
+        """
+        last_version = 0
+        last_emit = 0.0
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._version != last_version or self._closed, timeout=keepalive)
+                changed = self._version != last_version
+                snapshot, last_version, closed = self._snapshot, self._version, self._closed
+            if changed or (keepalive is not None and not closed):
+                yield snapshot
+                last_emit = time.monotonic()
+            if closed:
+                return
+            # 合并窗口：这段时间内的多次更新只在窗口结束后产出一次
+            delay = min_interval - (time.monotonic() - last_emit)
+            if delay > 0:
+                with self._condition:
+                    self._condition.wait_for(lambda: self._closed, timeout=delay)
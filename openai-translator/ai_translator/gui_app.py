@@ -2,7 +2,6 @@ import gradio as gr
 import os
 import sys
 import threading
-import time
 from typing import Optional, List, Dict, Any
 
 # 添加当前目录到路径
@@ -11,33 +10,38 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 from components import (
     FileUploadComponent,
     ProgressDisplayComponent,
+    ProgressChannel,
     ConfigManagerComponent,
     HistoryManagerComponent,
     BatchProcessorComponent
 )
-from model import OpenAIModel, GLMModel
-from translator import PDFTranslator
+from components.batch_processor import PRIORITY_CLASSES
+from components.admission_queue import AdmissionQueue, DEFAULT_MAX_CONCURRENT
+from components.batch_store import BatchTaskStore
+from model import MODEL_REGISTRY
+from translator import PDFTranslator, TranslationMemory
 from utils import LOG
 
 class TranslatorGUI:
     """翻译应用主GUI类"""
     
-    def __init__(self):
+    def __init__(self, max_concurrent_translations: Optional[int] = None):
         # 初始化组件
         self.file_upload = FileUploadComponent()
         self.progress_display = ProgressDisplayComponent()
         self.config_manager = ConfigManagerComponent()
         self.history_manager = HistoryManagerComponent()
-        self.batch_processor = BatchProcessorComponent()
-        
-        # 当前翻译状态
-        self.current_translator = None
-        self.is_translating = False
-        self.current_record_id = None
-        self.progress_status = ""
-        self.progress_overall = 0
-        self.progress_page = 0
-        self.progress_time = ""
+        # 批量队列写入本地数据库，重启后恢复未完成的任务
+        self.batch_processor = BatchProcessorComponent(store=BatchTaskStore("batch_queue.db"))
+        
+        # 所有会话共享的单文件翻译准入队列；翻译状态保存在各自的请求中，不放在实例上
+        if max_concurrent_translations is None:
+            gui_config = self.config_manager.load_config().get('gui') or {}
+            max_concurrent_translations = gui_config.get('max_concurrent_translations', DEFAULT_MAX_CONCURRENT)
+        self.admission_queue = AdmissionQueue(max_concurrent_translations)
+        # 单文件与批量翻译共享的翻译记忆库，未配置时为 None
+        self.translation_memory = TranslationMemory.from_config(self.config_manager.load_config())
+        
 
     def create_interface(self):
         """创建主界面"""
@@ -142,10 +146,12 @@ class TranslatorGUI:
             outputs=[file_info]
         )
         
+        # 并发由准入队列控制，不使用 Gradio 默认的单并发限制
         translate_btn.click(
             fn=self._start_single_translation,
             inputs=[single_file, target_language, file_format, model_type],
-            outputs=[result_file, result_info] + list(progress_components)
+            outputs=[result_file, result_info] + list(progress_components),
+            concurrency_limit=None
         )
     
     def _create_batch_translate_tab(self):
@@ -176,6 +182,13 @@ class TranslatorGUI:
                         label="AI模型",
                         value='OpenAI'
                     )
+                    
+                    batch_priority = gr.Dropdown(
+                        choices=list(PRIORITY_CLASSES),
+                        label="优先级",
+                        value='普通',
+                        info="调度策略为“优先级”时生效"
+                    )
                 
                 # 批量操作按钮
                 add_to_queue_btn = gr.Button("➕ 添加到队列", variant="secondary")
@@ -193,15 +206,41 @@ class TranslatorGUI:
         
         add_to_queue_btn.click(
             fn=self._add_files_to_batch_queue,
-            inputs=[batch_files, batch_target_language, batch_file_format, batch_model_type],
+            inputs=[batch_files, batch_target_language, batch_file_format, batch_model_type, batch_priority],
             outputs=[batch_components['batch_status'], batch_components['queue_display']]
         )
         
         batch_buttons['start_batch_btn'].click(
             fn=self._start_batch_processing,
-            inputs=[batch_components['max_workers'], batch_components['retry_failed'], batch_components['max_retries']],
+            inputs=[batch_components['max_workers'], batch_components['retry_failed'], batch_components['max_retries'],
+                    batch_components['max_requests'], batch_components['scheduling_policy']],
+            outputs=[batch_components['batch_status']]
+        )
+        
+        batch_buttons['pause_batch_btn'].click(
+            fn=self.batch_processor.pause_processing,
+            outputs=[batch_components['batch_status']]
+        )
+        
+        batch_buttons['resume_batch_btn'].click(
+            fn=self.batch_processor.resume_processing,
             outputs=[batch_components['batch_status']]
         )
+        
+        batch_buttons['stop_batch_btn'].click(
+            fn=self.batch_processor.stop_processing,
+            outputs=[batch_components['batch_status']]
+        )
+        
+        batch_buttons['clear_queue_btn'].click(
+            fn=self._clear_batch_queue,
+            outputs=[batch_components['batch_status'], batch_components['queue_display']]
+        )
+        
+        batch_buttons['refresh_batch_btn'].click(
+            fn=self._refresh_batch_status,
+            outputs=[batch_components['batch_status'], batch_components['queue_display'], batch_components['batch_summary']]
+        )
     
     def _create_config_tab(self):
         """创建配置管理标签页"""
@@ -229,18 +268,55 @@ class TranslatorGUI:
         history_components, history_buttons = self.history_manager.create_history_interface()
         
         # 绑定历史记录事件
+        query_inputs = [
+            history_components['status_filter'],
+            history_components['language_filter'],
+            history_components['filename_filter'],
+            history_components['date_from'],
+            history_components['date_to'],
+            history_components['page_size']
+        ]
+        page_outputs = [
+            history_components['history_list'],
+            history_components['stats_info'],
+            history_components['page_info'],
+            history_components['page_number'],
+            history_components['page_ids']
+        ]
+        
+        # 刷新或修改筛选条件时回到第一页
         history_buttons['refresh_btn'].click(
             fn=self._refresh_history,
-            outputs=[history_components['history_list'], history_components['stats_info']]
+            inputs=query_inputs,
+            outputs=page_outputs
+        )
+        
+        history_buttons['prev_page_btn'].click(
+            fn=lambda page, *args: self._refresh_history(*args, page=page - 1),
+            inputs=[history_components['page_number']] + query_inputs,
+            outputs=page_outputs
+        )
+        
+        history_buttons['next_page_btn'].click(
+            fn=lambda page, *args: self._refresh_history(*args, page=page + 1),
+            inputs=[history_components['page_number']] + query_inputs,
+            outputs=page_outputs
+        )
+        
+        history_components['page_number'].submit(
+            fn=lambda page, *args: self._refresh_history(*args, page=page),
+            inputs=[history_components['page_number']] + query_inputs,
+            outputs=page_outputs
         )
         
         history_buttons['clear_btn'].click(
             fn=self._clear_history,
-            outputs=[history_components['history_list'], history_components['stats_info']]
+            outputs=page_outputs
         )
         
         history_components['history_list'].select(
             fn=self._select_history_record,
+            inputs=[history_components['page_ids']],
             outputs=[history_components['selected_info']]
         )
     
@@ -248,8 +324,9 @@ class TranslatorGUI:
                                 file_obj,  # 改为接收文件对象
                                 target_language: str,
                                 file_format: str,
-                                model_type: str):
-        """开始单文件翻译"""
+                                model_type: str,
+                                request: "gr.Request" = None):
+        """开始单文件翻译：先进入服务器级准入队列，轮到后在后台线程中翻译"""
         # 添加详细的调试日志
         LOG.debug(f"接收到的文件对象: {file_obj}")
         LOG.debug(f"文件对象类型: {type(file_obj)}")
@@ -281,63 +358,105 @@ class TranslatorGUI:
             yield None, f"文件验证失败: {message}", *[None] * 4
             return
 
+        # 每个会话同时只能有一个翻译，其余请求按先到先得排队
+        session_id = request.session_hash if request is not None else None
+        ticket = self.admission_queue.join(session_id)
+        if ticket is None:
+            yield None, "当前会话已有翻译在排队或进行中，请等待其完成", *[None] * 4
+            return
+
+        started = False
         try:
+            for position in self.admission_queue.wait_for_turn(ticket):
+                yield (None, f"排队中：第 {position} 位", 0, 0,
+                       f"服务器同时最多翻译 {self.admission_queue.max_concurrent} 个文件，前面还有 {position - 1} 个任务", "")
+
             config = self.config_manager.load_config()
-            model = OpenAIModel(model=config['OpenAIModel']['model'], api_key=config['OpenAIModel']['api_key']) if model_type == 'OpenAI' else GLMModel(model_url=config['GLMModel']['model_url'], timeout=config['GLMModel']['timeout'])
-            translator = PDFTranslator(model)
+            translator = PDFTranslator(self._get_model(model_type, config), translation_memory=self.translation_memory,
+                                       **PDFTranslator.options_from_config(config))
             
             record_id = self.history_manager.add_record(input_file=file_path, target_language=target_language, status="进行中")
-            self.is_translating = True
-            self.current_record_id = record_id
+            # 每次翻译使用独立的进度跟踪与进度通道，并发会话互不干扰
+            tracker = ProgressDisplayComponent()
+            channel = ProgressChannel(initial=(None, "翻译进行中...", 0, 0, "准备翻译...", ""))
 
             def progress_callback(page_num, content_idx, total_contents):
-                if self.progress_display.start_time is None:
-                    self.progress_display.initialize_progress(len(translator.book.pages))
+                if tracker.start_time is None:
+                    tracker.initialize_progress(len(translator.book.pages))
                 
-                progress_data = self.progress_display.update_page_progress(page_num, content_idx, total_contents)
-                self.progress_overall = progress_data['overall_progress']
-                self.progress_page = progress_data['page_progress']
-                self.progress_status = progress_data['status_message']
-                self.progress_time = progress_data['time_info']
+                progress_data = tracker.update_page_progress(page_num, content_idx, total_contents)
+                channel.publish((
+                    None, "翻译进行中...",
+                    round(progress_data['overall_progress'], 1),
+                    round(progress_data['page_progress'], 1),
+                    progress_data['status_message'],
+                    progress_data['time_info']
+                ))
+                # 进度更新由历史管理器合并后批量写入
+                self.history_manager.update_record(record_id, progress=round(progress_data['overall_progress'], 1))
 
             def translate_worker():
+                final_result = (None, "翻译失败", 100, 100, "翻译失败")
                 try:
                     base_name = os.path.splitext(os.path.basename(file_path))[0]
                     output_dir = config.get('common', {}).get('output_dir', './output')
                     os.makedirs(output_dir, exist_ok=True)
-                    output_file = os.path.join(output_dir, f"{base_name}_translated.{file_format}")
+                    # 以历史记录 id 区分输出文件，避免并发会话翻译同名文件时互相覆盖
+                    output_file = os.path.join(output_dir, f"{base_name}_{record_id}_translated{self._output_extension(file_format)}")
                     
                     translator.translate_pdf(file_path, file_format, target_language, output_file, progress_callback=progress_callback)
                     
                     self.history_manager.update_record(record_id, status="完成", output_file=output_file)
-                    self.final_result = (output_file, "翻译完成！")
+                    final_result = (output_file, "翻译完成！", 100, 100, "翻译完成")
                 except Exception as e:
                     error_msg = str(e)
                     LOG.error(f"翻译失败: {error_msg}")
                     self.history_manager.update_record(record_id, status="失败", error_message=error_msg)
-                    self.final_result = (None, f"翻译失败: {error_msg}")
+                    final_result = (None, f"翻译失败: {error_msg}", 100, 100, "翻译失败")
                 finally:
-                    self.is_translating = False
+                    # 即使更新历史记录出错也要关闭进度通道，否则界面会一直等待
+                    self.admission_queue.leave(ticket)
+                    channel.close(final_result + (channel.snapshot()[5],))
 
-            thread = threading.Thread(target=translate_worker)
+            thread = threading.Thread(target=translate_worker, daemon=True)
             thread.start()
+            started = True
 
-            while self.is_translating:
-                yield None, "翻译进行中...", self.progress_overall, self.progress_page, self.progress_status, self.progress_time
-                time.sleep(0.1)
-
-            yield self.final_result[0], self.final_result[1], 100, 100, "翻译完成", self.progress_time
+            # 只在进度变化时推送界面更新
+            yield from channel.updates()
 
         except Exception as e:
             error_msg = str(e)
             LOG.error(f"启动翻译失败: {error_msg}")
             yield None, f"启动翻译失败: {error_msg}", *[None] * 4
+        finally:
+            # 翻译线程启动后由其负责释放名额；在此之前退出（出错或会话断开）时在这里释放
+            if not started:
+                self.admission_queue.leave(ticket)
     
+    @staticmethod
+    def _output_extension(file_format: str) -> str:
+        return ".pdf" if file_format.lower() == "pdf" else ".md"
+
+    def _get_model(self, model_type: str, config: Dict[str, Any]):
+        """获取共享的模型客户端，相同配置在单文件与批量翻译之间复用"""
+        if model_type == 'ChatGLM':
+            return MODEL_REGISTRY.get_glm_model(
+                model_url=config['GLMModel']['model_url'],
+                timeout=config['GLMModel']['timeout']
+            )
+        return MODEL_REGISTRY.get_openai_model(
+            model=config['OpenAIModel']['model'],
+            api_key=config['OpenAIModel']['api_key'],
+            base_url=config['OpenAIModel'].get('base_url')
+        )
+
     def _add_files_to_batch_queue(self,
                                 file_paths: List[str],
                                 target_language: str,
                                 file_format: str,
-                                model_type: str):
+                                model_type: str,
+                                priority: str = '普通'):
         """添加文件到批量处理队列"""
         if not file_paths:
             return "请先选择要翻译的文件", []
@@ -352,7 +471,8 @@ class TranslatorGUI:
         config = {
             'target_language': target_language,
             'file_format': file_format,
-            'model_type': model_type
+            'model_type': model_type,
+            'priority': priority
         }
         
         # 添加到队列
@@ -361,22 +481,86 @@ class TranslatorGUI:
         
         return result_message, queue_data
     
-    def _start_batch_processing(self, max_workers: int, retry_failed: bool, max_retries: int):
+    def _start_batch_processing(self, max_workers: int, retry_failed: bool, max_retries: int, max_requests: int = 6,
+                                scheduling_policy: str = '短作业优先'):
         """开始批量处理"""
-        def batch_translate_function(**kwargs):
-            # 这里应该调用实际的翻译函数
-            # 简化实现，返回成功结果
-            return {'success': True, 'output_file': 'dummy_output.md'}
+        config = self.config_manager.load_config()
+        output_dir = config.get('common', {}).get('output_dir', './output')
+        # 任务 id -> 历史记录 id；失败重试时沿用同一条历史记录
+        task_records: Dict[str, str] = {}
+
+        def batch_translate_function(pdf_file_path: str,
+                                     target_language: str,
+                                     file_format: str,
+                                     model_type: str,
+                                     progress_callback,
+                                     checkpoint=None,
+                                     task_id=None,
+                                     block_gate=None):
+            # 所有文件共享模型客户端与请求并发预算；请求预算平均分给同时处理的文件，
+            # 线程总数不超过并发请求数
+            per_file_workers = max(1, self.batch_processor.max_concurrent_requests // max(self.batch_processor.max_workers, 1))
+            translator = PDFTranslator(
+                self._get_model(model_type, config),
+                request_limiter=self.batch_processor.request_limiter,
+                max_workers=per_file_workers,
+                translation_memory=self.translation_memory,
+                **PDFTranslator.options_from_config(config)
+            )
+
+            base_name = os.path.splitext(os.path.basename(pdf_file_path))[0]
+            os.makedirs(output_dir, exist_ok=True)
+            # 不同目录下的同名文件、同一文件的多个任务各自写入独立的输出文件
+            suffix = f"_{task_id}" if task_id else ""
+            output_file = os.path.join(output_dir, f"{base_name}{suffix}_translated{self._output_extension(file_format)}")
+
+            record_id = task_records.get(task_id)
+            if record_id is None:
+                record_id = self.history_manager.add_record(input_file=pdf_file_path, target_language=target_language, status="进行中")
+                if task_id:
+                    task_records[task_id] = record_id
+            else:
+                self.history_manager.update_record(record_id, status="进行中", progress=0, error_message=None,
+                                                   end_time=None, duration=None)
+
+            def record_progress(page_idx, content_idx, total_contents):
+                progress_callback(page_idx, content_idx, total_contents)
+                total_pages = len(translator.book.pages)
+                page_fraction = (content_idx + 1) / total_contents if total_contents else 1.0
+                self.history_manager.update_record(record_id, progress=round((page_idx + page_fraction) / total_pages * 100, 1))
+
+            try:
+                translator.translate_pdf(pdf_file_path, file_format, target_language, output_file, progress_callback=record_progress, checkpoint=checkpoint, block_gate=block_gate)
+            except Exception as e:
+                self.history_manager.update_record(record_id, status="失败", error_message=str(e))
+                raise
+            self.history_manager.update_record(record_id, status="完成", output_file=output_file)
+            return {'success': True, 'output_file': output_file, 'tokens': translator.token_usage.total_tokens}
         
         result = self.batch_processor.start_batch_processing(
             translate_function=batch_translate_function,
             max_workers=int(max_workers),
             retry_failed=retry_failed,
-            max_retries=int(max_retries)
+            max_retries=int(max_retries),
+            max_concurrent_requests=int(max_requests),
+            scheduling_policy=scheduling_policy
         )
         
         return result
     
+    def _refresh_batch_status(self):
+        """刷新批量处理状态、队列与摘要"""
+        return (
+            self.batch_processor.get_batch_status(),
+            self.batch_processor.get_queue_display_data(),
+            self.batch_processor.get_batch_summary()
+        )
+    
+    def _clear_batch_queue(self):
+        """清空批量队列"""
+        result = self.batch_processor.clear_queue()
+        return result, self.batch_processor.get_queue_display_data()
+    
     def _load_config(self):
         """加载配置"""
         config = self.config_manager.load_config()
@@ -434,23 +618,40 @@ class TranslatorGUI:
             "配置已重置为默认值"
         )
     
-    def _refresh_history(self):
-        """刷新历史记录"""
-        self.history_manager.history_data = self.history_manager.load_history()
-        table_data = self.history_manager.get_history_table_data()
+    def _refresh_history(self,
+                         status: str = None,
+                         target_language: str = None,
+                         filename: str = None,
+                         date_from: str = None,
+                         date_to: str = None,
+                         page_size: int = None,
+                         page: int = 1):
+        """按筛选条件刷新历史记录的一页，同时返回该页记录ID供本会话选中行时使用"""
+        try:
+            table_data, page_info, page, page_ids = self.history_manager.query_history_page(
+                page=page or 1,
+                page_size=page_size,
+                status=status,
+                target_language=target_language,
+                filename=filename,
+                date_from=date_from,
+                date_to=date_to
+            )
+        except ValueError:
+            return [], self.history_manager.get_statistics(), "日期格式应为 YYYY-MM-DD", 1, []
         stats = self.history_manager.get_statistics()
         
-        return table_data, stats
+        return table_data, stats, page_info, page, page_ids
     
     def _clear_history(self):
-        """清空历史记录"""
+        """清空历史记录，并把分页重置到空的第一页"""
         self.history_manager.clear_history()
-        return [], "历史记录已清空"
+        return [], "历史记录已清空", "第 1/1 页，共 0 条记录", 1, []
     
-    def _select_history_record(self, evt: gr.SelectData):
+    def _select_history_record(self, page_ids: List[str], evt: "gr.SelectData"):
         """选择历史记录"""
         if evt.index is not None:
-            details = self.history_manager.get_record_details(evt.index[0])
+            details = self.history_manager.get_record_details(evt.index[0], page_ids)
             return details
         return "未选择记录"
     
@@ -479,10 +680,15 @@ class TranslatorGUI:
         }
         """
 
-def launch_gui(share: bool = False, server_name: str = "127.0.0.1", server_port: int = 7860):
-    """启动GUI应用"""
+def launch_gui(share: bool = False, server_name: str = "127.0.0.1", server_port: int = 7860,
+               max_concurrent_translations: Optional[int] = None):
+    """启动GUI应用
+
+    Args:
+        max_concurrent_translations: 服务器同时运行的单文件翻译数，默认读取配置 gui.max_concurrent_translations
+    """
     try:
-        app = TranslatorGUI()
+        app = TranslatorGUI(max_concurrent_translations)
         interface = app.create_interface()
         
         LOG.info(f"启动GUI应用: http://{server_name}:{server_port}")
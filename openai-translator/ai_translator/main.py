@@ -5,7 +5,7 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from utils import ArgumentParser, ConfigLoader, LOG
 from model import GLMModel, OpenAIModel
-from translator import PDFTranslator
+from translator import PDFTranslator, TranslationMemory
 
 def main_cli():
     """命令行模式主函数"""
@@ -19,7 +19,7 @@ def main_cli():
     if args.model_type == 'OpenAIModel':
         model_name = args.openai_model if args.openai_model else config['OpenAIModel']['model']
         api_key = args.openai_api_key if args.openai_api_key else config['OpenAIModel']['api_key']
-        model = OpenAIModel(model=model_name, api_key=api_key)
+        model = OpenAIModel(model=model_name, api_key=api_key, base_url=config['OpenAIModel'].get('base_url'))
     elif args.model_type == 'GLMModel':
         model_url = args.glm_model_url if args.glm_model_url else config['GLMModel']['model_url']
         timeout = args.timeout if args.timeout else config['GLMModel']['timeout']
@@ -28,14 +28,20 @@ def main_cli():
         # 默认使用OpenAI模型
         model_name = args.openai_model if args.openai_model else config['OpenAIModel']['model']
         api_key = args.openai_api_key if args.openai_api_key else config['OpenAIModel']['api_key']
-        model = OpenAIModel(model=model_name, api_key=api_key)
+        model = OpenAIModel(model=model_name, api_key=api_key, base_url=config['OpenAIModel'].get('base_url'))
 
     pdf_file_path = args.book if args.book else config['common']['book']
     file_format = args.file_format if args.file_format else config['common']['file_format']
 
     # 实例化 PDFTranslator 类，并调用 translate_pdf() 方法
-    translator = PDFTranslator(model)
-    translator.translate_pdf(pdf_file_path, file_format)
+    options = PDFTranslator.options_from_config(config)
+    if args.context_tokens is not None:
+        options['context_tokens'] = args.context_tokens
+    if args.table_mode:
+        options['table_mode'] = args.table_mode
+    translator = PDFTranslator(model, translation_memory=TranslationMemory.from_config(config), **options)
+    translator.translate_pdf(pdf_file_path, file_format,
+                             previous_snapshot=args.previous_snapshot, snapshot_file=args.snapshot)
 
 def main_gui():
     """GUI模式主函数"""
@@ -1,3 +1,4 @@
 from .model import Model
 from .glm_model import GLMModel
-from .openai_model import OpenAIModel
\ No newline at end of file
+from .openai_model import OpenAIModel
+from .registry import ModelRegistry, MODEL_REGISTRY
\ No newline at end of file
@@ -1,5 +1,6 @@
 import requests
 import simplejson
+import time
 
 try:
     from .model import Model
@@ -10,24 +11,36 @@ class GLMModel(Model):
     def __init__(self, model_url: str, timeout: int):
         self.model_url = model_url
         self.timeout = timeout
+        # 复用连接池，避免每次请求重新建立连接
+        self.session = requests.Session()
+
+    @property
+    def metrics_label(self) -> str:
+        return "chatglm"
 
     def make_request(self, prompt):
+        started = time.perf_counter()
         try:
             payload = {
                 "prompt": prompt,
                 "history": []
             }
-            response = requests.post(self.model_url, json=payload, timeout=self.timeout)
+            response = self.session.post(self.model_url, json=payload, timeout=self.timeout)
             response.raise_for_status()
             response_dict = response.json()
             translation = response_dict["response"]
+            self.record_request(time.perf_counter() - started, True)
             return translation, True
         except requests.exceptions.RequestException as e:
+            self.record_failure(time.perf_counter() - started, e)
             raise Exception(f"请求异常：{e}")
         except requests.exceptions.Timeout as e:
+            self.record_failure(time.perf_counter() - started, e)
             raise Exception(f"请求超时：{e}")
         except simplejson.errors.JSONDecodeError as e:
+            self.record_failure(time.perf_counter() - started, e)
             raise Exception("Error: response is not valid JSON format.")
         except Exception as e:
+            self.record_failure(time.perf_counter() - started, e)
             raise Exception(f"发生了未知错误：{e}")
         return "", False
@@ -1,7 +1,17 @@
+import json
 try:
     from ..book import ContentType
 except ImportError:  # pragma: no cover - fallback for direct execution
     from book import ContentType
+try:
+    from ..utils.metrics import MODEL_ERRORS, MODEL_REQUEST_DURATION, MODEL_TOKENS
+    from ..utils.tokens import record_usage
+except ImportError:  # pragma: no cover - fallback for direct execution
+    from utils.metrics import MODEL_ERRORS, MODEL_REQUEST_DURATION, MODEL_TOKENS
+    from utils.tokens import record_usage
+
+# add_context 附加在跨页上下文之前的说明行
+CONTEXT_HEADER = "以下是前文信息，仅供理解和统一译名，不要翻译："
 
 class Model:
     def make_text_prompt(self, text: str, target_language: str) -> str:
@@ -18,6 +28,35 @@ class Model:
 原始表格：
 {table}"""
 
+    def make_cells_prompt(self, cells, target_language: str) -> str:
+        cells_json = json.dumps(cells, ensure_ascii=False)
+        return f"""请将下面 JSON 数组中的每个表格单元格翻译为{target_language}。
+要求：
+1. 返回一个 JSON 字符串数组，长度和顺序与原数组完全一致
+2. 每个元素只包含对应单元格的译文
+3. 直接返回 JSON 数组，不要添加额外说明
+
+单元格：
+{cells_json}"""
+
+    def add_references(self, prompt: str, matches, terms) -> str:
+        """在提示后附加翻译记忆库中的近似译文 (原文, 译文, 相似度) 与术语 (术语, 译文)"""
+        sections = []
+        if terms:
+            sections.append("请严格使用以下术语译法：\n" + "\n".join(f"{term} => {translation}" for term, translation in terms))
+        if matches:
+            sections.append("以下是已审定的相似段落译文，请保持用词和风格一致：\n" + "\n".join(
+                f"原文：{source}\n译文：{target}" for source, target, _ in matches))
+        if not sections:
+            return prompt
+        return prompt + "\n\n" + "\n\n".join(sections) + "\n\n只返回待翻译内容的译文。"
+
+    def add_context(self, prompt: str, context: str) -> str:
+        """在提示前附加跨页上下文，上下文只用于理解，不需要翻译"""
+        if not context:
+            return prompt
+        return f"{CONTEXT_HEADER}\n{context}\n\n{prompt}"
+
     def translate_prompt(self, content, target_language: str) -> str:
         if content.content_type == ContentType.TEXT:
             return self.make_text_prompt(content.original, target_language)
@@ -26,3 +65,22 @@ class Model:
 
     def make_request(self, prompt):
         raise NotImplementedError("子类必须实现 make_request 方法")
+
+    @property
+    def metrics_label(self) -> str:
+        """指标中标识该模型的名称"""
+        return getattr(self, "model", None) or type(self).__name__
+
+    def record_request(self, duration: float, success: bool):
+        MODEL_REQUEST_DURATION.observe(duration, model=self.metrics_label, status="ok" if success else "error")
+
+    def record_tokens(self, prompt_tokens: int = 0, completion_tokens: int = 0):
+        record_usage(prompt_tokens, completion_tokens)
+        if prompt_tokens:
+            MODEL_TOKENS.inc(prompt_tokens, model=self.metrics_label, kind="prompt")
+        if completion_tokens:
+            MODEL_TOKENS.inc(completion_tokens, model=self.metrics_label, kind="completion")
+
+    def record_failure(self, duration: float, error: BaseException):
+        self.record_request(duration, False)
+        MODEL_ERRORS.inc(model=self.metrics_label, error=type(error).__name__)
@@ -3,6 +3,7 @@ import simplejson
 import time
 import os
 import openai
+from typing import Optional
 
 try:
     from .model import Model
@@ -14,20 +15,22 @@ except ImportError:  # pragma: no cover - fallback for direct execution
     from utils import LOG
 from openai import OpenAI
 
+DEFAULT_BASE_URL = "https://www.dmxapi.com/v1"
+
 class OpenAIModel(Model):
-    def __init__(self, model: str, api_key: str):
+    def __init__(self, model: str, api_key: str, base_url: Optional[str] = None):
         self.model = model
-        os.environ	[	"OPENAI_API_KEY"	] = "sk-Y9P2ZYbyYK0HNbjBjj5s6yddubVCZ36WqCbXEVcYXSQMiaEm"
-        # 这里将官方的接口访问地址替换成便携AI聚合API的入口地址
-        os.environ["OPENAI_BASE_URL"] = "https://www.dmxapi.com/v1"
+        # 默认将官方的接口访问地址替换成便携AI聚合API的入口地址（不修改 os.environ，多线程安全）
+        self.base_url = base_url or os.getenv("OPENAI_BASE_URL", DEFAULT_BASE_URL)
         self.client = OpenAI(
-            api_key=os.getenv("OPENAI_API_KEY"),
-            base_url=os.getenv("OPENAI_BASE_URL")
+            api_key=api_key or os.getenv("OPENAI_API_KEY"),
+            base_url=self.base_url
         )
 
     def make_request(self, prompt):
         attempts = 0
         while attempts < 3:
+            started = time.perf_counter()
             try:
                 if self.model == "gpt-4o-mini":
                     response = self.client.chat.completions.create(
@@ -46,8 +49,13 @@ class OpenAIModel(Model):
                     )
                     translation = response.choices[0].text.strip()
 
+                self.record_request(time.perf_counter() - started, True)
+                usage = getattr(response, "usage", None)
+                if usage is not None:
+                    self.record_tokens(usage.prompt_tokens or 0, usage.completion_tokens or 0)
                 return translation, True
             except openai.RateLimitError as e:
+                self.record_failure(time.perf_counter() - started, e)
                 attempts += 1
                 if attempts < 3:
                     LOG.warning("Rate limit reached. Waiting for 60 seconds before retrying.")
@@ -55,15 +63,19 @@ class OpenAIModel(Model):
                 else:
                     raise Exception("Rate limit reached. Maximum attempts exceeded.")
             except openai.APIConnectionError as e:
+                self.record_failure(time.perf_counter() - started, e)
                 print("The server could not be reached")
                 print(e.__cause__)  # an underlying Exception, likely raised within httpx.
             except requests.exceptions.Timeout as e:
+                self.record_failure(time.perf_counter() - started, e)
                 print("Request timed out")
                 print(e)
             except openai.APIStatusError as e:
+                self.record_failure(time.perf_counter() - started, e)
                 print("Another non-200-range status code was received")
                 print(e.status_code)
                 print(e.response)
             except Exception as e:
+                self.record_failure(time.perf_counter() - started, e)
                 raise Exception(f"发生了未知错误：{e}")
         return "", False
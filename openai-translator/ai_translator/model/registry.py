@@ -0,0 +1,51 @@
+import hashlib
+import threading
+from typing import Callable, Dict, Hashable, Optional
+
+try:
+    from .model import Model
+    from .glm_model import GLMModel
+    from .openai_model import OpenAIModel
+except ImportError:  # pragma: no cover - fallback for direct execution
+    from model import Model, GLMModel, OpenAIModel
+
+
+class ModelRegistry:
+    """进程级模型客户端注册表：相同配置共享同一个客户端及其连接池"""
+
+    def __init__(self):
+        self._models: Dict[Hashable, Model] = {}
+        self._lock = threading.Lock()
+
+    def get_or_create(self, key: Hashable, factory: Callable[[], Model]) -> Model:
+        model = self._models.get(key)
+        if model is not None:
+            return model
+        with self._lock:
+            # 双重检查，保证并发请求只构造一次
+            model = self._models.get(key)
+            if model is None:
+                model = factory()
+                self._models[key] = model
+            return model
+
+    def get_openai_model(self, model: str, api_key: str, base_url: Optional[str] = None) -> OpenAIModel:
+        # 仅以哈希形式保存 API Key
+        key_digest = hashlib.sha256((api_key or "").encode("utf-8")).hexdigest()
+        return self.get_or_create(
+            ("OpenAIModel", model, key_digest, base_url),
+            lambda: OpenAIModel(model=model, api_key=api_key, base_url=base_url),
+        )
+
+    def get_glm_model(self, model_url: str, timeout: int) -> GLMModel:
+        return self.get_or_create(
+            ("GLMModel", model_url, timeout),
+            lambda: GLMModel(model_url=model_url, timeout=timeout),
+        )
+
+    def clear(self):
+        with self._lock:
+            self._models.clear()
+
+
+MODEL_REGISTRY = ModelRegistry()
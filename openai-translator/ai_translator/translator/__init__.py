@@ -1 +1,3 @@
-from .pdf_translator import PDFTranslator
\ No newline at end of file
+from .pdf_translator import PDFTranslator
+from .pdf_parser import PDFParser
+from .translation_memory import TranslationMemory
@@ -0,0 +1,113 @@
+import re
+from collections import Counter
+from typing import Dict, List, Tuple
+try:
+    from ..book import Book, ContentType
+except ImportError:  # pragma: no cover - fallback for direct execution
+    from book import Book, ContentType
+try:
+    from ..model.model import CONTEXT_HEADER
+except ImportError:  # pragma: no cover - fallback for direct execution
+    from model.model import CONTEXT_HEADER
+try:
+    from ..utils import LOG, estimate_tokens
+except ImportError:  # pragma: no cover - fallback for direct execution
+    from utils import LOG, estimate_tokens
+
+# 每个文本块附加的上下文（含说明行与标签）默认不超过的 token 数
+DEFAULT_CONTEXT_TOKENS = 120
+
+_TERMS_LABEL = "专有名词："
+_PREVIOUS_LABEL = "上文："
+
+_SENTENCE_END = re.compile(r"[.!?。！？…][\"'”’)\]]*$")
+_FIRST_SENTENCE = re.compile(r"^.*?[.!?。！？…][\"'”’)\]]*(?=\s|$)", re.S)
+_SENTENCES = re.compile(r"[^.!?。！？…]+(?:[.!?。！？…][\"'”’)\]]*|$)")
+# 由两个以上首字母大写单词组成的名称，例如人名、地名、产品名
+_NAME = re.compile(r"\b[A-Z][a-z]+(?:\s+(?:of\s+|the\s+)?[A-Z][a-z]+)+\b")
+
+
+class CrossPageContext:
+    """跨页上下文：翻译前合并被分页截断的句子，并为每个文本块生成不超过固定 token 预算的上文提示
+
+    上文只包含反复出现的名称和前一个文本块的最后几句原文，全部由原文推导，
+    与翻译顺序无关，并发翻译、检查点恢复与增量翻译都得到相同的提示。
+    """
+
+    def __init__(self, max_tokens: int = DEFAULT_CONTEXT_TOKENS, max_terms: int = 8):
+        self.max_tokens = max_tokens
+        self.max_terms = max_terms
+
+    def join_page_fragments(self, book: Book) -> int:
+        """把下一页开头的半句移到上一页末尾的文本块，返回合并的次数；关闭上下文（max_tokens <= 0）时不合并"""
+        joined = 0
+        if self.max_tokens <= 0:
+            return joined
+        for page, next_page in zip(book.pages, book.pages[1:]):
+            if not page.contents or not next_page.contents:
+                continue
+            tail, head = page.contents[-1], next_page.contents[0]
+            if tail.content_type != ContentType.TEXT or head.content_type != ContentType.TEXT:
+                continue
+            previous, following = tail.original.rstrip(), head.original.lstrip()
+            if not previous or not following or _SENTENCE_END.search(previous):
+                continue
+            hyphenated = previous.endswith("-")
+            if not (hyphenated or following[0].islower() or following[0] in ",;:)，；："):
+                continue
+            match = _FIRST_SENTENCE.match(following)
+            if match is None:
+                # 下一页整块都没有句子结束，不移动整页内容
+                continue
+            fragment = match.group(0)
+            separator = "" if hyphenated or fragment[0] in ",;:)，；：" else " "
+            tail.original = (previous[:-1] if hyphenated else previous) + separator + " ".join(fragment.split())
+            head.original = following[len(fragment):].lstrip()
+            if not head.original:
+                next_page.contents.pop(0)
+            joined += 1
+        if joined:
+            LOG.info(f"合并了 {joined} 处跨页截断的句子")
+        return joined
+
+    def build(self, book: Book) -> Dict[Tuple[int, int], str]:
+        """按阅读顺序为每个文本块生成上文提示，键为 (page_idx, content_idx)"""
+        contexts = {}
+        if self.max_tokens <= 0:
+            return contexts
+        names = Counter()
+        previous_text = ""
+        for page_idx, page in enumerate(book.pages):
+            for content_idx, content in enumerate(page.contents):
+                if content.content_type != ContentType.TEXT:
+                    continue
+                terms = [name for name, count in names.most_common() if count > 1][:self.max_terms]
+                context = self._fit(terms, previous_text)
+                if context:
+                    contexts[(page_idx, content_idx)] = context
+                names.update(_NAME.findall(content.original))
+                previous_text = content.original
+        return contexts
+
+    def _fit(self, terms: List[str], previous_text: str) -> str:
+        """名称在前、上文在后，超出预算时先减少上文句子，再减少名称
+
+        预算按 Model.add_context 实际附加的全部文本计算，包括说明行、标签与换行。
+        """
+        while terms and self._added_tokens([_TERMS_LABEL + "、".join(terms)]) > self.max_tokens:
+            terms = terms[:-1]
+        lines = [_TERMS_LABEL + "、".join(terms)] if terms else []
+
+        tail = []
+        for sentence in reversed([s.strip() for s in _SENTENCES.findall(" ".join(previous_text.split())) if s.strip()]):
+            if self._added_tokens(lines + [_PREVIOUS_LABEL + " ".join([sentence] + tail)]) > self.max_tokens:
+                break
+            tail.insert(0, sentence)
+        if tail:
+            lines.append(_PREVIOUS_LABEL + " ".join(tail))
+        return "\n".join(lines)
+
+    @staticmethod
+    def _added_tokens(lines: List[str]) -> int:
+        """上下文为 lines 时 Model.add_context 在提示前附加的文本的 token 数"""
+        return estimate_tokens(f"{CONTEXT_HEADER}\n" + "\n".join(lines) + "\n\n")
@@ -11,9 +11,11 @@ try:
 except ImportError:  # pragma: no cover - fallback for direct execution
     from exceptions import PageOutOfRangeException
 try:
-    from ..utils import LOG
+    from ..utils import LOG, estimate_tokens
+    from ..utils.metrics import PAGES_PARSED, track_phase
 except ImportError:  # pragma: no cover - fallback for direct execution
-    from utils import LOG
+    from utils import LOG, estimate_tokens
+    from utils.metrics import PAGES_PARSED, track_phase
 
 
 class PDFParser:
@@ -77,7 +79,34 @@ class PDFParser:
             LOG.warning(f"元素排序失败: {e}")
             return [content for content, bbox in elements]
 
+    @staticmethod
+    def get_page_count(pdf_file_path: str) -> int:
+        """只读取PDF页数，不解析页面内容"""
+        with pdfplumber.open(pdf_file_path) as pdf:
+            return len(pdf.pages)
+
+    @staticmethod
+    def estimate_document_size(pdf_file_path: str, sample_pages: int = 3) -> Tuple[int, int]:
+        """估算文档规模，返回 (页数, token 数)
+        
+        页数来自PDF页表；token 数只抽取前 sample_pages 页的文本再按页数外推，
+        用于入队时的调度排序，不做完整解析。
+        """
+        with pdfplumber.open(pdf_file_path) as pdf:
+            total_pages = len(pdf.pages)
+            sampled = pdf.pages[:sample_pages]
+            sample_tokens = sum(estimate_tokens(page.extract_text() or "") for page in sampled)
+        if not sampled:
+            return total_pages, 0
+        return total_pages, int(sample_tokens / len(sampled) * total_pages)
+
     def parse_pdf(self, pdf_file_path: str, pages: Optional[int] = None) -> Book:
+        with track_phase("parse"):
+            book = self._parse_pdf(pdf_file_path, pages)
+        PAGES_PARSED.inc(len(book.pages))
+        return book
+
+    def _parse_pdf(self, pdf_file_path: str, pages: Optional[int] = None) -> Book:
         book = Book(pdf_file_path)
 
         with pdfplumber.open(pdf_file_path) as pdf:
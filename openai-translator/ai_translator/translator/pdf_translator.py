@@ -1,4 +1,6 @@
-from typing import Optional, Callable
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Optional, Callable, Dict
 try:
     from ..model import Model
 except ImportError:  # pragma: no cover - fallback for direct execution
@@ -16,53 +18,259 @@ try:
 except ImportError:  # pragma: no cover - fallback for direct execution
     from writer import Writer
 try:
-    from ..utils import LOG
+    from .translation_memory import MEMORY_LOOKUPS, TranslationMemory
 except ImportError:  # pragma: no cover - fallback for direct execution
-    from utils import LOG
+    from translation_memory import MEMORY_LOOKUPS, TranslationMemory
+try:
+    from .revision import TranslationSnapshot, align_book
+except ImportError:  # pragma: no cover - fallback for direct execution
+    from revision import TranslationSnapshot, align_book
+try:
+    from .context import CrossPageContext, DEFAULT_CONTEXT_TOKENS
+except ImportError:  # pragma: no cover - fallback for direct execution
+    from context import CrossPageContext, DEFAULT_CONTEXT_TOKENS
+try:
+    from ..utils import LOG, TokenUsage, usage_scope
+    from ..utils.metrics import CONTENTS_TRANSLATED, track_phase
+except ImportError:  # pragma: no cover - fallback for direct execution
+    from utils import LOG, TokenUsage, usage_scope
+    from utils.metrics import CONTENTS_TRANSLATED, track_phase
 
 class PDFTranslator:
-    def __init__(self, model: Model):
+    TABLE_MODES = ("cells", "text")
+
+    def __init__(self, model: Model, request_limiter: Optional[threading.Semaphore] = None, max_workers: int = 1,
+                 table_mode: str = "text", translation_memory: Optional[TranslationMemory] = None,
+                 context_tokens: int = DEFAULT_CONTEXT_TOKENS):
+        """
+        Args:
+            model: 翻译模型，可在多个翻译器之间共享
+            request_limiter: 可选的共享信号量，限制所有翻译器同时发往模型的请求数
+            max_workers: 单个文件内并发翻译的内容块数量，1 表示顺序翻译
+            table_mode: "text"（默认）将整张表格作为文本翻译；"cells" 只发送去重后需要翻译的单元格并按坐标写回
+            translation_memory: 可选的翻译记忆库，文本块精确命中时不再请求模型，近似译文与术语加入提示
+            context_tokens: 每个文本块附加的跨页上下文（含说明行、专有名词与上文）的 token 上限，0 表示不附加
+        """
+        if table_mode not in self.TABLE_MODES:
+            raise ValueError(f"table_mode 必须是 {self.TABLE_MODES} 之一，实际为 {table_mode!r}")
+        self.table_mode = table_mode
+        self.translation_memory = translation_memory
+        self.context = CrossPageContext(context_tokens)
         self.model = model
         self.pdf_parser = PDFParser()
         self.writer = Writer()
+        self.request_limiter = request_limiter
+        self.max_workers = max(1, max_workers)
+        # 本翻译器发出的请求实际消耗的 token（由模型上报）
+        self.token_usage = TokenUsage()
 
-    def translate_pdf(self, pdf_file_path: str, file_format: str = 'PDF', target_language: str = '中文', output_file_path: str = None, pages: Optional[int] = None, progress_callback: Optional[Callable] = None):
+    @staticmethod
+    def options_from_config(config: Dict) -> Dict:
+        """读取配置文件中的 translator 段，返回可直接传给构造函数的关键字参数；未配置的项使用默认值"""
+        translator_cfg = config.get('translator') or {}
+        options = {}
+        if translator_cfg.get('context_tokens') is not None:
+            options['context_tokens'] = int(translator_cfg['context_tokens'])
+        if translator_cfg.get('table_mode'):
+            options['table_mode'] = translator_cfg['table_mode']
+        return options
+
+    def translate_pdf(self, pdf_file_path: str, file_format: str = 'PDF', target_language: str = '中文', output_file_path: str = None, pages: Optional[int] = None, progress_callback: Optional[Callable] = None, checkpoint=None,
+                      previous_snapshot: Optional[str] = None, snapshot_file: Optional[str] = None,
+                      block_gate: Optional[Callable] = None):
+        """
+        Args:
+            progress_callback: 每个内容块调用一次 (page_idx, content_idx, total_contents)
+            checkpoint: 可选的内容块检查点，需提供 load(page_idx, content_idx) -> (translation, status) 或 None
+                以及 save(page_idx, content_idx, translation, status)；已有检查点的内容块不再请求模型
+            previous_snapshot: 旧版本文档的译文快照路径；与其对齐后只翻译新增或修改的内容块，其余复用旧译文
+            snapshot_file: 翻译完成后把本次译文快照写入该路径，供下一个版本增量翻译
+            block_gate: 每个内容块请求模型前在翻译线程中调用；可在其中阻塞以暂停翻译，或抛出异常中断翻译
+        """
         self.book = self.pdf_parser.parse_pdf(pdf_file_path, pages)
+        # 先合并跨页截断的句子，增量对齐与上下文都基于合并后的内容块
+        self.context.join_page_fragments(self.book)
+        revision = align_book(self.book, TranslationSnapshot.load(previous_snapshot)) if previous_snapshot else None
+        contexts = self.context.build(self.book)
 
-        for page_idx, page in enumerate(self.book.pages):
-            for content_idx, content in enumerate(page.contents):
-                if progress_callback:
-                    progress_callback(page_idx, content_idx, len(page.contents))
-                
-                if content.content_type == ContentType.IMAGE:
-                    # 处理图片内容：翻译图片描述
-                    if hasattr(content, 'description') and content.description:
-                        # 为图片描述创建翻译提示
-                        description_content = Content(content_type=ContentType.TEXT, original=content.description)
-                        prompt = self.model.translate_prompt(description_content, target_language)
-                        LOG.debug(f"图片描述翻译提示: {prompt}")
-                        translation, status = self.model.make_request(prompt)
-                        LOG.info(f"图片描述翻译结果: {translation}")
-                        
-                        # 设置图片描述的翻译
-                        self.book.pages[page_idx].contents[content_idx].set_translation(translation, status)
-                    else:
-                        # 如果没有描述，生成一个通用的翻译描述
-                        if target_language.lower() in ['中文', 'chinese', '中']:
-                            default_translation = f"第{page_idx + 1}页的图片内容"
-                        else:
-                            default_translation = f"Image content on page {page_idx + 1}"
-                        
-                        self.book.pages[page_idx].contents[content_idx].set_translation(default_translation, True)
-                        LOG.info(f"图片使用默认描述: {default_translation}")
-                else:
-                    # 处理文本和表格内容
-                    prompt = self.model.translate_prompt(content, target_language)
-                    LOG.debug(prompt)
-                    translation, status = self.model.make_request(prompt)
-                    LOG.info(translation)
-                    
-                    # Update the content in self.book.pages directly
-                    self.book.pages[page_idx].contents[content_idx].set_translation(translation, status)
+        blocks = [
+            (page_idx, content_idx, content)
+            for page_idx, page in enumerate(self.book.pages)
+            for content_idx, content in enumerate(page.contents)
+        ]
+
+        with track_phase("translate"):
+            if self.max_workers == 1:
+                for page_idx, content_idx, content in blocks:
+                    if progress_callback:
+                        progress_callback(page_idx, content_idx, len(self.book.pages[page_idx].contents))
+                    self._translate_block(page_idx, content_idx, content, target_language, checkpoint, revision, contexts, block_gate)
+            else:
+                self._translate_concurrently(blocks, target_language, progress_callback, checkpoint, revision, contexts, block_gate)
 
         self.writer.save_translated_book(self.book, output_file_path, file_format)
+        if snapshot_file:
+            TranslationSnapshot.from_book(self.book).save(snapshot_file)
+
+    def _translate_concurrently(self, blocks, target_language: str, progress_callback: Optional[Callable], checkpoint=None,
+                                revision=None, contexts=None, block_gate=None):
+        """并发翻译内容块；进度回调在调用线程中按完成顺序触发
+
+        同时提交的内容块不超过线程数，一个完成后才提交下一个：暂停时线程阻塞在 block_gate 中，
+        不会再有内容块进入执行器；中断时也只需取消少量已提交的内容块。
+        """
+        remaining = iter(blocks)
+        futures = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="pdf-translate") as executor:
+            def submit_next():
+                block = next(remaining, None)
+                if block is not None:
+                    page_idx, content_idx, content = block
+                    future = executor.submit(self._translate_block, page_idx, content_idx, content, target_language,
+                                             checkpoint, revision, contexts, block_gate)
+                    futures[future] = (page_idx, content_idx)
+
+            try:
+                for _ in range(self.max_workers):
+                    submit_next()
+                while futures:
+                    done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        page_idx, content_idx = futures.pop(future)
+                        future.result()
+                        if progress_callback:
+                            progress_callback(page_idx, content_idx, len(self.book.pages[page_idx].contents))
+                        submit_next()
+            except BaseException:
+                for future in futures:
+                    future.cancel()
+                raise
+
+    def _translate_block(self, page_idx: int, content_idx: int, content: Content, target_language: str, checkpoint=None,
+                         revision=None, contexts=None, block_gate=None):
+        """翻译单个内容块，优先使用检查点与旧版本中的译文，成功翻译后写回检查点"""
+        saved = checkpoint.load(page_idx, content_idx) if checkpoint is not None else None
+        if saved is not None:
+            # 检查点保存的是当前表格模式下的原始回复
+            self._set_translation(content, *saved, cells=self.table_mode == "cells")
+            return
+        references = []
+        if revision is not None:
+            reused = revision.reused.get((page_idx, content_idx))
+            if reused is not None:
+                # 快照中的表格译文总是单元格 JSON 数组
+                self._set_translation(content, reused, True, cells=True)
+                CONTENTS_TRANSLATED.inc(content_type=content.content_type.name.lower(), status="reused")
+                return
+            # 轻微修改的文本块重新翻译，旧版本的译文作为参考
+            if (page_idx, content_idx) in revision.references:
+                references.append(revision.references[(page_idx, content_idx)])
+        if block_gate is not None:
+            block_gate()
+        context = contexts.get((page_idx, content_idx)) if contexts else None
+        translation, status = self._translate_content(page_idx, content, target_language, references, context)
+        if checkpoint is not None and status:
+            checkpoint.save(page_idx, content_idx, translation, status)
+
+    @staticmethod
+    def _set_translation(content: Content, translation: str, status: bool, cells: bool):
+        if cells and content.content_type == ContentType.TABLE:
+            content.set_cell_translations(translation, status)
+        else:
+            content.set_translation(translation, status)
+
+    def _request(self, prompt):
+        with usage_scope(self.token_usage):
+            if self.request_limiter is None:
+                return self.model.make_request(prompt)
+            with self.request_limiter:
+                return self.model.make_request(prompt)
+
+    def _translate_content(self, page_idx: int, content: Content, target_language: str, references=None,
+                           context: Optional[str] = None):
+        if content.content_type == ContentType.IMAGE:
+            # 处理图片内容：翻译图片描述
+            if hasattr(content, 'description') and content.description:
+                # 为图片描述创建翻译提示
+                description_content = Content(content_type=ContentType.TEXT, original=content.description)
+                prompt = self.model.translate_prompt(description_content, target_language)
+                LOG.debug(f"图片描述翻译提示: {prompt}")
+                translation, status = self._request(prompt)
+                LOG.info(f"图片描述翻译结果: {translation}")
+
+                # 设置图片描述的翻译
+                content.set_translation(translation, status)
+                CONTENTS_TRANSLATED.inc(content_type=content.content_type.name.lower(), status="ok" if status else "failed")
+                return translation, status
+            else:
+                # 如果没有描述，生成一个通用的翻译描述
+                if target_language.lower() in ['中文', 'chinese', '中']:
+                    default_translation = f"第{page_idx + 1}页的图片内容"
+                else:
+                    default_translation = f"Image content on page {page_idx + 1}"
+
+                content.set_translation(default_translation, True)
+                LOG.info(f"图片使用默认描述: {default_translation}")
+                return default_translation, True
+        elif content.content_type == ContentType.TEXT and self.translation_memory is not None:
+            return self._translate_text_with_memory(content, target_language, references, context)
+        elif content.content_type == ContentType.TABLE and self.table_mode == "cells":
+            return self._translate_table_cells(content, target_language)
+        else:
+            # 处理文本和表格内容
+            prompt = self.model.translate_prompt(content, target_language)
+            if content.content_type == ContentType.TEXT:
+                prompt = self.model.add_context(self.model.add_references(prompt, references or [], []), context)
+            LOG.debug(prompt)
+            translation, status = self._request(prompt)
+            LOG.info(translation)
+
+            # Update the content in self.book.pages directly
+            content.set_translation(translation, status)
+            CONTENTS_TRANSLATED.inc(content_type=content.content_type.name.lower(), status="ok" if status else "failed")
+            return translation, status
+
+    def _translate_table_cells(self, content: Content, target_language: str):
+        """只翻译表格中去重后的文字单元格，数字、日期、编号和空单元格保持原样"""
+        cells = content.translatable_cells()
+        if cells:
+            prompt = self.model.make_cells_prompt(cells, target_language)
+            LOG.debug(prompt)
+            translation, status = self._request(prompt)
+            LOG.info(translation)
+        else:
+            # 没有需要翻译的单元格，不请求模型
+            translation, status = "[]", True
+
+        # 回复无法解析或单元格数量不符时，set_cell_translations 保留原表格并标记为失败
+        content.set_cell_translations(translation, status)
+        CONTENTS_TRANSLATED.inc(content_type=content.content_type.name.lower(), status="ok" if content.status else "failed")
+        return translation, content.status
+
+    def _translate_text_with_memory(self, content: Content, target_language: str, references=None,
+                                    context: Optional[str] = None):
+        """先查翻译记忆库：精确命中直接复用译文，近似段落与术语作为参考加入提示"""
+        memory = self.translation_memory
+        remembered = memory.lookup_exact(content.original, target_language)
+        if remembered is not None:
+            MEMORY_LOOKUPS.inc(result="exact")
+            content.set_translation(remembered, True)
+            CONTENTS_TRANSLATED.inc(content_type=content.content_type.name.lower(), status="memory")
+            return remembered, True
+
+        matches = memory.lookup_fuzzy(content.original, target_language)
+        terms = memory.glossary_terms(content.original, target_language)
+        MEMORY_LOOKUPS.inc(result="fuzzy" if matches else "miss")
+        prompt = self.model.add_references(self.model.translate_prompt(content, target_language),
+                                           list(references or []) + matches, terms)
+        prompt = self.model.add_context(prompt, context)
+        LOG.debug(prompt)
+        translation, status = self._request(prompt)
+        LOG.info(translation)
+
+        content.set_translation(translation, status)
+        CONTENTS_TRANSLATED.inc(content_type=content.content_type.name.lower(), status="ok" if status else "failed")
+        if status:
+            # 模型译文以未审核状态写入，不会覆盖人工审核过的译文
+            memory.add(content.original, translation, target_language, approved=False)
+        return translation, status
@@ -0,0 +1,154 @@
+import hashlib
+import json
+import os
+from collections import defaultdict, deque
+from difflib import SequenceMatcher
+from typing import Dict, List, Optional, Tuple
+try:
+    from ..book import Book, Content, ContentType
+except ImportError:  # pragma: no cover - fallback for direct execution
+    from book import Book, Content, ContentType
+try:
+    from .translation_memory import normalize_segment
+except ImportError:  # pragma: no cover - fallback for direct execution
+    from translation_memory import normalize_segment
+try:
+    from ..utils import LOG
+except ImportError:  # pragma: no cover - fallback for direct execution
+    from utils import LOG
+
+DEFAULT_MIN_SIMILARITY = 0.8
+
+
+def block_source(content: Content) -> Optional[str]:
+    """内容块参与比对的原文；没有可翻译原文的块（无描述的图片）返回 None"""
+    if content.content_type == ContentType.TEXT:
+        return normalize_segment(content.original)
+    if content.content_type == ContentType.TABLE:
+        return json.dumps(content.original.values.tolist(), ensure_ascii=False, default=str)
+    description = getattr(content, 'description', None)
+    return normalize_segment(description) if description else None
+
+
+def block_hash(content_type: ContentType, source: str) -> str:
+    return hashlib.sha256(f"{content_type.name}\0{source}".encode("utf-8")).hexdigest()
+
+
+def block_translation(content: Content) -> Optional[str]:
+    """可以恢复到内容块上的译文；表格保存为单元格译文的 JSON 数组，通过 set_cell_translations 恢复"""
+    if content.content_type == ContentType.TABLE:
+        cells = content.cell_translations()
+        return json.dumps(cells, ensure_ascii=False) if cells is not None else None
+    return content.translation if isinstance(content.translation, str) else None
+
+
+class TranslationSnapshot:
+    """一次翻译结果的快照：每个成功翻译的内容块的类型、原文哈希、原文与译文
+
+    新版本文档翻译时与快照对齐，未改动的内容块直接复用译文。
+    """
+
+    VERSION = 1
+
+    def __init__(self, blocks: List[Dict]):
+        self.blocks = blocks
+
+    @classmethod
+    def from_book(cls, book: Book) -> "TranslationSnapshot":
+        blocks = []
+        for page_idx, page in enumerate(book.pages):
+            for content_idx, content in enumerate(page.contents):
+                source = block_source(content)
+                translation = block_translation(content) if content.status else None
+                if source is None or translation is None:
+                    continue
+                blocks.append({
+                    "page": page_idx,
+                    "index": content_idx,
+                    "type": content.content_type.name,
+                    "hash": block_hash(content.content_type, source),
+                    "source": source,
+                    "translation": translation,
+                })
+        return cls(blocks)
+
+    @classmethod
+    def load(cls, path: str) -> "TranslationSnapshot":
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") != cls.VERSION:
+            raise ValueError(f"Unsupported translation snapshot version: {data.get('version')}")
+        return cls(data["blocks"])
+
+    def save(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": self.VERSION, "blocks": self.blocks}, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+
+class RevisionPlan:
+    """新版本文档与旧快照的对齐结果
+
+    reused: (page_idx, content_idx) -> 可直接复用的译文（原文未变，位置可以不同）
+    references: (page_idx, content_idx) -> (旧原文, 旧译文, 相似度)，轻微修改的文本块重新翻译时作为参考
+    """
+
+    def __init__(self, reused: Dict[Tuple[int, int], str], references: Dict[Tuple[int, int], Tuple[str, str, float]],
+                 total: int):
+        self.reused = reused
+        self.references = references
+        self.total = total
+
+    @property
+    def changed(self) -> int:
+        return self.total - len(self.reused)
+
+    def summary(self) -> str:
+        return (f"共 {self.total} 个内容块：复用 {len(self.reused)} 个，"
+                f"修改 {len(self.references)} 个，新增 {self.changed - len(self.references)} 个")
+
+
+def align_book(book: Book, snapshot: TranslationSnapshot, min_similarity: float = DEFAULT_MIN_SIMILARITY) -> RevisionPlan:
+    """先按原文哈希一对一匹配（允许内容块移动），剩余文本块再按编辑相似度匹配旧版本中未用到的文本块"""
+    previous = defaultdict(deque)
+    for block in snapshot.blocks:
+        previous[block["hash"]].append(block)
+
+    reused = {}
+    unmatched = []
+    total = 0
+    for page_idx, page in enumerate(book.pages):
+        for content_idx, content in enumerate(page.contents):
+            total += 1
+            source = block_source(content)
+            if source is None:
+                continue
+            candidates = previous.get(block_hash(content.content_type, source))
+            if candidates:
+                reused[(page_idx, content_idx)] = candidates.popleft()["translation"]
+            elif content.content_type == ContentType.TEXT:
+                unmatched.append(((page_idx, content_idx), source))
+
+    # 只在未被精确匹配的旧文本块中寻找修改前的版本，每个旧块最多匹配一次
+    remaining = [block for blocks in previous.values() for block in blocks if block["type"] == ContentType.TEXT.name]
+    references = {}
+    for key, source in unmatched:
+        best, best_score = None, min_similarity
+        for block in remaining:
+            matcher = SequenceMatcher(None, source, block["source"])
+            if matcher.real_quick_ratio() < best_score or matcher.quick_ratio() < best_score:
+                continue
+            score = matcher.ratio()
+            if score >= best_score:
+                best, best_score = block, score
+        if best is not None:
+            remaining.remove(best)
+            references[key] = (best["source"], best["translation"], round(best_score, 4))
+
+    plan = RevisionPlan(reused, references, total)
+    LOG.info(f"增量翻译对齐完成：{plan.summary()}")
+    return plan
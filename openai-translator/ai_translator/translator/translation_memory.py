@@ -0,0 +1,207 @@
+import csv
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter
+from difflib import SequenceMatcher
+from typing import Dict, List, Optional, Set, Tuple
+try:
+    from ..utils import LOG, METRICS
+except ImportError:  # pragma: no cover - fallback for direct execution
+    from utils import LOG, METRICS
+
+MEMORY_LOOKUPS = METRICS.counter(
+    "translation_memory_lookups_total", "Translation memory lookups, by outcome.", ["result"])
+
+# 字符 n-gram 长度；三元组对中英文都有较好的召回
+NGRAM_SIZE = 3
+DEFAULT_MIN_SIMILARITY = 0.75
+
+
+def normalize_segment(text: str) -> str:
+    """合并空白字符，使换行、缩进不同的同一段落得到相同的键"""
+    return re.sub(r"\s+", " ", str(text)).strip()
+
+
+def _ngrams(text: str) -> Set[str]:
+    text = f" {text.lower()} "
+    if len(text) <= NGRAM_SIZE:
+        return {text}
+    return {text[i:i + NGRAM_SIZE] for i in range(len(text) - NGRAM_SIZE + 1)}
+
+
+class TranslationMemory:
+    """翻译记忆库与术语表（SQLite，WAL 模式）
+
+    按目标语言保存原文与译文的段落对，支持精确匹配与模糊匹配：
+    模糊匹配先用字符 n-gram 倒排索引筛选候选，再用编辑相似度排序。
+    人工审核过的译文（approved）不会被模型译文覆盖。
+    """
+
+    def __init__(self, db_path: str = "translation_memory.db", min_similarity: float = DEFAULT_MIN_SIMILARITY,
+                 max_candidates: int = 50):
+        self.db_path = db_path
+        self.min_similarity = min_similarity
+        self.max_candidates = max_candidates
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS segments ("
+                " target_language TEXT NOT NULL,"
+                " source_hash TEXT NOT NULL,"
+                " source TEXT NOT NULL,"
+                " target TEXT NOT NULL,"
+                " approved INTEGER NOT NULL,"
+                " updated_at REAL NOT NULL,"
+                " PRIMARY KEY (target_language, source_hash))"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS glossary ("
+                " target_language TEXT NOT NULL,"
+                " term TEXT NOT NULL,"
+                " translation TEXT NOT NULL,"
+                " PRIMARY KEY (target_language, term))"
+            )
+        # 每种目标语言的 n-gram 倒排索引，首次查询时从数据库构建
+        self._index: Dict[str, Dict[str, Set[str]]] = {}
+        self._sources: Dict[str, Dict[str, str]] = {}
+
+    @classmethod
+    def from_config(cls, config: Dict) -> Optional["TranslationMemory"]:
+        """按配置文件中的 translation_memory 段创建记忆库；未配置 db_path 时返回 None"""
+        memory_cfg = config.get('translation_memory') or {}
+        if not memory_cfg.get('db_path'):
+            return None
+        memory = cls(memory_cfg['db_path'], memory_cfg.get('min_similarity', DEFAULT_MIN_SIMILARITY))
+        glossary = memory_cfg.get('glossary')
+        if glossary:
+            memory.import_glossary(glossary, memory_cfg.get('glossary_language', '中文'))
+        return memory
+
+    @staticmethod
+    def _hash(source: str) -> str:
+        return hashlib.sha256(source.encode("utf-8")).hexdigest()
+
+    def add(self, source: str, target: str, target_language: str, approved: bool = True):
+        """写入一条段落对；已审核的译文只会被另一条已审核的译文替换"""
+        source = normalize_segment(source)
+        if not source or not target:
+            return
+        source_hash = self._hash(source)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO segments (target_language, source_hash, source, target, approved, updated_at)"
+                " VALUES (?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT (target_language, source_hash) DO UPDATE SET"
+                " target = excluded.target, approved = excluded.approved, updated_at = excluded.updated_at"
+                " WHERE excluded.approved >= segments.approved",
+                (target_language, source_hash, source, target, int(approved), time.time())
+            )
+            if target_language in self._index:
+                self._index_segment(target_language, source_hash, source)
+
+    def lookup_exact(self, source: str, target_language: str) -> Optional[str]:
+        source = normalize_segment(source)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT target FROM segments WHERE target_language = ? AND source_hash = ?",
+                (target_language, self._hash(source))
+            ).fetchone()
+        return row[0] if row is not None else None
+
+    def lookup_fuzzy(self, source: str, target_language: str, limit: int = 3,
+                     min_similarity: Optional[float] = None) -> List[Tuple[str, str, float]]:
+        """返回相似度不低于阈值的 (原文, 译文, 相似度)，按相似度从高到低排列，不含完全相同的段落"""
+        source = normalize_segment(source)
+        threshold = self.min_similarity if min_similarity is None else min_similarity
+        grams = _ngrams(source)
+        with self._lock:
+            index = self._language_index(target_language)
+            sources = self._sources[target_language]
+            # 共享 n-gram 越多越可能相似，只对前 max_candidates 个候选计算编辑相似度
+            shared = Counter(source_hash for gram in grams for source_hash in index.get(gram, ()))
+            candidates = [source_hash for source_hash, _ in shared.most_common(self.max_candidates)]
+            scored = []
+            for source_hash in candidates:
+                candidate = sources[source_hash]
+                if candidate == source:
+                    continue
+                score = SequenceMatcher(None, source, candidate).ratio()
+                if score >= threshold:
+                    scored.append((score, source_hash))
+            scored.sort(reverse=True)
+            matches = []
+            for score, source_hash in scored[:limit]:
+                row = self._conn.execute(
+                    "SELECT source, target FROM segments WHERE target_language = ? AND source_hash = ?",
+                    (target_language, source_hash)
+                ).fetchone()
+                matches.append((row[0], row[1], round(score, 4)))
+        return matches
+
+    def add_term(self, term: str, translation: str, target_language: str):
+        term = normalize_segment(term)
+        if not term or not translation:
+            return
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO glossary (target_language, term, translation) VALUES (?, ?, ?)",
+                (target_language, term, translation.strip())
+            )
+
+    def import_glossary(self, path: str, target_language: str) -> int:
+        """从两列（术语, 译文）的 CSV 文件导入术语表，返回导入的条目数"""
+        count = 0
+        with open(path, newline='', encoding='utf-8') as f:
+            for row in csv.reader(f):
+                if len(row) >= 2 and row[0].strip() and not row[0].startswith('#'):
+                    self.add_term(row[0], row[1], target_language)
+                    count += 1
+        LOG.info(f"已从 {path} 导入 {count} 个术语")
+        return count
+
+    def glossary_terms(self, text: str, target_language: str) -> List[Tuple[str, str]]:
+        """返回文本中出现的术语（忽略大小写，按整词匹配）"""
+        text = normalize_segment(text).lower()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT term, translation FROM glossary WHERE target_language = ? ORDER BY term",
+                (target_language,)
+            ).fetchall()
+        return [
+            (term, translation) for term, translation in rows
+            if re.search(rf"(?<!\w){re.escape(term.lower())}(?!\w)", text)
+        ]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            segments, approved = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(approved), 0) FROM segments").fetchone()
+            terms = self._conn.execute("SELECT COUNT(*) FROM glossary").fetchone()[0]
+        return {"segments": segments, "approved_segments": approved, "glossary_terms": terms}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _language_index(self, target_language: str) -> Dict[str, Set[str]]:
+        if target_language not in self._index:
+            self._index[target_language] = {}
+            self._sources[target_language] = {}
+            rows = self._conn.execute(
+                "SELECT source_hash, source FROM segments WHERE target_language = ?", (target_language,)
+            ).fetchall()
+            for source_hash, source in rows:
+                self._index_segment(target_language, source_hash, source)
+        return self._index[target_language]
+
+    def _index_segment(self, target_language: str, source_hash: str, source: str):
+        self._sources[target_language][source_hash] = source
+        index = self._index[target_language]
+        for gram in _ngrams(source):
+            index.setdefault(gram, set()).add(source_hash)
@@ -17,20 +17,23 @@ except ImportError:  # pragma: no cover - fallback for direct execution
     from book import Book, ContentType
 try:
     from ..utils import LOG
+    from ..utils.metrics import track_phase
 except ImportError:  # pragma: no cover - fallback for direct execution
     from utils import LOG
+    from utils.metrics import track_phase
 
 class Writer:
     def __init__(self):
         pass
 
     def save_translated_book(self, book: Book, output_file_path: str = None, file_format: str = "PDF"):
-        if file_format.lower() == "pdf":
-            self._save_translated_book_pdf(book, output_file_path)
-        elif file_format.lower() == "markdown":
-            self._save_translated_book_markdown(book, output_file_path)
-        else:
-            raise ValueError(f"Unsupported file format: {file_format}")
+        with track_phase("write"):
+            if file_format.lower() == "pdf":
+                self._save_translated_book_pdf(book, output_file_path)
+            elif file_format.lower() == "markdown":
+                self._save_translated_book_markdown(book, output_file_path)
+            else:
+                raise ValueError(f"Unsupported file format: {file_format}")
 
     def _save_translated_book_pdf(self, book: Book, output_file_path: str = None):
         if output_file_path is None:
@@ -1,3 +1,6 @@
 from .argument_parser import ArgumentParser
 from .config_loader import ConfigLoader
-from .logger import LOG
\ No newline at end of file
+from .logger import LOG
+from .metrics import METRICS
+from .tokens import estimate_tokens, TokenUsage, usage_scope
+from .ids import MonotonicIdGenerator
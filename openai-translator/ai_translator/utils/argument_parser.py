@@ -26,6 +26,12 @@ class ArgumentParser:
         self.parser.add_argument('--file_format', type=str, help='The file format of translated book. Now supporting PDF and Markdown')
         self.parser.add_argument('--target_language', type=str, default='中文', help='Target language for translation.')
         self.parser.add_argument('--output_dir', type=str, default='./output', help='Output directory for translated files.')
+        self.parser.add_argument('--context_tokens', type=int, help='Token budget of the cross-page context added to each text block; 0 disables it. Overrides translator.context_tokens in the config file.')
+        self.parser.add_argument('--table_mode', type=str, choices=['text', 'cells'], help='How tables are translated: "text" sends the whole table as text, "cells" sends only the deduplicated text cells. Overrides translator.table_mode in the config file.')
+        
+        # 增量翻译参数
+        self.parser.add_argument('--previous_snapshot', type=str, help='Translation snapshot of a previous edition; only new or changed blocks are sent to the model.')
+        self.parser.add_argument('--snapshot', type=str, help='Write a translation snapshot of this run to the given path for later incremental translation.')
 
     def parse_arguments(self):
         args = self.parser.parse_args()
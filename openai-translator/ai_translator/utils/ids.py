@@ -0,0 +1,31 @@
+import os
+import threading
+import time
+import uuid
+
+
+class MonotonicIdGenerator:
+    """生成按时间递增且全局不重复的 id
+
+    形如 ``<prefix>20250101_120000_000001_<进程标识>``：以 UTC 微秒时间戳为基础，
+    同一微秒内或系统时间回拨时在上一个值上加一，保证进程内严格递增，按字符串排序即按创建顺序；
+    末尾的进程标识为每个进程随机生成的 uuid4 片段，多个进程同时写同一个数据库时 id 也不会冲突。
+    """
+
+    def __init__(self, prefix: str = ""):
+        self.prefix = prefix
+        self._last = 0
+        self._lock = threading.Lock()
+        self._pid = None
+        self._tag = ""
+
+    def next_id(self) -> str:
+        with self._lock:
+            # fork 出的子进程继承了父进程的状态，需要换一个进程标识
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._tag = uuid.uuid4().hex[:8]
+            self._last = max(time.time_ns() // 1000, self._last + 1)
+            value, tag = self._last, self._tag
+        seconds, micros = divmod(value, 1_000_000)
+        return f"{self.prefix}{time.strftime('%Y%m%d_%H%M%S', time.gmtime(seconds))}_{micros:06d}_{tag}"
@@ -0,0 +1,54 @@
+import re
+import threading
+from contextlib import contextmanager
+
+# 中日韩字符通常一个字符对应约一个 token，其余文本约四个字符一个 token
+_CJK_PATTERN = re.compile(r"[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff]")
+
+
+def estimate_tokens(text: str) -> int:
+    """粗略估算文本的 token 数，不依赖具体模型的分词器"""
+    if not text:
+        return 0
+    cjk_chars = len(_CJK_PATTERN.findall(text))
+    other_chars = len(text) - cjk_chars
+    return cjk_chars + (other_chars + 3) // 4
+
+
+class TokenUsage:
+    """线程安全的模型 token 用量累计"""
+
+    def __init__(self):
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self._lock = threading.Lock()
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+    def add(self, prompt_tokens: int = 0, completion_tokens: int = 0):
+        with self._lock:
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+
+
+_active_usage = threading.local()
+
+
+@contextmanager
+def usage_scope(usage: TokenUsage):
+    """在当前线程中把模型上报的 token 用量同时计入 usage（模型客户端在多个任务之间共享）"""
+    previous = getattr(_active_usage, "usage", None)
+    _active_usage.usage = usage
+    try:
+        yield usage
+    finally:
+        _active_usage.usage = previous
+
+
+def record_usage(prompt_tokens: int = 0, completion_tokens: int = 0):
+    """把 token 用量计入当前线程的 usage_scope，不在作用域内时忽略"""
+    usage = getattr(_active_usage, "usage", None)
+    if usage is not None:
+        usage.add(prompt_tokens, completion_tokens)
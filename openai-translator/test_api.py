@@ -0,0 +1,376 @@
+#!/usr/bin/env python3
+"""
+翻译API测试脚本
+使用模拟模型验证异步任务接口，不调用真实的AI服务
+"""
+
+import sys
+import os
+import time
+from unittest.mock import patch
+
+# 添加路径
+sys.path.append(os.path.join(os.path.dirname(__file__), 'ai_translator'))
+
+TEST_PDF = os.path.join(os.path.dirname(__file__), "tests", "test.pdf")
+
+
+def _make_fake_model():
+    from ai_translator.model import Model
+
+    class FakeModel(Model):
+        def __init__(self):
+            self.calls = 0
+
+        def make_request(self, prompt):
+            self.calls += 1
+            return f"译文{self.calls}", True
+
+    return FakeModel()
+
+
+def _wait_for_job(client, job_id, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = client.get(f"/jobs/{job_id}").json()
+        if job["status"] in {"succeeded", "failed", "cancelled"}:
+            return job
+        time.sleep(0.1)
+    raise TimeoutError(f"任务 {job_id} 未在 {timeout} 秒内完成")
+
+
+def test_job_lifecycle():
+    """测试任务提交、进度查询与结果下载"""
+    print("🧪 测试异步翻译任务...")
+
+    import shutil
+    import tempfile
+    from pathlib import Path
+    from fastapi.testclient import TestClient
+    from ai_translator.api import app as api_app
+
+    from ai_translator.api.result_cache import ResultCache
+
+    fake_model = _make_fake_model()
+    output_dir = Path(tempfile.mkdtemp())
+    with patch.object(api_app, "build_model", return_value=fake_model), \
+            patch.object(api_app, "get_output_dir", return_value=output_dir), \
+            patch.object(api_app, "_result_cache", ResultCache(output_dir / ".cache")):
+        client = TestClient(api_app.app)
+        with open(TEST_PDF, "rb") as f:
+            response = client.post(
+                "/jobs",
+                files={"file": ("test.pdf", f, "application/pdf")},
+                data={"target_language": "中文", "file_format": "markdown"},
+            )
+        assert response.status_code == 202, response.text
+        job_id = response.json()["job_id"]
+        print(f"   ✅ 提交任务: {job_id}")
+
+        job = _wait_for_job(client, job_id)
+        assert job["status"] == "succeeded", job
+        assert job["progress"]["percent"] == 100.0, job["progress"]
+        print(f"   ✅ 任务完成，进度: {job['progress']}")
+
+        events = client.get(f"/jobs/{job_id}/events").text
+        assert "event: succeeded" in events
+        print("   ✅ SSE 事件流返回最终状态")
+
+        result = client.get(f"/jobs/{job_id}/result")
+        assert result.status_code == 200
+        assert "译文" in result.text
+        print(f"   ✅ 下载结果: {len(result.content)} 字节")
+
+        assert client.get("/jobs/unknown").status_code == 404
+
+    shutil.rmtree(output_dir, ignore_errors=True)
+
+    print("   ✅ 异步翻译任务测试通过")
+
+
+def test_result_cache():
+    """测试结果缓存、淘汰策略与重复请求合并"""
+    print("🧪 测试翻译结果缓存...")
+
+    import shutil
+    import tempfile
+    from pathlib import Path
+    from fastapi.testclient import TestClient
+    from ai_translator.api import app as api_app
+    from ai_translator.api.result_cache import ResultCache
+
+    fake_model = _make_fake_model()
+    output_dir = Path(tempfile.mkdtemp())
+    cache = ResultCache(output_dir / ".cache")
+    with patch.object(api_app, "build_model", return_value=fake_model), \
+            patch.object(api_app, "get_output_dir", return_value=output_dir), \
+            patch.object(api_app, "_result_cache", cache):
+        client = TestClient(api_app.app)
+        responses = []
+        for _ in range(2):
+            with open(TEST_PDF, "rb") as f:
+                responses.append(client.post(
+                    "/translate",
+                    files={"file": ("test.pdf", f, "application/pdf")},
+                    data={"target_language": "中文", "file_format": "markdown"},
+                ))
+        assert all(r.status_code == 200 for r in responses)
+        assert responses[0].content == responses[1].content
+        calls_after_first = fake_model.calls
+        print(f"   ✅ 重复上传命中缓存，模型调用次数: {calls_after_first}")
+
+        with open(TEST_PDF, "rb") as f:
+            job = client.post("/jobs", files={"file": ("test.pdf", f, "application/pdf")},
+                              data={"target_language": "中文", "file_format": "markdown"}).json()
+        assert job["status"] == "succeeded"
+        assert fake_model.calls == calls_after_first
+        assert cache.stats()["hits"] == 2
+        print(f"   ✅ 任务接口同样命中缓存: {cache.stats()}")
+
+    shutil.rmtree(output_dir, ignore_errors=True)
+
+    cache_dir = Path(tempfile.mkdtemp())
+    small_cache = ResultCache(cache_dir, max_bytes=10)
+    for key in ("a", "b"):
+        source = cache_dir.parent / f"{key}_{os.getpid()}.md"
+        source.write_text("123456")
+        small_cache.put(key, source)
+    assert small_cache.get("a") is None and small_cache.get("b") is not None
+    print("   ✅ 超出容量时淘汰最久未使用的结果")
+    shutil.rmtree(cache_dir, ignore_errors=True)
+
+    print("   ✅ 翻译结果缓存测试通过")
+
+
+def test_upload_size_limit():
+    """测试上传文件大小限制"""
+    print("🧪 测试上传大小限制...")
+
+    import asyncio
+    import io
+    from fastapi import UploadFile
+    from fastapi.testclient import TestClient
+    from ai_translator.api import app as api_app
+    from ai_translator.api.uploads import UploadTooLargeError, spool_upload
+
+    with open(TEST_PDF, "rb") as f:
+        pdf_bytes = f.read()
+    path, digest, size = asyncio.run(spool_upload(UploadFile(io.BytesIO(pdf_bytes)), chunk_size=64 * 1024))
+    assert size == len(pdf_bytes) and path.read_bytes() == pdf_bytes
+    path.unlink()
+    print(f"   ✅ 分块写入并计算哈希: {digest[:12]}...")
+
+    try:
+        asyncio.run(spool_upload(UploadFile(io.BytesIO(pdf_bytes)), max_bytes=1024, chunk_size=512))
+        raise AssertionError("超出限制的上传应被拒绝")
+    except UploadTooLargeError:
+        print("   ✅ 分块写入时超出限制即中止")
+
+    client = TestClient(api_app.app)
+    with patch.object(api_app, "get_max_upload_bytes", return_value=1024):
+        big_file = io.BytesIO(b"0" * (512 * 1024))
+        response = client.post("/jobs", files={"file": ("big.pdf", big_file, "application/pdf")})
+        assert response.status_code == 413, response.text
+        print("   ✅ 按 Content-Length 提前拒绝超大上传")
+    metrics = client.get("/metrics").text
+    assert 'route="/jobs",method="POST",status="413"' in metrics
+    print("   ✅ 被拒绝的超大上传计入请求指标")
+
+    print("   ✅ 上传大小限制测试通过")
+
+
+def test_single_flight():
+    """测试并发的相同请求只执行一次"""
+    print("🧪 测试重复请求合并...")
+
+    import threading
+    from ai_translator.api.result_cache import SingleFlight
+
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def work():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "done"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flight.do("key", work))) for _ in range(5)]
+    threads[0].start()
+    started.wait(5)
+    for thread in threads[1:]:
+        thread.start()
+    time.sleep(0.1)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(calls) == 1 and results == ["done"] * 5
+    print("   ✅ 5 个并发请求只执行 1 次")
+    print("   ✅ 重复请求合并测试通过")
+
+
+def test_model_registry():
+    """测试模型客户端跨请求复用"""
+    print("🧪 测试模型客户端注册表...")
+
+    import threading
+    from ai_translator.model import ModelRegistry
+    from ai_translator.api import app as api_app
+
+    env_before = dict(os.environ)
+    registry = ModelRegistry()
+    models = []
+    threads = [
+        threading.Thread(target=lambda: models.append(registry.get_openai_model("gpt-4o-mini", "test-key")))
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len({id(model) for model in models}) == 1
+    assert registry.get_openai_model("gpt-4o", "test-key") is not models[0]
+    assert dict(os.environ) == env_before
+    print("   ✅ 并发获取同一配置只创建一个客户端，且未修改环境变量")
+
+    config = {"OpenAIModel": {"model": "gpt-4o-mini", "api_key": "test-key"}}
+    assert api_app.build_model("OpenAIModel", config) is api_app.build_model("OpenAIModel", config)
+    print("   ✅ API 请求之间复用模型客户端")
+
+    print("   ✅ 模型客户端注册表测试通过")
+
+
+def test_metrics_endpoint():
+    """测试 /metrics 指标导出"""
+    print("🧪 测试指标导出...")
+
+    import shutil
+    import tempfile
+    from pathlib import Path
+    from fastapi.testclient import TestClient
+    from ai_translator.api import app as api_app
+    from ai_translator.api.result_cache import ResultCache
+
+    output_dir = Path(tempfile.mkdtemp())
+    with patch.object(api_app, "build_model", return_value=_make_fake_model()), \
+            patch.object(api_app, "get_output_dir", return_value=output_dir), \
+            patch.object(api_app, "_result_cache", ResultCache(output_dir / ".cache")):
+        client = TestClient(api_app.app)
+        with open(TEST_PDF, "rb") as f:
+            client.post("/translate", files={"file": ("test.pdf", f, "application/pdf")})
+        response = client.get("/metrics")
+    shutil.rmtree(output_dir, ignore_errors=True)
+
+    assert response.status_code == 200
+    body = response.text
+    for name in [
+        'translator_phase_duration_seconds_count{phase="parse"}',
+        'translator_phase_duration_seconds_count{phase="translate"}',
+        'translator_phase_duration_seconds_count{phase="write"}',
+        'translator_contents_translated_total{content_type="text",status="ok"}',
+        'api_request_duration_seconds_count{route="/translate",method="POST",status="200"}',
+        'api_result_cache_lookups_total{result="miss"}',
+    ]:
+        assert name in body, name
+    print("   ✅ 阶段耗时、内容块计数、请求延迟与缓存命中均已导出")
+
+    from ai_translator.utils.metrics import MetricsRegistry
+    registry = MetricsRegistry()
+    histogram = registry.histogram("demo_seconds", "demo", ["model"], buckets=(1, 5))
+    histogram.observe(0.5, model="m")
+    histogram.observe(3, model="m")
+    text = registry.render()
+    assert 'demo_seconds_bucket{model="m",le="1"} 1' in text
+    assert 'demo_seconds_bucket{model="m",le="+Inf"} 2' in text
+    print("   ✅ 直方图桶为累计计数")
+
+    print("   ✅ 指标导出测试通过")
+
+
+def test_job_manager_queue_and_cancel():
+    """测试任务队列上限、取消与过期清理"""
+    print("🧪 测试任务队列管理...")
+
+    import tempfile
+    import threading
+    from pathlib import Path
+    from ai_translator.api.jobs import JobManager, JobQueueFullError, JobStatus, TranslationJob
+
+    release = threading.Event()
+
+    def blocking_run(job):
+        while not release.wait(0.05):
+            job.check_cancelled()
+        return None
+
+    def new_job():
+        work_dir = Path(tempfile.mkdtemp())
+        input_path = work_dir / "input.pdf"
+        input_path.write_bytes(b"%PDF")
+        return TranslationJob("a.pdf", "中文", "markdown", "OpenAIModel", input_path, work_dir)
+
+    manager = JobManager(max_workers=1, max_queue_size=1, ttl_seconds=0)
+    running = manager.submit(new_job(), blocking_run)
+    while running.status != JobStatus.RUNNING:
+        time.sleep(0.01)
+    queued = manager.submit(new_job(), blocking_run)
+
+    try:
+        manager.submit(new_job(), blocking_run)
+        raise AssertionError("队列已满时应拒绝新任务")
+    except JobQueueFullError:
+        print("   ✅ 队列已满时拒绝新任务")
+
+    manager.cancel(queued.id)
+    assert queued.status == JobStatus.CANCELLED
+    manager.cancel(running.id)
+    running.future.result(timeout=5)
+    assert running.status == JobStatus.CANCELLED
+    print("   ✅ 排队中和运行中的任务均可取消")
+
+    manager.cleanup_expired(force=True)
+    assert not manager.list_jobs()
+    assert not running.work_dir.exists()
+    print("   ✅ 过期任务的产物已清理")
+
+    manager.shutdown()
+    print("   ✅ 任务队列管理测试通过")
+
+
+def main():
+    """运行所有测试"""
+    print("🚀 开始翻译API测试...\n")
+
+    tests = [
+        test_job_lifecycle,
+        test_result_cache,
+        test_upload_size_limit,
+        test_single_flight,
+        test_model_registry,
+        test_metrics_endpoint,
+        test_job_manager_queue_and_cancel,
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test in tests:
+        # 测试函数通过断言报告失败，这里捕获异常以便继续运行其余测试
+        try:
+            test()
+            passed += 1
+        except Exception as e:
+            print(f"   ❌ {test.__name__} 失败: {type(e).__name__}: {e}")
+        print()
+
+    print(f"📊 测试结果: {passed}/{total} 通过")
+    return passed == total
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
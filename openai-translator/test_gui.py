@@ -8,11 +8,80 @@ import sys
 import os
 import tempfile
 import json
+import threading
+import time
 from unittest.mock import Mock, patch
 
 # 添加路径
 sys.path.append(os.path.join(os.path.dirname(__file__), 'ai_translator'))
 
+from ai_translator.model import Model
+
+
+class RecordingModel(Model):
+    """测试用模型：记录每次请求的提示，按请求顺序返回 "译文N"
+
+    单元格提示（make_cells_prompt）返回逐个加 "译" 前缀的 JSON 数组；reply 指定固定回复；
+    完成 fail_after 次请求后抛出异常模拟中断；delay 模拟请求耗时，max_in_flight 记录最大并发请求数。
+    每次请求上报 10 个提示 token 与 5 个补全 token。
+    """
+    
+    def __init__(self, reply=None, fail_after=None, delay=0.0):
+        self.prompts = []
+        self.reply = reply
+        self.fail_after = fail_after
+        self.delay = delay
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+    
+    @property
+    def calls(self):
+        return len(self.prompts)
+    
+    def make_request(self, prompt):
+        with self.lock:
+            if self.fail_after is not None and len(self.prompts) >= self.fail_after:
+                raise RuntimeError("进程中断")
+            self.prompts.append(prompt)
+            count = len(self.prompts)
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if self.delay:
+                time.sleep(self.delay)
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+        self.record_tokens(10, 5)
+        if self.reply is not None:
+            return self.reply, True
+        if "单元格：\n" in prompt:
+            cells = json.loads(prompt.rsplit("单元格：\n", 1)[1])
+            return json.dumps([f"译{cell}" for cell in cells], ensure_ascii=False), True
+        return f"译文{count}", True
+
+
+def make_book(pages, pdf_file_path="book.pdf"):
+    """按页构造 Book：每页为内容列表，字符串作为文本块，其余对象（如 TableContent）原样加入"""
+    from ai_translator.book import Book, Page, Content, ContentType
+    
+    book = Book(pdf_file_path)
+    for contents in pages:
+        page = Page()
+        for content in contents:
+            page.add_content(Content(ContentType.TEXT, content) if isinstance(content, str) else content)
+        book.add_page(page)
+    return book
+
+
+def use_book(translator, book_factory):
+    """让翻译器翻译 book_factory() 构造的书，不读取 PDF，也不写出译文文件"""
+    translator.pdf_parser.parse_pdf = lambda *args, **kwargs: book_factory()
+    translator.writer.save_translated_book = lambda *args, **kwargs: None
+    return translator
+
+
 def test_file_upload_component():
     """测试文件上传组件"""
     print("🧪 测试文件上传组件...")
@@ -74,6 +143,80 @@ def test_progress_display_component():
     
     return True
 
+def test_progress_channel():
+    """测试按变化推送、合并更新的进度通道"""
+    print("🧪 测试进度通道...")
+    
+    import threading
+    import time
+    from ai_translator.components.progress_display import ProgressChannel
+    
+    channel = ProgressChannel(initial=(0, "准备"))
+    assert channel.publish((1, "第1块"))
+    assert not channel.publish((1, "第1块")), "相同快照不应产生更新"
+    print("   ✅ 相同进度不重复推送")
+    
+    def producer():
+        for i in range(2, 200):
+            channel.publish((i, f"第{i}块"))
+            time.sleep(0.001)
+        channel.close((200, "完成"))
+    
+    received = []
+    thread = threading.Thread(target=producer)
+    thread.start()
+    for snapshot in channel.updates(min_interval=0.05):
+        received.append(snapshot)
+    thread.join()
+    
+    assert received[-1] == (200, "完成"), f"最后一次更新应为最终快照: {received[-1]}"
+    assert len(received) < 50, f"更新未被合并: 收到 {len(received)} 次"
+    assert [s[0] for s in received] == sorted(s[0] for s in received)
+    assert channel.closed and not channel.publish((201, "关闭后"))
+    print(f"   ✅ 199 次进度更新合并为 {len(received)} 次推送，最终快照送达")
+    
+    # 两个会话的通道互不影响
+    first, second = ProgressChannel(), ProgressChannel()
+    first.publish((50, "会话一"))
+    second.close((100, "会话二"))
+    assert list(second.updates()) == [(100, "会话二")]
+    assert first.snapshot() == (50, "会话一") and not first.closed
+    print("   ✅ 不同会话的进度通道相互独立")
+
+def test_admission_queue():
+    """测试多会话共享的翻译准入队列"""
+    print("🧪 测试翻译准入队列...")
+    
+    import threading
+    from ai_translator.components.admission_queue import AdmissionQueue
+    
+    admission = AdmissionQueue(max_concurrent=2)
+    tickets = [admission.join(f"session-{i}") for i in range(5)]
+    assert [admission.position(t) for t in tickets] == [0, 0, 1, 2, 3]
+    assert admission.join("session-0") is None, "同一会话不能重复排队"
+    print("   ✅ 超出并发上限的会话按先后排队，同一会话不能重复加入")
+    
+    positions = []
+    def waiter():
+        positions.extend(admission.wait_for_turn(tickets[4]))
+    thread = threading.Thread(target=waiter)
+    thread.start()
+    admission.leave(tickets[0])
+    admission.leave(tickets[3])
+    admission.leave(tickets[1])
+    thread.join(timeout=5)
+    assert not thread.is_alive(), "轮到后应结束等待"
+    assert positions and positions == sorted(positions, reverse=True), positions
+    assert admission.position(tickets[4]) == 0
+    assert admission.stats() == {'running': 2, 'waiting': 0, 'max_concurrent': 2}
+    print(f"   ✅ 排队位置变化依次为 {positions}，名额释放后自动放行")
+    
+    admission.leave(tickets[2])
+    admission.leave(tickets[2])
+    assert admission.stats()['running'] == 1
+    assert admission.join("session-0") is not None, "会话结束后可以再次排队"
+    print("   ✅ 重复释放无副作用，会话结束后可再次加入")
+
 def test_config_manager_component():
     """测试配置管理组件"""
     print("🧪 测试配置管理组件...")
@@ -126,113 +269,366 @@ def test_history_manager_component():
     """测试历史记录管理组件"""
     print("🧪 测试历史记录管理组件...")
     
-    try:
-        from ai_translator.components.history_manager import HistoryManagerComponent
-        
-        # 使用临时历史文件
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False) as tmp_file:
-            history_path = tmp_file.name
-        
-        component = HistoryManagerComponent(history_path)
-        
-        # 测试添加记录
+    from ai_translator.components.history_manager import HistoryManagerComponent
+    
+    # 使用临时历史文件
+    with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False) as tmp_file:
+        history_path = tmp_file.name
+    
+    component = HistoryManagerComponent(history_path)
+    
+    # 测试添加记录
+    record_id = component.add_record(
+        input_file="/test/file.pdf",
+        target_language="中文",
+        status="完成"
+    )
+    print(f"   ✅ 添加记录: ID {record_id}")
+    
+    # 测试更新记录
+    success = component.update_record(record_id, status="完成", output_file="/test/output.md")
+    print(f"   ✅ 更新记录: {success}")
+    
+    # 测试获取表格数据
+    table_data = component.get_history_table_data()
+    print(f"   ✅ 获取表格数据: {len(table_data)} 行")
+    
+    # 测试统计信息
+    stats = component.get_statistics()
+    print(f"   ✅ 统计信息: {stats.split()[1]}")
+    
+    # 旧版 JSON 历史只导入一次，并发写入不会丢失记录
+    import json
+    import threading
+    legacy_path = history_path.replace('.json', '_legacy.json')
+    with open(legacy_path, 'w', encoding='utf-8') as f:
+        json.dump([{'id': 'legacy_1', 'timestamp': '2025-01-01T00:00:00', 'filename': 'old.pdf',
+                    'status': '完成', 'file_size': 1024, 'pages': 3}], f, ensure_ascii=False)
+    legacy = HistoryManagerComponent(legacy_path)
+    assert HistoryManagerComponent(legacy_path).load_history()[0]['pages'] == 3
+    
+    def worker():
+        for _ in range(25):
+            new_id = legacy.add_record(input_file="/test/file.pdf")
+            assert legacy.update_record(new_id, status="失败", error_message="x")
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(legacy.load_history()) == 101
+    assert "失败: 100" in legacy.get_statistics()
+    assert legacy.delete_record('legacy_1')
+    print("   ✅ JSON历史导入与并发写入")
+    
+    # 清理
+    for path in (history_path, legacy_path):
+        base = os.path.splitext(path)[0]
+        for leftover in (path, base + '.db', base + '.db-wal', base + '.db-shm'):
+            if os.path.exists(leftover):
+                os.unlink(leftover)
+    
+    print("   ✅ 历史记录管理组件测试通过")
+
+def test_history_queries():
+    """测试历史记录的分页、筛选与增量统计"""
+    print("🧪 测试历史记录查询...")
+    
+    import shutil
+    from ai_translator.components.history_manager import HistoryManagerComponent
+    
+    work_dir = tempfile.mkdtemp()
+    component = HistoryManagerComponent(os.path.join(work_dir, "history.json"))
+    for index in range(45):
         record_id = component.add_record(
-            input_file="/test/file.pdf",
-            target_language="中文",
-            status="完成"
+            input_file=f"/docs/report_{index}.pdf",
+            target_language='英文' if index % 3 == 0 else '中文',
+            file_size=10
+        )
+        component.update_record(
+            record_id,
+            status='失败' if index % 5 == 0 else '完成',
+            timestamp=f"2025-01-{index % 28 + 1:02d}T12:00:00"
         )
-        print(f"   ✅ 添加记录: ID {record_id}")
-        
-        # 测试更新记录
-        success = component.update_record(record_id, status="完成", output_file="/test/output.md")
-        print(f"   ✅ 更新记录: {success}")
-        
-        # 测试获取表格数据
-        table_data = component.get_history_table_data()
-        print(f"   ✅ 获取表格数据: {len(table_data)} 行")
-        
-        # 测试统计信息
-        stats = component.get_statistics()
-        print(f"   ✅ 统计信息: {stats.split()[1]}")
-        
-        # 清理
-        os.unlink(history_path)
-        
-        print("   ✅ 历史记录管理组件测试通过")
-        
-    except Exception as e:
-        print(f"   ❌ 历史记录管理组件测试失败: {e}")
-        return False
     
-    return True
+    rows, info, page = component.get_history_page(page=3, page_size=20)
+    assert len(rows) == 5 and page == 3 and info == "第 3/3 页，共 45 条记录", info
+    rows, info, page = component.get_history_page(page=99, page_size=20)
+    assert page == 3
+    
+    records, total = component.query_history(status='失败')
+    assert total == 9 and all(r['status'] == '失败' for r in records)
+    _, total = component.query_history(target_language='英文', status='全部')
+    assert total == 15
+    _, total = component.query_history(filename='report_1')
+    assert total == 11
+    _, total = component.query_history(filename='%')
+    assert total == 0
+    _, total = component.query_history(date_from='2025-01-02', date_to='2025-01-03')
+    assert total == 4
+    try:
+        component.query_history(date_from='2025/01/02')
+        assert False, "错误的日期格式应抛出 ValueError"
+    except ValueError:
+        pass
+    print("   ✅ 分页与筛选")
+    
+    component.get_history_page(page=1, page_size=20, status='失败')
+    assert "状态" not in component.get_record_details(0)
+    assert component.get_record_details(0).startswith("记录ID:")
+    
+    aggregates = component.get_aggregates()
+    assert aggregates['完成']['records'] == 36 and aggregates['失败']['records'] == 9
+    failed_id = records[0]['id']
+    component.update_record(failed_id, status='完成')
+    component.delete_record(records[1]['id'])
+    aggregates = component.get_aggregates()
+    assert aggregates['完成']['records'] == 37 and aggregates['失败']['records'] == 7
+    assert "总记录数: 44" in component.get_statistics()
+    print("   ✅ 增量统计")
+    
+    # 界面清空历史时同时把页码与当前页记录ID重置
+    import gui_app
+    gui = gui_app.TranslatorGUI.__new__(gui_app.TranslatorGUI)
+    gui.history_manager = component
+    assert gui._refresh_history(page_size=20, page=2)[3] == 2
+    table_data, stats, page_info, page, page_ids = gui._clear_history()
+    assert table_data == [] and page == 1 and page_ids == [] and "共 0 条" in page_info
+    assert component.get_statistics() == "暂无翻译记录"
+    print("   ✅ 清空后回到第一页")
+    
+    shutil.rmtree(work_dir, ignore_errors=True)
+    print("   ✅ 历史记录查询测试通过")
+
+def test_history_write_coalescing():
+    """测试记录 id 唯一且进度更新被合并写入"""
+    print("🧪 测试历史记录写入合并...")
+    
+    import shutil
+    import threading
+    import time
+    from ai_translator.components.history_manager import HistoryManagerComponent
+    from ai_translator.components.batch_processor import BatchProcessorComponent
+    
+    work_dir = tempfile.mkdtemp()
+    component = HistoryManagerComponent(os.path.join(work_dir, "history.json"), flush_interval=0.1)
+    
+    ids = []
+    def add_many():
+        for _ in range(200):
+            ids.append(component.add_record(input_file="/test/file.pdf"))
+    threads = [threading.Thread(target=add_many) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(set(ids)) == 800 and len(component.load_history()) == 800
+    assert sorted(component.add_record(input_file="/a.pdf") for _ in range(3)) == [
+        record['id'] for record in component.load_history()[:3]][::-1]
+    print("   ✅ 并发添加 800 条记录，id 无重复且按时间递增")
+    
+    # id 按 UTC 生成并带有进程标识；已存在的 id 再次插入时报错而不是覆盖原记录
+    from datetime import datetime, timezone
+    import sqlite3
+    assert ids[0][:15] <= datetime.now(timezone.utc).strftime('%Y%m%d_%H%M%S')
+    assert len({record_id.rsplit('_', 1)[1] for record_id in ids}) == 1
+    duplicate = dict(component._get_record(ids[0]), input_file="/other.pdf")
+    try:
+        with component._conn:
+            component._insert_record(duplicate)
+        raise AssertionError("conflicting insert should fail")
+    except sqlite3.IntegrityError:
+        pass
+    assert component._get_record(ids[0])['input_file'] == "/test/file.pdf"
+    print("   ✅ 重复 id 的插入被拒绝")
+    
+    record_id = ids[0]
+    changes_before = component._conn.total_changes
+    for progress in range(100):
+        assert component.update_record(record_id, progress=progress)
+    time.sleep(0.3)
+    row = component._conn.execute("SELECT extra FROM history WHERE id = ?", (record_id,)).fetchone()
+    assert '"progress": 99' in row[0], row[0]
+    assert component._conn.total_changes - changes_before <= 3
+    assert not component.update_record("missing", progress=1)
+    
+    component.update_record(record_id, progress=50)
+    component.update_record(record_id, status="完成")
+    record = component.query_history(page_size=1000)[0]
+    record = next(r for r in record if r['id'] == record_id)
+    assert record['status'] == "完成" and record['progress'] == 50 and record['duration']
+    print("   ✅ 100 次进度更新合并为一次写入")
+    
+    batch = BatchProcessorComponent()
+    test_pdf = os.path.join(os.path.dirname(__file__), "tests", "test.pdf")
+    batch.add_files_to_queue([test_pdf] * 5, {})
+    assert len({task['id'] for task in batch.current_batch}) == 5
+    assert all(task['id'].startswith('task_') for task in batch.current_batch)
+    
+    component.close()
+    shutil.rmtree(work_dir, ignore_errors=True)
+    print("   ✅ 历史记录写入合并测试通过")
 
 def test_batch_processor_component():
     """测试批量处理组件"""
     print("🧪 测试批量处理组件...")
     
-    try:
-        from ai_translator.components.batch_processor import BatchProcessorComponent
-        
-        component = BatchProcessorComponent(max_workers=2)
-        
-        # 创建测试文件
-        test_files = []
-        for i in range(3):
-            with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as tmp_file:
-                tmp_file.write(f"test content {i}".encode())
-                test_files.append(tmp_file.name)
-        
-        # 测试添加文件到队列
-        config = {
-            'target_language': '中文',
-            'file_format': 'markdown',
-            'model_type': 'OpenAI'
-        }
-        
-        result = component.add_files_to_queue(test_files, config)
-        print(f"   ✅ 添加文件到队列: {result}")
-        
-        # 测试获取队列显示数据
-        queue_data = component.get_queue_display_data()
-        print(f"   ✅ 队列显示数据: {len(queue_data)} 个任务")
-        
-        # 测试批量状态
-        status = component.get_batch_status()
-        print(f"   ✅ 批量状态: {status.split()[1]}")
-        
-        # 清理测试文件
-        for file_path in test_files:
-            os.unlink(file_path)
-        
-        print("   ✅ 批量处理组件测试通过")
-        
-    except Exception as e:
-        print(f"   ❌ 批量处理组件测试失败: {e}")
-        return False
+    from ai_translator.components.batch_processor import BatchProcessorComponent
     
-    return True
+    component = BatchProcessorComponent(max_workers=2)
+    
+    # 创建测试文件
+    test_files = []
+    for i in range(3):
+        with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as tmp_file:
+            tmp_file.write(f"test content {i}".encode())
+            test_files.append(tmp_file.name)
+    
+    # 测试添加文件到队列
+    config = {
+        'target_language': '中文',
+        'file_format': 'markdown',
+        'model_type': 'OpenAI'
+    }
+    
+    result = component.add_files_to_queue(test_files, config)
+    print(f"   ✅ 添加文件到队列: {result}")
+    
+    # 测试获取队列显示数据
+    queue_data = component.get_queue_display_data()
+    print(f"   ✅ 队列显示数据: {len(queue_data)} 个任务")
+    
+    # 测试批量状态
+    status = component.get_batch_status()
+    print(f"   ✅ 批量状态: {status.split()[1]}")
+    
+    # 清理测试文件
+    for file_path in test_files:
+        os.unlink(file_path)
+    
+    print("   ✅ 批量处理组件测试通过")
+
+def test_batch_real_translation():
+    """测试批量处理驱动真实的 PDFTranslator"""
+    print("🧪 测试批量翻译执行...")
+    
+    from ai_translator.components.batch_processor import BatchProcessorComponent
+    from ai_translator.translator import PDFTranslator
+    
+    model = RecordingModel(delay=0.02)
+    component = BatchProcessorComponent(max_workers=2, max_concurrent_requests=2)
+    output_dir = tempfile.mkdtemp()
+    
+    def translate_function(pdf_file_path, target_language, file_format, model_type, progress_callback, task_id=None, block_gate=None):
+        translator = PDFTranslator(model, request_limiter=component.request_limiter, max_workers=4)
+        output_file = os.path.join(output_dir, f"{len(os.listdir(output_dir))}.md")
+        translator.translate_pdf(pdf_file_path, file_format, target_language, output_file, progress_callback=progress_callback)
+        return {'output_file': output_file, 'tokens': translator.token_usage.total_tokens}
+    
+    test_pdf = os.path.join(os.path.dirname(__file__), "tests", "test.pdf")
+    component.add_files_to_queue([test_pdf, test_pdf, test_pdf], {'file_format': 'markdown'})
+    assert component.current_batch[0]['total_pages'] == 2
+    component.start_batch_processing(translate_function, max_workers=2, retry_failed=False)
+    
+    assert component.wait_until_idle(timeout=30)
+    
+    statuses = [task['status'] for task in component.current_batch]
+    assert statuses == ['完成'] * 3, statuses
+    assert all(task['progress'] == 100 for task in component.current_batch)
+    assert model.max_in_flight <= 2, model.max_in_flight
+    # 共享模型客户端上报的 token 按发出请求的翻译器分别计入各自的任务（每个文件 2 个内容块）
+    assert [task['tokens'] for task in component.current_batch] == [30] * 3
+    print(f"   ✅ 3 个文件翻译完成，最大并发请求数: {model.max_in_flight}")
+    
+    import shutil
+    shutil.rmtree(output_dir, ignore_errors=True)
+    print("   ✅ 批量翻译执行测试通过")
+
+def test_gui_batch_outputs():
+    """测试界面批量翻译：同名文件输出互不覆盖，单文件线程数按并发请求数分配"""
+    print("🧪 测试批量翻译输出文件...")
+    
+    import shutil
+    import gui_app
+    from ai_translator.components.batch_processor import BatchProcessorComponent
+    from ai_translator.translator import PDFTranslator
+    
+    work_dir = tempfile.mkdtemp()
+    test_pdf = os.path.join(os.path.dirname(__file__), "tests", "test.pdf")
+    inputs = []
+    for folder in ("a", "b"):
+        os.makedirs(os.path.join(work_dir, folder))
+        inputs.append(shutil.copy(test_pdf, os.path.join(work_dir, folder, "manual.pdf")))
+    
+    gui = gui_app.TranslatorGUI.__new__(gui_app.TranslatorGUI)
+    gui.config_manager = Mock(load_config=Mock(return_value={'common': {'output_dir': os.path.join(work_dir, "out")}}))
+    gui.history_manager = Mock(add_record=Mock(return_value="record"))
+    gui.batch_processor = BatchProcessorComponent(max_workers=2, max_concurrent_requests=4)
+    gui.translation_memory = None
+    gui._get_model = lambda model_type, config: RecordingModel()
+    
+    pool_sizes = []
+    # gui_app 以顶层模块导入 book/model，这里换成与 RecordingModel 同一套模块的翻译器
+    class RecordingTranslator(PDFTranslator):
+        def __init__(self, *args, **kwargs):
+            pool_sizes.append(kwargs['max_workers'])
+            super().__init__(*args, **kwargs)
+    
+    gui.batch_processor.add_files_to_queue(inputs, {'file_format': 'markdown'})
+    with patch.object(gui_app, "PDFTranslator", RecordingTranslator):
+        gui._start_batch_processing(2, False, 0, 4)
+        assert gui.batch_processor.wait_until_idle(timeout=30)
+    
+    outputs = [task['output_file'] for task in gui.batch_processor.current_batch]
+    assert len(set(outputs)) == 2 and all(os.path.exists(path) and path.endswith(".md") for path in outputs), outputs
+    assert pool_sizes == [2, 2], pool_sizes
+    assert gui_app.TranslatorGUI._output_extension("PDF") == ".pdf"
+    print(f"   ✅ 输出文件: {[os.path.basename(path) for path in outputs]}")
+
+    # 失败重试沿用任务第一次创建的历史记录
+    from ai_translator.components.history_manager import HistoryManagerComponent
+
+    gui.history_manager = HistoryManagerComponent(os.path.join(work_dir, "history.json"))
+    gui.batch_processor = BatchProcessorComponent(max_workers=1, retry_base_delay=0.01)
+    attempts = []
+
+    class FlakyTranslator(PDFTranslator):
+        def translate_pdf(self, *args, **kwargs):
+            attempts.append(args[0])
+            if len(attempts) == 1:
+                raise RuntimeError("模型暂时不可用")
+            return super().translate_pdf(*args, **kwargs)
+
+    gui.batch_processor.add_files_to_queue(inputs[:1], {'file_format': 'markdown'})
+    with patch.object(gui_app, "PDFTranslator", FlakyTranslator):
+        gui._start_batch_processing(1, True, 2, 4)
+        assert gui.batch_processor.wait_until_idle(timeout=30)
+    records = gui.history_manager.load_history()
+    assert len(attempts) == 2 and len(records) == 1, records
+    assert records[0]['status'] == '完成' and not records[0]['error_message'] and records[0]['duration'], records[0]
+    print("   ✅ 重试后仍只有一条历史记录")
+    shutil.rmtree(work_dir, ignore_errors=True)
 
 def test_main_integration():
     """测试主程序集成"""
     print("🧪 测试主程序集成...")
     
-    try:
-        # 测试命令行参数解析
-        from ai_translator.utils.argument_parser import ArgumentParser
-        
-        parser = ArgumentParser()
-        
-        # 模拟GUI参数
-        with patch('sys.argv', ['main.py', '--gui']):
-            args = parser.parse_arguments()
-            print(f"   ✅ GUI参数解析: gui={getattr(args, 'gui', False)}")
-        
-        # 测试配置加载
-        from ai_translator.utils.config_loader import ConfigLoader
-        
-        # 创建测试配置
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.yaml', delete=False) as tmp_file:
-            tmp_file.write("""
+    # 测试命令行参数解析
+    from ai_translator.utils.argument_parser import ArgumentParser
+    
+    parser = ArgumentParser()
+    
+    # 模拟GUI参数
+    with patch('sys.argv', ['main.py', '--gui']):
+        args = parser.parse_arguments()
+        print(f"   ✅ GUI参数解析: gui={getattr(args, 'gui', False)}")
+    
+    # 测试配置加载
+    from ai_translator.utils.config_loader import ConfigLoader
+    
+    # 创建测试配置
+    with tempfile.NamedTemporaryFile(mode='w', suffix='.yaml', delete=False) as tmp_file:
+        tmp_file.write("""
 OpenAIModel:
   model: "gpt-4o-mini"
   api_key: "test-key"
@@ -240,22 +636,492 @@ common:
   book: "test.pdf"
   file_format: "markdown"
 """)
-            config_path = tmp_file.name
+        config_path = tmp_file.name
+    
+    loader = ConfigLoader(config_path)
+    config = loader.load_config()
+    print(f"   ✅ 配置加载: 模型 {config['OpenAIModel']['model']}")
+    
+    # 清理
+    os.unlink(config_path)
+    
+    print("   ✅ 主程序集成测试通过")
+
+def test_batch_scheduler_controls():
+    """测试批量调度的重试、暂停/继续与停止"""
+    print("🧪 测试批量调度控制...")
+    
+    import threading
+    import time
+    from ai_translator.components.batch_processor import BatchProcessorComponent
+    
+    test_pdf = os.path.join(os.path.dirname(__file__), "tests", "test.pdf")
+    
+    # 失败后按指数退避重试
+    component = BatchProcessorComponent(max_workers=1, retry_base_delay=0.05)
+    attempts = []
+    
+    def flaky_translate(pdf_file_path, target_language, file_format, model_type, progress_callback, task_id=None, block_gate=None):
+        attempts.append(time.time())
+        if len(attempts) < 3:
+            raise RuntimeError("模型暂时不可用")
+        return {'output_file': 'out.md'}
+    
+    assert component._retry_delay(1) == 0.05 and component._retry_delay(3) == 0.2
+    component.add_files_to_queue([test_pdf], {})
+    component.start_batch_processing(flaky_translate, max_workers=1, max_retries=2)
+    assert component.wait_until_idle(timeout=10)
+    task = component.current_batch[0]
+    assert task['status'] == '完成' and task['retry_count'] == 2, task
+    assert attempts[2] - attempts[1] >= 0.1
+    print("   ✅ 失败任务按指数退避重试后完成")
+    
+    # 暂停时处理中的文件停在内容块之间，且不再提交新文件；停止会中断处理中的文件
+    component = BatchProcessorComponent(max_workers=1)
+    started = []
+    entered = threading.Event()
+    
+    def slow_translate(pdf_file_path, target_language, file_format, model_type, progress_callback, task_id=None, block_gate=None):
+        started.append(pdf_file_path)
+        for content_idx in range(200):
+            entered.set()
+            progress_callback(0, content_idx, 200)
+            time.sleep(0.01)
+        return {'output_file': 'out.md'}
+    
+    component.add_files_to_queue([test_pdf, test_pdf], {})
+    component.start_batch_processing(slow_translate, max_workers=1, retry_failed=False)
+    assert entered.wait(5)
+    component.pause_processing()
+    time.sleep(0.1)
+    paused_progress = component.current_batch[0]['progress']
+    time.sleep(0.2)
+    assert component.current_batch[0]['progress'] == paused_progress
+    assert '已暂停' in component.get_batch_status()
+    component.resume_processing()
+    time.sleep(0.1)
+    assert component.current_batch[0]['progress'] > paused_progress
+    component.stop_processing()
+    assert component.wait_until_idle(timeout=5)
+    statuses = [task['status'] for task in component.current_batch]
+    assert statuses == ['已取消', '已取消'], statuses
+    assert len(started) == 1
+    print("   ✅ 暂停、继续与停止生效")
+
+    # 文件内并发翻译时，暂停后不再有新的模型请求，取消后也不再请求剩余内容块
+    from ai_translator.translator import PDFTranslator
+
+    model = RecordingModel(delay=0.02)
+    component = BatchProcessorComponent(max_workers=1, max_concurrent_requests=4)
+
+    def concurrent_translate(pdf_file_path, target_language, file_format, model_type, progress_callback, task_id=None, block_gate=None):
+        translator = use_book(PDFTranslator(model, max_workers=4), lambda: make_book([[f"第{i}段"] for i in range(100)]))
+        translator.translate_pdf(pdf_file_path, file_format, target_language, progress_callback=progress_callback, block_gate=block_gate)
+        return {'output_file': 'out.md'}
+
+    component.add_files_to_queue([test_pdf], {})
+    component.start_batch_processing(concurrent_translate, max_workers=1, retry_failed=False)
+    deadline = time.time() + 5
+    while model.calls < 12 and time.time() < deadline:
+        time.sleep(0.005)
+    component.pause_processing()
+    # 已发出的请求（最多 4 个）完成后，调用次数不再增加
+    time.sleep(0.1)
+    paused_calls = model.calls
+    time.sleep(0.3)
+    assert model.calls == paused_calls < 100, (paused_calls, model.calls)
+    component.resume_processing()
+    time.sleep(0.1)
+    assert model.calls > paused_calls
+    component.stop_processing()
+    assert component.wait_until_idle(timeout=5)
+    stopped_calls = model.calls
+    time.sleep(0.2)
+    assert model.calls == stopped_calls < 100 and component.current_batch[0]['status'] == '已取消'
+    print(f"   ✅ 暂停时模型调用停在 {paused_calls} 次，停止后不再请求剩余内容块")
+
+    print("   ✅ 批量调度控制测试通过")
+
+def test_batch_scheduling_policies():
+    """测试按文件规模与优先级排序的调度策略"""
+    print("🧪 测试批量调度策略...")
+    
+    import time
+    from ai_translator.components.batch_processor import BatchProcessorComponent
+    
+    test_pdf = os.path.join(os.path.dirname(__file__), "tests", "test.pdf")
+    
+    def run_order(policy, groups, sizes, priorities=None):
+        component = BatchProcessorComponent(max_workers=1, scheduling_policy=policy)
+        for files in groups:
+            component.add_files_to_queue([test_pdf] * files, {})
+        with component._lock:
+            for index, task in enumerate(component.current_batch):
+                task['filename'] = f"f{index}"
+                task['estimated_tokens'] = sizes[index]
+                if priorities:
+                    task['config']['priority'] = priorities[index]
+            component._reorder_queue()
+        order = []
         
-        loader = ConfigLoader(config_path)
-        config = loader.load_config()
-        print(f"   ✅ 配置加载: 模型 {config['OpenAIModel']['model']}")
+        def translate_function(pdf_file_path, target_language, file_format, model_type, progress_callback, task_id=None, block_gate=None):
+            order.append(next(t['filename'] for t in component.current_batch if t['status'] == '处理中'))
+            return {}
         
-        # 清理
-        os.unlink(config_path)
+        component.start_batch_processing(translate_function, max_workers=1)
+        assert component.wait_until_idle(timeout=10)
+        return order, component
+    
+    order, component = run_order('sjf', [3], [800, 20, 100])
+    assert order == ['f1', 'f2', 'f0'], order
+    assert component.current_batch[0]['total_pages'] == 2
+    print(f"   ✅ 短作业优先: {order}")
+    
+    order, _ = run_order('fifo', [3], [800, 20, 100])
+    assert order == ['f0', 'f1', 'f2'], order
+    
+    order, _ = run_order('priority', [3], [800, 20, 100], ['高', '低', '普通'])
+    assert order == ['f0', 'f2', 'f1'], order
+    print(f"   ✅ 优先级: {order}")
+    
+    # 第一次添加3个文件、第二次添加1个文件，公平共享让第二组不必等第一组全部完成
+    order, _ = run_order('fair', [3, 1], [100, 100, 100, 100])
+    assert order == ['f0', 'f3', 'f1', 'f2'], order
+    print(f"   ✅ 公平共享: {order}")
+    
+    # 调整调度策略重建队列时，已回到队列的重试任务不能丢失；仍在退避中的任务由定时器入队
+    component = BatchProcessorComponent(max_workers=1)
+    component.add_files_to_queue([test_pdf, test_pdf], {})
+    with component._lock:
+        retried, waiting = component.current_batch
+        component._set_status(retried, '重试中')
+        component._reorder_queue()
+        queued = sorted(item[2]['id'] for item in component.processing_queue.queue if item[2])
+        assert queued == sorted([retried['id'], waiting['id']]), queued
+        component._retry_timers[retried['id']] = Mock()
+        component._reorder_queue()
+        queued = [item[2]['id'] for item in component.processing_queue.queue if item[2]]
+        assert queued == [waiting['id']], queued
+    print("   ✅ 重建队列时保留重试任务")
+    
+    # 完成任务后按实测吞吐量估算等待中任务的完成时间
+    component = BatchProcessorComponent(max_workers=1)
+    component.add_files_to_queue([test_pdf, test_pdf], {})
+    with component._lock:
+        first, second = component.current_batch
+        component._set_status(first, '完成')
+        first.update(progress=100, start_time=time.time() - 10, end_time=time.time())
+        component._active_ids.discard(first['id'])
+        assert component._pending_cost == component._task_cost(second)
+        component._record_throughput(first)
+    eta = component.get_queue_display_data()[1][4]
+    assert eta == '10秒', eta
+    print(f"   ✅ 预计完成时间: {eta}")
+    
+    print("   ✅ 批量调度策略测试通过")
+
+def test_batch_persistence():
+    """测试批量队列持久化与按内容块检查点恢复"""
+    print("🧪 测试批量队列持久化...")
+    
+    import shutil
+    from ai_translator.components.batch_processor import BatchProcessorComponent
+    from ai_translator.components.batch_store import BatchTaskStore
+    from ai_translator.translator import PDFTranslator
+    
+    work_dir = tempfile.mkdtemp()
+    db_path = os.path.join(work_dir, "batch.db")
+    test_pdf = os.path.join(os.path.dirname(__file__), "tests", "test.pdf")
+    
+    # 第一次运行：翻译一个内容块后中断，任务停留在“处理中”
+    store = BatchTaskStore(db_path)
+    component = BatchProcessorComponent(store=store)
+    component.add_files_to_queue([test_pdf], {'file_format': 'markdown'})
+    task = component.current_batch[0]
+    task['status'] = '处理中'
+    store.save_task(task)
+    try:
+        PDFTranslator(RecordingModel(fail_after=1)).translate_pdf(
+            test_pdf, 'markdown', '中文', os.path.join(work_dir, "partial.md"),
+            checkpoint=store.checkpoint(task['id']))
+    except RuntimeError:
+        pass
+    assert len(store.checkpoint(task['id'])) == 1
+    store.close()
+    
+    # 重启后恢复任务，只翻译剩余的内容块
+    store = BatchTaskStore(db_path)
+    component = BatchProcessorComponent(store=store)
+    assert [t['status'] for t in component.current_batch] == ['等待中']
+    model = RecordingModel()
+    output_file = os.path.join(work_dir, "out.md")
+    
+    def translate_function(pdf_file_path, target_language, file_format, model_type, progress_callback, checkpoint=None, task_id=None, block_gate=None):
+        PDFTranslator(model).translate_pdf(pdf_file_path, file_format, target_language, output_file,
+                                           progress_callback=progress_callback, checkpoint=checkpoint)
+        return {'output_file': output_file}
+    
+    component.start_batch_processing(translate_function, max_workers=1)
+    assert component.wait_until_idle(timeout=30)
+    book = PDFTranslator(RecordingModel()).pdf_parser.parse_pdf(test_pdf)
+    total_blocks = sum(len(page.contents) for page in book.pages)
+    assert model.calls == total_blocks - 1, (model.calls, total_blocks)
+    with open(output_file, encoding='utf-8') as f:
+        assert '译文1' in f.read()
+    print(f"   ✅ 重启后恢复任务，跳过 1/{total_blocks} 个已翻译的内容块")
+    
+    saved = store.load_tasks()
+    assert saved[0]['status'] == '完成' and saved[0]['output_file'] == output_file
+    assert len(store.checkpoint(saved[0]['id'])) == 0
+    
+    component.clear_queue()
+    assert store.load_tasks() == []
+    store.close()
+    shutil.rmtree(work_dir, ignore_errors=True)
+    print("   ✅ 批量队列持久化测试通过")
+
+def test_batch_statistics():
+    """测试批量处理的计时、吞吐量与耗时分位数统计"""
+    print("🧪 测试批量处理统计...")
+    
+    import time
+    from ai_translator.components.batch_processor import BatchProcessorComponent
+    
+    test_pdf = os.path.join(os.path.dirname(__file__), "tests", "test.pdf")
+    component = BatchProcessorComponent(max_workers=2, retry_base_delay=0.01)
+    durations = iter([0.1, 0.2, 0.3])
+    failed_once = []
+    
+    def translate_function(pdf_file_path, target_language, file_format, model_type, progress_callback, task_id=None, block_gate=None):
+        duration = next(durations, 0.1)
+        if not failed_once:
+            failed_once.append(True)
+            raise RuntimeError("临时错误")
+        for content_idx in range(2):
+            progress_callback(0, content_idx, 2)
+        time.sleep(duration)
+        return {'tokens': 120}
+    
+    assert component.get_batch_summary() == "暂无处理结果"
+    component.add_files_to_queue([test_pdf] * 3, {})
+    component.start_batch_processing(translate_function, max_workers=2, max_retries=1)
+    assert component.wait_until_idle(timeout=10)
+    
+    assert component._status_counts['完成'] == 3
+    assert component._completed['pages'] == 6 and component._completed['blocks'] == 6
+    # 吞吐量按模型实际上报的 token 统计，预估值只用于调度
+    assert component._completed['tokens'] == 360
+    assert component._completed['cost'] == 3 * component._task_cost(component.current_batch[0])
+    assert not component._pending and not component._running and abs(component._pending_cost + component._running_cost) < 1e-6
+    latencies = [task['end_time'] - task['first_start_time'] for task in component.current_batch]
+    assert sorted(latencies) == component._latencies
+    assert component._percentile(component._latencies, 50) == sorted(latencies)[1]
+    assert component._percentile(component._latencies, 95) == max(latencies)
+    throughput = component.get_throughput()
+    assert throughput['pages_per_minute'] > 0 and throughput['tokens_per_second'] > 0
+    
+    status = component.get_batch_status()
+    assert "已完成: 3" in status and "等待中: 0" in status
+    summary = component.get_batch_summary()
+    assert "重试: 1次" in summary and "P95" in summary and "页/分钟" in summary
+    print(f"   ✅ 批量摘要: {summary.splitlines()[-1]}")
+    
+    component.clear_queue()
+    assert component._completed['files'] == 0 and not component._latencies
+    print("   ✅ 批量处理统计测试通过")
+
+def test_table_cell_translation():
+    """测试表格按单元格去重翻译并按坐标写回"""
+    print("🧪 测试表格单元格翻译...")
+    
+    from ai_translator.book import TableContent
+    from ai_translator.book.content import is_translatable_cell
+    from ai_translator.translator import PDFTranslator
+    
+    assert not any(is_translatable_cell(value) for value in ["", None, float("nan"), "1,024", "12.5%", "2023-10-01", "2023年10月1日", "SKU-1024"])
+    assert is_translatable_cell("Apple") and is_translatable_cell("Model 3")
+    
+    # 默认整表文本翻译，配置 translator.table_mode 后按单元格翻译
+    assert PDFTranslator(RecordingModel()).table_mode == "text"
+    assert PDFTranslator.options_from_config({'translator': {'table_mode': 'cells'}}) == {'table_mode': 'cells'}
+
+    table = TableContent([["Name", "Price", "Date"], ["Apple", "1.5", "2023-10-01"], ["Apple", "", "SKU-1024"]])
+    assert table.translatable_cells() == ["Name", "Price", "Date", "Apple"]
+    
+    model = RecordingModel()
+    translator = PDFTranslator(model, table_mode="cells")
+    translation, status = translator._translate_content(0, table, "中文")
+    assert status and table.status and len(model.prompts) == 1
+    assert list(table.translation.columns) == ["译Name", "译Price", "译Date"]
+    assert table.translation.values.tolist() == [["译Apple", "1.5", "2023-10-01"], ["译Apple", "", "SKU-1024"]]
+    print("   ✅ 单元格去重后翻译，数字、日期与编号保持原样")
+    
+    # 检查点中的回复可以直接恢复译文
+    restored = TableContent([["Name", "Price", "Date"], ["Apple", "1.5", "2023-10-01"], ["Apple", "", "SKU-1024"]])
+    restored.set_cell_translations(translation, status)
+    assert restored.translation.equals(table.translation)
+    # 模型可能用 ```json 代码块包裹回复
+    restored.set_cell_translations("```json\n" + translation + "\n```", status)
+    assert restored.status and restored.translation.equals(table.translation)
+    
+    # 整表文本模式的回复即使以 [ 开头也按表格文本解析，不当作单元格 JSON
+    text_mode = TableContent([["Name", "Price"], ["Apple", "1.5"]])
+    text_mode.set_translation("[注] 名称 | 价格\n苹果 | 1.5", True)
+    assert text_mode.status and list(text_mode.translation.columns) == ["[注] 名称", "价格"]
+    text_mode.set_translation('["名称", "价格"]', True)
+    assert text_mode.translation.values.tolist() == [['["名称", "价格"]']]
+    
+    # 回复数量不符时保留原表格结构并标记失败
+    broken = TableContent([["Name", "Price"], ["Apple", "1.5"]])
+    _, status = PDFTranslator(RecordingModel('["只有一个"]'), table_mode="cells")._translate_content(0, broken, "中文")
+    assert not status and broken.translation.equals(broken.original)
+    
+    numbers = TableContent([["1", "2"], ["3", "2024-01-01"]])
+    model = RecordingModel()
+    _, status = PDFTranslator(model, table_mode="cells")._translate_content(0, numbers, "中文")
+    assert status and not model.prompts
+    print("   ✅ 纯数字表格不请求模型，解析失败时保留原表格")
+
+def test_translation_memory():
+    """测试翻译记忆库的精确/模糊匹配、术语表以及在翻译器中的使用"""
+    print("🧪 测试翻译记忆库...")
+    
+    import tempfile
+    from ai_translator.book import Content, ContentType
+    from ai_translator.translator import PDFTranslator, TranslationMemory
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        memory = TranslationMemory(os.path.join(temp_dir, "memory.db"))
+        memory.add("The engine must be stopped before service.", "维修前必须关闭发动机。", "中文")
+        memory.add_term("engine", "发动机", "中文")
         
-        print("   ✅ 主程序集成测试通过")
+        assert memory.lookup_exact("The engine  must be stopped\nbefore service.", "中文") == "维修前必须关闭发动机。"
+        assert memory.lookup_exact("The engine must be stopped before service.", "English") is None
+        matches = memory.lookup_fuzzy("The engine must be stopped before servicing.", "中文")
+        assert len(matches) == 1 and matches[0][1] == "维修前必须关闭发动机。" and matches[0][2] >= 0.75
+        assert not memory.lookup_fuzzy("Completely unrelated sentence here.", "中文")
+        assert memory.glossary_terms("Check the Engine oil.", "中文") == [("engine", "发动机")]
+        assert not memory.glossary_terms("Check the engines.", "中文")
+        print("   ✅ 精确匹配、模糊匹配与术语匹配正确")
         
-    except Exception as e:
-        print(f"   ❌ 主程序集成测试失败: {e}")
-        return False
+        model = RecordingModel()
+        translator = PDFTranslator(model, translation_memory=memory)
+        exact = Content(ContentType.TEXT, "The engine must be stopped before service.")
+        assert translator._translate_content(0, exact, "中文") == ("维修前必须关闭发动机。", True)
+        assert not model.prompts
+        
+        near = Content(ContentType.TEXT, "The engine must be stopped before servicing.")
+        assert translator._translate_content(0, near, "中文") == ("译文1", True)
+        assert "维修前必须关闭发动机。" in model.prompts[0] and "engine => 发动机" in model.prompts[0]
+        
+        # 模型译文写入记忆库，但不会覆盖人工审核过的译文
+        assert memory.lookup_exact(near.original, "中文") == "译文1"
+        memory.add(near.original, "维修前必须关闭发动机（修订）。", "中文")
+        memory.add(near.original, "模型译文", "中文", approved=False)
+        assert memory.lookup_exact(near.original, "中文") == "维修前必须关闭发动机（修订）。"
+        assert memory.stats() == {"segments": 2, "approved_segments": 2, "glossary_terms": 1}
+        print("   ✅ 精确命中不请求模型，近似译文与术语加入提示")
+        memory.close()
+
+def test_incremental_retranslation():
+    """测试修订版文档的增量翻译：未改动的内容块复用旧译文，只翻译新增或修改的内容块"""
+    print("🧪 测试增量翻译...")
     
-    return True
+    import tempfile
+    from ai_translator.book import TableContent
+    from ai_translator.translator import PDFTranslator
+    from ai_translator.translator.revision import TranslationSnapshot, align_book
+    
+    def edition(*texts):
+        return make_book([[*texts, TableContent([["Name", "Price"], ["Apple", "1.5"]])]], "edition.pdf")
+    
+    test_pdf = os.path.join(os.path.dirname(__file__), "tests", "test.pdf")
+    # RecordingModel 的整表文本回复与原表格结构不符，不会进入快照；按单元格翻译时表格译文可以复用
+    with tempfile.TemporaryDirectory() as work_dir:
+        snapshot_file = os.path.join(work_dir, "v1.json")
+        model = RecordingModel()
+        PDFTranslator(model, table_mode="cells").translate_pdf(test_pdf, 'markdown', '中文', os.path.join(work_dir, "v1.md"),
+                                           snapshot_file=snapshot_file)
+        first_requests = len(model.prompts)
+        model = RecordingModel()
+        PDFTranslator(model, table_mode="cells").translate_pdf(test_pdf, 'markdown', '中文', os.path.join(work_dir, "v2.md"),
+                                           previous_snapshot=snapshot_file)
+        assert first_requests > 0 and not model.prompts
+        print(f"   ✅ 相同版本重新翻译时复用全部 {first_requests} 个内容块")
+        
+        # 旧版本：两段文字与一个表格
+        old_paragraph = "The engine must be stopped before any maintenance work is carried out on the machine."
+        translator = use_book(PDFTranslator(RecordingModel(), table_mode="cells"), lambda: edition("Chapter One", old_paragraph))
+        translator.translate_pdf("edition.pdf", 'markdown', '中文', os.path.join(work_dir, "old.md"), snapshot_file=snapshot_file)
+        snapshot = TranslationSnapshot.load(snapshot_file)
+        assert len(snapshot.blocks) == 3
+        
+        # 新版本：段落位置移动并轻微修改，新增一段，表格不变
+        new_paragraph = "The engine must be stopped before any maintenance work is carried out on this machine."
+        plan = align_book(edition("Safety notes", new_paragraph, "Chapter One"), snapshot)
+        assert set(plan.reused) == {(0, 2), (0, 3)} and set(plan.references) == {(0, 1)}
+        assert plan.references[(0, 1)][0] == old_paragraph
+        
+        model = RecordingModel()
+        translator = use_book(PDFTranslator(model, table_mode="cells"), lambda: edition("Safety notes", new_paragraph, "Chapter One"))
+        translator.translate_pdf("edition.pdf", 'markdown', '中文', os.path.join(work_dir, "new.md"), previous_snapshot=snapshot_file)
+        assert len(model.prompts) == 2
+        assert any(old_paragraph in prompt and new_paragraph in prompt for prompt in model.prompts)
+        contents = translator.book.pages[0].contents
+        assert contents[2].translation == "译文1" and contents[3].translation.values.tolist() == [["译Apple", "1.5"]]
+        print(f"   ✅ {plan.summary()}，只请求模型 {len(model.prompts)} 次")
+
+def test_cross_page_context():
+    """测试跨页句子合并与固定预算的上下文提示"""
+    print("🧪 测试跨页上下文...")
+    
+    from ai_translator.translator import PDFTranslator
+    from ai_translator.translator.context import CrossPageContext
+    from ai_translator.utils import estimate_tokens
+    
+    pages = [["Captain Santiago Lopez sailed from Havana Harbor. Captain Santiago Lopez was old and the sea was"],
+             ["calm that morning. He rowed out past the reef.", "Havana Harbor was quiet. The main-"],
+             ["tenance log was empty.", "Nothing else happened."]]
+    book = make_book(pages, "context.pdf")
+    context = CrossPageContext(max_tokens=50)
+    assert context.join_page_fragments(book) == 2
+    assert book.pages[0].contents[0].original.endswith("the sea was calm that morning.")
+    assert book.pages[1].contents[0].original == "He rowed out past the reef."
+    assert book.pages[1].contents[1].original == "Havana Harbor was quiet. The maintenance log was empty."
+    assert [content.original for content in book.pages[2].contents] == ["Nothing else happened."]
+    print("   ✅ 跨页截断的句子已合并")
+    
+    contexts = context.build(book)
+    assert "Captain Santiago Lopez" in contexts[(1, 0)] and "the sea was calm that morning." in contexts[(1, 0)]
+    # 名称出现两次以上才进入专有名词列表
+    assert "Havana Harbor" not in contexts[(1, 1)] and "Havana Harbor" in contexts[(2, 0)]
+    # 预算包含 add_context 附加的说明行与标签，超出时先去掉较早的上文句子
+    assert "上文：The maintenance log was empty." in contexts[(2, 0)]
+    assert all(estimate_tokens(Model().add_context("", text)) <= 50 for text in contexts.values())
+    assert not CrossPageContext(max_tokens=0).build(book)
+    assert not CrossPageContext(max_tokens=20).build(book)
+    # 关闭上下文时也不合并跨页句子
+    untouched = make_book(pages, "context.pdf")
+    assert CrossPageContext(max_tokens=0).join_page_fragments(untouched) == 0
+    assert untouched.pages[1].contents[0].original == pages[1][0]
+    
+    model = RecordingModel()
+    translator = use_book(PDFTranslator(model, context_tokens=50), lambda: make_book(pages, "context.pdf"))
+    translator.translate_pdf("context.pdf", 'markdown', '中文')
+    assert len(model.prompts) == 4
+    assert "前文信息" not in model.prompts[0] and "Captain Santiago Lopez" in model.prompts[1]
+    for prompt in model.prompts[1:]:
+        added = prompt[:prompt.index(Model().make_text_prompt("", "中文"))]
+        assert added and estimate_tokens(added) <= 50, (added, estimate_tokens(added))
+    print(f"   ✅ 附加的上下文文本不超过 50 token，{len(contexts)} 个文本块附带上下文")
+
+    # 配置文件 translator.context_tokens 为 0 时按原始分块翻译，不附加上下文
+    options = PDFTranslator.options_from_config({'translator': {'context_tokens': 0}})
+    assert options == {'context_tokens': 0} and PDFTranslator.options_from_config({}) == {}
+    model = RecordingModel()
+    use_book(PDFTranslator(model, **options), lambda: make_book(pages, "context.pdf")).translate_pdf("context.pdf", 'markdown', '中文')
+    assert len(model.prompts) == 5 and not any("前文信息" in prompt for prompt in model.prompts)
+    print("   ✅ context_tokens 为 0 时不合并句子也不附加上下文")
 
 def main():
     """运行所有测试"""
@@ -264,9 +1130,23 @@ def main():
     tests = [
         test_file_upload_component,
         test_progress_display_component,
+        test_progress_channel,
+        test_admission_queue,
         test_config_manager_component,
         test_history_manager_component,
+        test_history_queries,
+        test_history_write_coalescing,
         test_batch_processor_component,
+        test_batch_real_translation,
+        test_batch_scheduler_controls,
+        test_batch_scheduling_policies,
+        test_batch_persistence,
+        test_batch_statistics,
+        test_gui_batch_outputs,
+        test_table_cell_translation,
+        test_translation_memory,
+        test_incremental_retranslation,
+        test_cross_page_context,
         test_main_integration
     ]
     
@@ -274,8 +1154,12 @@ def main():
     total = len(tests)
     
     for test in tests:
-        if test():
-            passed += 1
+        # 测试函数通过断言（或返回 False）报告失败，这里捕获异常以便继续运行其余测试
+        try:
+            if test() is not False:
+                passed += 1
+        except Exception as e:
+            print(f"   ❌ {test.__name__} 失败: {type(e).__name__}: {e}")
         print()
     
     print(f"📊 测试结果: {passed}/{total} 通过")